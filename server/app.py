@@ -1,40 +1,31 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 from dotenv import load_dotenv
-import pandas as pd
-import joblib
-import jwt
+import json
+import time
 import datetime
 
+from .services.token_cache import CachingJWTManager
+
 # Load environment variables
 load_dotenv()
 
 # Initialize extensions
 db = SQLAlchemy()
-jwt = JWTManager()
+jwt = CachingJWTManager()
 bcrypt = Bcrypt()
 migrate = Migrate()
 
 # Get the absolute path to the directory of the current file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Construct full paths to the model and encoders
-MODEL_PATH = os.path.join(BASE_DIR, "ml", "model.pkl")
-ROLE_ENCODER_PATH = os.path.join(BASE_DIR, "ml", "role_encoder.pkl")
-TYPE_ENCODER_PATH = os.path.join(BASE_DIR, "ml", "type_encoder.pkl")
-
-try:
-    model = joblib.load(MODEL_PATH)
-    role_encoder = joblib.load(ROLE_ENCODER_PATH)
-    type_encoder = joblib.load(TYPE_ENCODER_PATH)
-    print("✅ Model and encoders loaded successfully.")
-except Exception as e:
-    print("❌ Failed to load model or encoders:", e)
+# Directory holding the model and encoders (loaded lazily by the model registry)
+MODEL_DIR = os.path.join(BASE_DIR, "ml")
 
 def create_app():
     """Application factory pattern"""
@@ -45,13 +36,106 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///crickinfo.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-supersecretkey')
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = 3600  # 1 hour
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES', 3600))  # 1 hour
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = int(os.environ.get('JWT_REFRESH_TOKEN_EXPIRES', 30 * 24 * 3600))  # 30 days
+    app.config['SCORE_MATRIX_MAX_AGE'] = int(os.environ.get('SCORE_MATRIX_MAX_AGE', 300))  # seconds
+    app.config['PLAYER_CATALOG_MAX_AGE'] = int(os.environ.get('PLAYER_CATALOG_MAX_AGE', 300))  # seconds
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))  # entries
+    app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 60))  # seconds
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))  # bcrypt cost of new hashes
+    app.config['PASSWORD_HASH_EXECUTOR'] = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')  # or 'process', 'inline'
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS') or 0) or None  # CPU count by default
+    app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+    app.config['AUTH_ROSTER_MAX_AGE'] = int(os.environ.get('AUTH_ROSTER_MAX_AGE', 30))  # seconds
+    app.config['JWT_VERIFY_CACHE_SIZE'] = int(os.environ.get('JWT_VERIFY_CACHE_SIZE', 4096))  # tokens; 0 disables
+    app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    app.config['RATELIMIT_STORAGE_URL'] = os.environ.get('RATELIMIT_STORAGE_URL') or 'sqlite:///ratelimit.db'  # or memory://
+    app.config['LOGIN_RATE_LIMIT_IP_BURST'] = int(os.environ.get('LOGIN_RATE_LIMIT_IP_BURST', 20))  # attempts
+    app.config['LOGIN_RATE_LIMIT_IP_PER_MINUTE'] = float(os.environ.get('LOGIN_RATE_LIMIT_IP_PER_MINUTE', 10))
+    app.config['LOGIN_RATE_LIMIT_USERNAME_BURST'] = int(os.environ.get('LOGIN_RATE_LIMIT_USERNAME_BURST', 10))
+    app.config['LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE'] = float(os.environ.get('LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE', 5))
+    app.config['TRUSTED_PROXY_COUNT'] = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))  # proxies setting X-Forwarded-For
+    app.config['MODEL_DIR'] = os.environ.get('MODEL_DIR') or MODEL_DIR
+    app.config['MODEL_VERSION'] = os.environ.get('MODEL_VERSION') or None
+    app.config['MODEL_CHECK_INTERVAL'] = int(os.environ.get('MODEL_CHECK_INTERVAL', 30))  # seconds
+    app.config['INFERENCE_BATCHING'] = os.environ.get('INFERENCE_BATCHING', 'true').lower() == 'true'
+    app.config['INFERENCE_MAX_BATCH_SIZE'] = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 64))
+    app.config['INFERENCE_MAX_LATENCY_MS'] = float(os.environ.get('INFERENCE_MAX_LATENCY_MS', 3))
+    app.config['INFERENCE_TIMEOUT'] = float(os.environ.get('INFERENCE_TIMEOUT', 10))  # seconds
+    app.config['BULK_IMPORT_CHUNK_SIZE'] = int(os.environ.get('BULK_IMPORT_CHUNK_SIZE', 1000))  # rows per INSERT
+    app.config['CSV_DATA_DIR'] = os.environ.get('CSV_DATA_DIR') or os.path.join(BASE_DIR, 'public')
+    app.config['CSV_INGEST_CHUNK_SIZE'] = int(os.environ.get('CSV_INGEST_CHUNK_SIZE', 1000))  # rows per commit
+    app.config['CSV_UPLOAD_MAX_BYTES'] = int(os.environ.get('CSV_UPLOAD_MAX_BYTES', 100 * 1024 * 1024))
+    app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+    app.config['JOB_STALE_AFTER'] = int(os.environ.get('JOB_STALE_AFTER', 900))  # seconds without progress
+    app.config['JOB_UPLOAD_DIR'] = os.environ.get('JOB_UPLOAD_DIR') or None  # spooled uploads; system temp dir by default
 
     # Initialize extensions with app
     db.init_app(app)
     jwt.init_app(app)
     bcrypt.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, directory=os.path.join(BASE_DIR, 'migrations'), render_as_batch=True)
+
+    # Player search index DDL, attached to the players table
+    from .services import player_search
+    # Admin dashboard counters, moved by a session flush hook
+    from .services import counters
+
+    # In-process caches
+    from .services.score_matrix import ScoreMatrix
+    from .services.player_catalog import PlayerCatalog
+    from .services.response_cache import ResponseCache
+    from .services.authorization import AdminRoster
+    from .services.token_cache import VerifiedTokenCache
+    from .services.passwords import PasswordHasher
+    from .services.rate_limit import BucketRule, RateLimiter, store_from_url
+    from .services.model_registry import ModelRegistry
+    from .services.inference_scheduler import InferenceScheduler
+    from .services.jobs import JobRunner
+    app.extensions['score_matrix'] = ScoreMatrix(max_age=app.config['SCORE_MATRIX_MAX_AGE'])
+    app.extensions['player_catalog'] = PlayerCatalog(max_age=app.config['PLAYER_CATALOG_MAX_AGE'])
+    app.extensions['response_cache'] = ResponseCache(
+        max_size=app.config['RESPONSE_CACHE_SIZE'],
+        ttl=app.config['RESPONSE_CACHE_TTL']
+    )
+    app.extensions['admin_roster'] = AdminRoster(max_age=app.config['AUTH_ROSTER_MAX_AGE'])
+    app.extensions['token_cache'] = VerifiedTokenCache(
+        max_size=app.config['JWT_VERIFY_CACHE_SIZE'],
+        leeway=app.config['JWT_DECODE_LEEWAY']
+    )
+    app.extensions['password_hasher'] = PasswordHasher(
+        rounds=app.config['BCRYPT_LOG_ROUNDS'],
+        max_workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        executor=app.config['PASSWORD_HASH_EXECUTOR']
+    )
+    app.extensions['rate_limiter'] = RateLimiter(
+        store_from_url(app.config['RATELIMIT_STORAGE_URL'], app.instance_path),
+        ip_rule=BucketRule(app.config['LOGIN_RATE_LIMIT_IP_BURST'], app.config['LOGIN_RATE_LIMIT_IP_PER_MINUTE']),
+        username_rule=BucketRule(app.config['LOGIN_RATE_LIMIT_USERNAME_BURST'],
+                                 app.config['LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE']),
+        enabled=app.config['RATELIMIT_ENABLED']
+    )
+    app.extensions['model_registry'] = ModelRegistry(
+        app.config['MODEL_DIR'],
+        version=app.config['MODEL_VERSION'],
+        check_interval=app.config['MODEL_CHECK_INTERVAL']
+    )
+    app.extensions['inference_scheduler'] = InferenceScheduler(
+        lambda: app.extensions['model_registry'].get(),
+        max_batch_size=app.config['INFERENCE_MAX_BATCH_SIZE'],
+        max_latency_ms=app.config['INFERENCE_MAX_LATENCY_MS']
+    )
+    app.extensions['job_runner'] = JobRunner(
+        app,
+        max_workers=app.config['JOB_WORKERS'],
+        stale_after=app.config['JOB_STALE_AFTER']
+    )
+
+    # Client addresses from X-Forwarded-For, as set by the trusted proxies in
+    # front of the app; the login rate limits are counted per address
+    if app.config['TRUSTED_PROXY_COUNT']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'])
 
     # Enable CORS
     CORS(app, resources={r"/api/*": {"origins": ["http://localhost:3000", "http://127.0.0.1:3000"]}})
@@ -69,6 +153,10 @@ def create_app():
     app.register_blueprint(statistics_bp, url_prefix='/api/statistics')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
 
+    # CLI commands
+    from .commands import register_commands
+    register_commands(app)
+
     # Health check
     @app.route("/")
     def index():
@@ -77,6 +165,10 @@ def create_app():
     # Prediction Endpoint
     @app.route("/api/predict", methods=["POST"])
     def predict():
+        from concurrent.futures import TimeoutError as PredictionTimeout
+        from .services.model_registry import ModelUnavailable, get_model_registry
+        from .services.inference_scheduler import get_inference_scheduler
+
         try:
             data = request.get_json()
             role = data.get("role")
@@ -86,19 +178,86 @@ def create_app():
             if not (role and player_type and isinstance(features, list)):
                 return jsonify({"error": "Missing or invalid input"}), 400
 
+            # Queue for the micro-batching worker, which groups concurrent requests
+            if app.config['INFERENCE_BATCHING']:
+                prediction = get_inference_scheduler().predict(
+                    {"role": role, "type": player_type, "features": features},
+                    timeout=app.config['INFERENCE_TIMEOUT']
+                )
+                return jsonify({"prediction": prediction})
+
+            bundle = get_model_registry().get()
+
             # Encode role and type
-            encoded_role = role_encoder.transform([role])[0]
-            encoded_type = type_encoder.transform([player_type])[0]
+            encoded_role = bundle.role_encoder.transform([role])[0]
+            encoded_type = bundle.type_encoder.transform([player_type])[0]
 
             # Combine into final input
             model_input = [encoded_role, encoded_type] + features
-            prediction = model.predict([model_input])
+            prediction = bundle.model.predict([model_input])
 
             return jsonify({"prediction": int(prediction[0])})
 
+        except ModelUnavailable as e:
+            return jsonify({"error": "Model not available", "message": str(e)}), 503
+        except PredictionTimeout:
+            return jsonify({"error": "Prediction timed out"}), 503
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    # Batch Prediction Endpoint
+    @app.route("/api/predict/batch", methods=["POST"])
+    def predict_batch():
+        from .services.prediction import encode_records, predict_matrix
+        from .services.model_registry import ModelUnavailable, get_model_registry
+
+        try:
+            data = request.get_json()
+            records = data.get("records") if isinstance(data, dict) else None
+            with_probabilities = bool(data.get("probabilities")) if isinstance(data, dict) else False
+
+            if not isinstance(records, list) or not records:
+                return jsonify({"error": "Missing or invalid input"}), 400
+
+            bundle = get_model_registry().get()
+
+            start = time.perf_counter()
+            matrix, positions, errors = encode_records(records, bundle.role_index, bundle.type_index,
+                                                       bundle.n_features)
+            predictions, probabilities = predict_matrix(bundle.model, matrix, with_probabilities)
+            elapsed = time.perf_counter() - start
+
+        except ModelUnavailable as e:
+            return jsonify({"error": "Model not available", "message": str(e)}), 503
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+        results = dict(zip(positions, range(len(positions))))
+
+        def generate():
+            # One JSON object per line, in input order, then a summary line
+            for position in range(len(records)):
+                if position in errors:
+                    line = {"index": position, "error": errors[position]}
+                else:
+                    row = results[position]
+                    line = {"index": position, "prediction": int(predictions[row])}
+                    if probabilities is not None:
+                        line["probabilities"] = [round(float(p), 6) for p in probabilities[row]]
+                yield json.dumps(line) + "\n"
+
+            yield json.dumps({
+                "summary": {
+                    "rows": len(records),
+                    "predicted": len(positions),
+                    "failed": len(errors),
+                    "elapsed_ms": round(elapsed * 1000, 3),
+                    "rows_per_second": round(len(positions) / elapsed, 1) if elapsed > 0 else None
+                }
+            }) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -0,0 +1,65 @@
+"""
+Benchmark the per-request cost of JWT authentication with and without the verified token cache.
+
+Times decode_token() on its own, then whole requests through the WSGI app
+to a jwt_required route (the response cache counters, an admin route whose
+role claim check reads only the admins version) and to an unauthenticated route of similar
+weight, so the difference is what authentication adds per request. Run from
+the repository root:
+
+    python -m server.benchmarks.bench_auth --calls 20000 --requests 3000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from flask_jwt_extended import decode_token
+from ..app import create_app, db
+from ..models import User, UserRole
+from ..services.authorization import create_user_token
+
+def per_call_us(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def measure(cache_size, calls, requests):
+    os.environ['JWT_VERIFY_CACHE_SIZE'] = str(cache_size)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@example.com', password_hash='x', role=UserRole.ADMIN)
+        db.session.add(admin)
+        db.session.commit()
+        token = create_user_token(admin)
+
+        with app.test_request_context():
+            decode_us = per_call_us(lambda: decode_token(token), calls)
+
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        client.get('/api/admin/cache', headers=headers)  # Loads the admin roster
+        authenticated_us = per_call_us(lambda: client.get('/api/admin/cache', headers=headers), requests)
+        anonymous_us = per_call_us(lambda: client.get('/api/players/roles'), requests)
+        db.drop_all()
+    return decode_us, authenticated_us, anonymous_us
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000, help='decode_token() calls')
+    parser.add_argument('--requests', type=int, default=3000, help='Requests per route')
+    args = parser.parse_args()
+
+    print(f"{'token cache':>11}  {'decode':>9}  {'auth request':>12}  {'anon request':>12}  {'auth overhead':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        for label, cache_size in (('off', 0), ('on', 4096)):
+            decode_us, authenticated_us, anonymous_us = measure(cache_size, args.calls, args.requests)
+            print(f"{label:>11}  {decode_us:>7.1f}us  {authenticated_us:>10.1f}us  {anonymous_us:>10.1f}us  "
+                  f"{authenticated_us - anonymous_us:>11.1f}us")
+
+if __name__ == '__main__':
+    main()
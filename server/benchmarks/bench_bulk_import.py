@@ -0,0 +1,121 @@
+"""
+Benchmark bulk player and statistics import: per-row lookups vs the set-based path.
+
+Run from the repository root:
+
+    python -m server.benchmarks.bench_bulk_import --sizes 10000 100000
+
+Statistics are imported twice per size, once into an empty table (inserts)
+and once more over the same keys (updates).
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from ..app import create_app, db
+from ..models import Player, PlayerRole, PlayerStatistics, MatchFormat
+from ..services.bulk_import import import_players, import_statistics
+
+def make_rows(size):
+    roles = [role.value for role in PlayerRole]
+    return [
+        {'name': f'Player {i}', 'role': roles[i % len(roles)], 'country': 'India', 'matches_played': i % 300}
+        for i in range(size)
+    ]
+
+def legacy_import(rows):
+    """The original one-query-per-row import loop"""
+    imported_count = 0
+    for row in rows:
+        if Player.query.filter_by(name=row['name']).first():
+            continue
+        db.session.add(Player(
+            name=row['name'], role=PlayerRole(row['role']),
+            country=row['country'], matches_played=row.get('matches_played', 0)
+        ))
+        imported_count += 1
+    return imported_count
+
+def make_statistics_rows(size):
+    formats = [match_format.value for match_format in MatchFormat]
+    return [
+        {'player_id': i // len(formats) + 1, 'format': formats[i % len(formats)],
+         'batting_average': 20.0 + i % 40, 'strike_rate': 60.0 + i % 90}
+        for i in range(size)
+    ]
+
+def legacy_import_statistics(rows):
+    """The original per-row lookup, then insert or update"""
+    for row in rows:
+        if not Player.query.get(row['player_id']):
+            continue
+        existing = PlayerStatistics.query.filter_by(
+            player_id=row['player_id'], format=MatchFormat(row['format'])
+        ).first()
+        if existing:
+            for key, value in row.items():
+                if key not in ['player_id', 'format']:
+                    setattr(existing, key, value)
+        else:
+            db.session.add(PlayerStatistics(**dict(row, format=MatchFormat(row['format']))))
+
+def reset(players=0):
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    if players:
+        import_players(make_rows(players))
+        db.session.commit()
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    db.session.commit()
+    return time.perf_counter() - start
+
+def statistics_rates(func, rows, players, **kwargs):
+    """(insert rows/s, update rows/s) for importing rows twice"""
+    reset(players)
+    inserts = len(rows) / timed(func, rows, **kwargs)
+    updates = len(rows) / timed(func, rows, **kwargs)
+    return inserts, updates
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--legacy-limit', type=int, default=10000,
+                        help='skip the per-row loop above this many players (it is quadratic)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        print(f"{'players':>8}  {'legacy rows/s':>14}  {'bulk rows/s':>12}")
+        for size in args.sizes:
+            rows = make_rows(size)
+            reset()
+            bulk = size / timed(import_players, rows, chunk_size=args.chunk_size)
+            if size > args.legacy_limit:
+                print(f"{size:>8}  {'skipped':>14}  {bulk:>12.0f}")
+                continue
+            reset()
+            legacy = size / timed(legacy_import, rows)
+            print(f"{size:>8}  {legacy:>14.0f}  {bulk:>12.0f}")
+
+        print()
+        print(f"{'stats':>8}  {'legacy ins/s':>13}  {'legacy upd/s':>13}  {'upsert ins/s':>13}  {'upsert upd/s':>13}")
+        for size in args.sizes:
+            rows = make_statistics_rows(size)
+            players = size // len(MatchFormat) + 1
+            upsert = statistics_rates(import_statistics, rows, players, chunk_size=args.chunk_size)
+            if size > args.legacy_limit:
+                legacy = ('skipped', 'skipped')
+            else:
+                legacy = tuple(f'{rate:.0f}' for rate in statistics_rates(legacy_import_statistics, rows, players))
+            print(f"{size:>8}  {legacy[0]:>13}  {legacy[1]:>13}  {upsert[0]:>13.0f}  {upsert[1]:>13.0f}")
+
+if __name__ == '__main__':
+    main()
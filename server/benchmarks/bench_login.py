@@ -0,0 +1,109 @@
+"""
+Benchmark login throughput with bcrypt inline, on a thread pool and on a process pool.
+
+For each cost factor and executor, concurrent clients log in through the
+WSGI app while another client keeps calling a cheap endpoint, whose latency
+shows how much the hashing holds up the rest of the server. Run from the
+repository root:
+
+    python -m server.benchmarks.bench_login --costs 4 8 10 12 --logins 200
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from ..app import create_app, db
+from ..models import User, UserRole
+
+PASSWORD = 'benchmark-password'
+
+def run(app, logins, concurrency, users):
+    local = threading.local()
+
+    def login(index):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        start = time.perf_counter()
+        response = local.client.post('/api/auth/login', json={
+            'username': f'user{index % users}', 'password': PASSWORD
+        })
+        assert response.status_code == 200, response.data
+        return time.perf_counter() - start
+
+    side_latencies = []
+    done = threading.Event()
+
+    def side_traffic():
+        client = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get('/api/players/roles')
+            side_latencies.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    side = threading.Thread(target=side_traffic)
+    start = time.perf_counter()
+    side.start()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    side.join()
+
+    side_latencies.sort()
+    return {
+        'logins_per_second': logins / elapsed,
+        'login_p50_ms': statistics.median(latencies) * 1000,
+        'side_p50_ms': statistics.median(side_latencies) * 1000,
+        'side_p99_ms': side_latencies[int(len(side_latencies) * 0.99) - 1] * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--costs', type=int, nargs='+', default=[4, 8, 10, 12])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=0, help='Hashing workers; CPU count by default')
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.concurrency} concurrent clients")
+    print(f"{'cost':>4}  {'executor':>8}  {'logins/s':>9}  {'login p50':>10}  {'other p50':>10}  {'other p99':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for cost in args.costs:
+            password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(cost)).decode('utf-8')
+            for executor in ('inline', 'thread', 'process'):
+                # A file database, since the logins run on several threads
+                os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, f'{cost}-{executor}.db')}"
+                os.environ['BCRYPT_LOG_ROUNDS'] = str(cost)
+                os.environ['PASSWORD_HASH_EXECUTOR'] = executor
+                os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+                os.environ['PASSWORD_HASH_MAX_PENDING'] = str(max(64, args.concurrency))
+                # Every login comes from one address
+                os.environ['RATELIMIT_ENABLED'] = 'false'
+                app = create_app()
+                with app.app_context():
+                    db.create_all()
+                    db.session.add_all(
+                        User(username=f'user{i}', email=f'user{i}@example.com', password_hash=password_hash,
+                             role=UserRole.USER)
+                        for i in range(args.users)
+                    )
+                    db.session.commit()
+                # Start the pool outside the measurement
+                app.test_client().post('/api/auth/login', json={'username': 'user0', 'password': PASSWORD})
+
+                result = run(app, args.logins, args.concurrency, args.users)
+                app.extensions['password_hasher'].shutdown()
+                print(f"{cost:>4}  {executor:>8}  {result['logins_per_second']:>9.1f}  "
+                      f"{result['login_p50_ms']:>8.1f}ms  {result['side_p50_ms']:>8.2f}ms  "
+                      f"{result['side_p99_ms']:>8.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark typeahead player search: leading-wildcard LIKE vs the trigram index vs the player catalog.
+
+Run from the repository root:
+
+    python -m server.benchmarks.bench_player_search --players 100000
+
+Each query is typed one character at a time, as the squad selector sends
+it, and every prefix is timed as one request would run it.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import func, or_, text
+from ..app import create_app, db
+from ..models import Player, PlayerRole
+from ..services.bulk_import import import_players
+from ..services.player_catalog import get_player_catalog
+from ..services.player_search import MIN_QUERY_LENGTH, fuzzy_player_ids, normalize_query
+
+SYLLABLES = ['ka', 'ro', 'mi', 'san', 'dra', 'vi', 'rat', 'ko', 'hli', 'pe', 're', 'ra', 'men', 'dis',
+             'jas', 'prit', 'bum', 'wan', 'in', 'du', 'ha', 'ser', 'tha', 'ch', 'ar', 'ith', 'as', 'lan']
+COUNTRIES = ['India', 'Sri Lanka', 'Australia', 'England', 'New Zealand', 'South Africa', 'Pakistan']
+QUERIES = ['kohli', 'mendis', 'sanra', 'bumrah', 'xyz', 'kusal mendis']
+
+def make_name(rng):
+    def word():
+        return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+    return f'{word()} {word()}'
+
+def make_rows(size, seed=7):
+    rng = random.Random(seed)
+    roles = [role.value for role in PlayerRole]
+    names = set()
+    while len(names) < size:
+        names.add(make_name(rng))
+    return [
+        {'name': name, 'role': roles[i % len(roles)], 'country': COUNTRIES[i % len(COUNTRIES)]}
+        for i, name in enumerate(sorted(names))
+    ]
+
+def legacy_search(query, limit):
+    """The original filter: name or country ILIKE '%query%'"""
+    return Player.query.filter(
+        or_(Player.name.ilike(f'%{query}%'), Player.country.ilike(f'%{query}%'))
+    ).limit(limit).all()
+
+def trigram_search(query, limit):
+    """Database-only search: name prefixes from ix_players_name_lower, then
+    substrings from players_fts, then fuzzy matches"""
+    query = normalize_query(query)
+    key = func.lower(Player.name)
+    upper = query[:-1] + chr(ord(query[-1]) + 1)
+    ids = db.session.execute(
+        db.select(Player.id).where(key >= query, key < upper).order_by(key, Player.id).limit(limit)
+    ).scalars().all()
+    if len(query) >= MIN_QUERY_LENGTH and len(ids) < limit:
+        rows = db.session.execute(
+            text('SELECT rowid FROM players_fts WHERE players_fts MATCH :phrase LIMIT :limit'),
+            {'phrase': 'name : "' + query.replace('"', '""') + '"', 'limit': limit + len(ids)}
+        )
+        ids += [player_id for player_id in rows.scalars() if player_id not in ids][:limit - len(ids)]
+    if len(ids) < limit:
+        ids += [player_id for player_id, _ in fuzzy_player_ids(query, limit - len(ids), exclude=set(ids))]
+    return Player.query.filter(Player.id.in_(ids)).all()
+
+def latencies(search, limit):
+    """Milliseconds per keystroke over every prefix of every query"""
+    timings = []
+    for query in QUERIES:
+        for end in range(1, len(query) + 1):
+            start = time.perf_counter()
+            search(query[:end], limit)
+            timings.append((time.perf_counter() - start) * 1000)
+            db.session.rollback()
+    return timings
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:>10}  {statistics.median(timings):>9.2f}  {p95:>9.2f}  {timings[-1]:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=100000)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        import_players(make_rows(args.players))
+        db.session.commit()
+
+        print(f"{args.players} players, {sum(len(query) for query in QUERIES)} keystrokes")
+        print(f"{'':>10}  {'p50 ms':>9}  {'p95 ms':>9}  {'max ms':>9}")
+        report('legacy', latencies(legacy_search, args.limit))
+        report('trigram', latencies(trigram_search, args.limit))
+
+        start = time.perf_counter()
+        snapshot = get_player_catalog().snapshot()
+        print(f"catalog loaded in {(time.perf_counter() - start) * 1000:.0f} ms; without fuzzy matches:")
+        report('catalog', latencies(lambda query, limit: snapshot.search(query, limit=limit), args.limit))
+
+if __name__ == '__main__':
+    main()
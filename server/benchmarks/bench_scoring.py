@@ -0,0 +1,104 @@
+"""
+Benchmark the vectorized smart-suggestion scorer against the per-player loop.
+
+Run from the repository root:
+
+    python -m server.benchmarks.bench_scoring --sizes 1000 10000 100000
+"""
+
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from ..app import create_app, db
+from ..models import Player, PlayerStatistics, PlayerRole, MatchFormat, PitchType, Weather
+from ..services.scoring import calculate_player_score, suggest_players
+
+class Conditions:
+    """Stand-in for a MatchConditions row"""
+    def __init__(self, format, pitch_type, weather):
+        self.format = format
+        self.pitch_type = pitch_type
+        self.weather = weather
+
+def seed(size):
+    """Insert `size` players, each with statistics for every format"""
+    db.drop_all()
+    db.create_all()
+    rng = random.Random(42)
+    roles = list(PlayerRole)
+
+    players = [
+        {'id': i, 'name': f'Player {i}', 'role': rng.choice(roles), 'country': 'Country', 'matches_played': 0}
+        for i in range(1, size + 1)
+    ]
+    db.session.bulk_insert_mappings(Player, players)
+
+    statistics = []
+    for i in range(1, size + 1):
+        for match_format in MatchFormat:
+            statistics.append({
+                'player_id': i,
+                'format': match_format,
+                'batting_average': rng.uniform(5, 60),
+                'bowling_average': rng.uniform(15, 50),
+                'strike_rate': rng.uniform(60, 180),
+                'economy_rate': rng.uniform(3, 11),
+                'recent_form': rng.uniform(0, 100)
+            })
+    db.session.bulk_insert_mappings(PlayerStatistics, statistics)
+    db.session.commit()
+
+def legacy_suggestions(match_conditions, current_player_ids):
+    """The original Player.query.all() + per-player statistics query loop"""
+    suggestions = []
+    for player in Player.query.all():
+        if player.id in current_player_ids:
+            continue
+        stats = PlayerStatistics.query.filter_by(
+            player_id=player.id, format=match_conditions.format
+        ).first()
+        if not stats:
+            continue
+        score = calculate_player_score(player, stats, match_conditions)
+        if score > 0:
+            suggestions.append({'id': player.id, 'score': score})
+    suggestions.sort(key=lambda x: x['score'], reverse=True)
+    return suggestions[:10]
+
+def timed(func, *args):
+    db.session.expunge_all()
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--legacy-limit', type=int, default=None,
+                        help='skip the legacy loop above this many players')
+    args = parser.parse_args()
+
+    match_conditions = Conditions(MatchFormat.T20, PitchType.BATTING, Weather.RAINY)
+    current_player_ids = [1, 2, 3]
+
+    app = create_app()
+    with app.app_context():
+        print(f"{'players':>8}  {'legacy (s)':>11}  {'vectorized (s)':>15}  {'speedup':>8}")
+        for size in args.sizes:
+            seed(size)
+            fast, fast_time = timed(suggest_players, match_conditions, current_player_ids)
+
+            if args.legacy_limit is not None and size > args.legacy_limit:
+                print(f"{size:>8}  {'skipped':>11}  {fast_time:>15.4f}  {'-':>8}")
+                continue
+
+            slow, slow_time = timed(legacy_suggestions, match_conditions, current_player_ids)
+            assert [s['id'] for s in slow] == [s['id'] for s in fast], 'scorers disagree'
+            print(f"{size:>8}  {slow_time:>11.4f}  {fast_time:>15.4f}  {slow_time / fast_time:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark top players: the live join and sort vs the materialized leaderboards.
+
+Run from the repository root:
+
+    python -m server.benchmarks.bench_top_players --players 100000
+
+Every player gets statistics in every format; leaderboards are read by
+role and metric, then a player's rank is looked up.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import desc
+from ..app import create_app, db
+from ..models import Player, PlayerRole, PlayerStatistics, MatchFormat
+from ..services.bulk_import import import_players, import_statistics
+from ..services.leaderboards import METRICS, player_rank, top_entries
+
+def legacy_top_players(match_format, role, metric, limit):
+    """The original query: join the format's statistics and sort them"""
+    query = db.session.query(Player, PlayerStatistics).join(
+        PlayerStatistics, Player.id == PlayerStatistics.player_id
+    ).filter(PlayerStatistics.format == match_format)
+    if role:
+        query = query.filter(Player.role == role)
+    return query.order_by(desc(getattr(PlayerStatistics, metric))).limit(limit).all()
+
+def legacy_rank(player_id, match_format, metric):
+    """Rank by counting better rows of the format's statistics"""
+    value = db.session.query(getattr(PlayerStatistics, metric)).filter_by(
+        player_id=player_id, format=match_format
+    ).scalar()
+    column = getattr(PlayerStatistics, metric)
+    return db.session.query(PlayerStatistics).filter(
+        PlayerStatistics.format == match_format, column > value
+    ).count() + 1
+
+def timed(func, calls):
+    timings = []
+    for args in calls:
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def report(label, timings):
+    timings = sorted(timings)
+    print(f"{label:>22}  {statistics.median(timings):>9.2f}  {timings[int(len(timings) * 0.95) - 1]:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=100000)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    roles = [role.value for role in PlayerRole]
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        import_players([{'name': f'Player {i}', 'role': roles[i % len(roles)], 'country': 'India'}
+                        for i in range(args.players)])
+        start = time.perf_counter()
+        import_statistics([
+            {'player_id': player_id, 'format': match_format.value,
+             **{metric: round(rng.uniform(0, 100), 2) for metric in METRICS}}
+            for player_id in range(1, args.players + 1) for match_format in MatchFormat
+        ])
+        db.session.commit()
+        print(f"{args.players} players; statistics and leaderboards written in {time.perf_counter() - start:.1f} s")
+
+        boards = [(match_format, role, metric) for match_format in MatchFormat
+                  for role in [None, *PlayerRole] for metric in ('batting_average', 'strike_rate')]
+        ranks = [(rng.randint(1, args.players), MatchFormat.ODI, 'batting_average') for _ in range(30)]
+
+        print(f"{'':>22}  {'p50 ms':>9}  {'p95 ms':>9}")
+        report('live top players', timed(
+            lambda match_format, role, metric: legacy_top_players(match_format, role, metric, args.limit), boards
+        ))
+        report('leaderboard top', timed(
+            lambda match_format, role, metric: top_entries(match_format, metric, role=role, limit=args.limit), boards
+        ))
+        report('live rank', timed(legacy_rank, ranks))
+        report('leaderboard rank', timed(player_rank, ranks))
+
+if __name__ == '__main__':
+    main()
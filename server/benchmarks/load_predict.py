@@ -0,0 +1,93 @@
+"""
+Load test /api/predict with and without micro-batching.
+
+Trains a throwaway RandomForest shaped like the production model, then fires
+concurrent requests from a thread pool through the WSGI app. Run from the
+repository root:
+
+    python -m server.benchmarks.load_predict --concurrency 32 --requests 2000
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+from ..app import create_app
+
+FEATURE_COUNT = 8
+
+def write_artifacts(directory):
+    rng = np.random.default_rng(42)
+    model = RandomForestClassifier(n_estimators=100, random_state=42).fit(
+        rng.random((2000, FEATURE_COUNT + 2)), rng.integers(0, 9, 2000)
+    )
+    joblib.dump(model, os.path.join(directory, 'model.pkl'))
+    joblib.dump(LabelEncoder().fit(list(range(1, 10))), os.path.join(directory, 'role_encoder.pkl'))
+    joblib.dump(LabelEncoder().fit(['All-rounder', 'Batsman']), os.path.join(directory, 'type_encoder.pkl'))
+
+def run(app, total, concurrency):
+    rng = np.random.default_rng(0)
+    payloads = [
+        {'role': int(rng.integers(1, 10)), 'type': 'Batsman', 'features': rng.random(FEATURE_COUNT).tolist()}
+        for _ in range(total)
+    ]
+    local = threading.local()
+
+    def send(payload):
+        # One test client per thread
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        client = local.client
+        start = time.perf_counter()
+        response = client.post('/api/predict', json=payload)
+        assert response.status_code == 200, response.data
+        return time.perf_counter() - start
+
+    # Warm up the model load outside the measurement
+    app.test_client().post('/api/predict', json=payloads[0])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(send, payloads))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'throughput': total / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-latency-ms', type=float, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        write_artifacts(model_dir)
+        os.environ['MODEL_DIR'] = model_dir
+        os.environ['INFERENCE_MAX_BATCH_SIZE'] = str(args.max_batch_size)
+        os.environ['INFERENCE_MAX_LATENCY_MS'] = str(args.max_latency_ms)
+
+        print(f"{'mode':>12}  {'req/s':>8}  {'p50 (ms)':>9}  {'p99 (ms)':>9}")
+        for mode, batching in (('per-request', 'false'), ('batched', 'true')):
+            os.environ['INFERENCE_BATCHING'] = batching
+            app = create_app()
+            result = run(app, args.requests, args.concurrency)
+            print(f"{mode:>12}  {result['throughput']:>8.1f}  {result['p50_ms']:>9.2f}  {result['p99_ms']:>9.2f}")
+            if batching == 'true':
+                print(f"scheduler: {app.extensions['inference_scheduler'].metrics()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Flask CLI commands, e.g.:
+
+    flask --app server.app:create_app ingest-csv --source odi_bowling
+    flask --app server.app:create_app check-leaderboards --repair
+    flask --app server.app:create_app reconcile-counters
+    flask --app server.app:create_app prune-sessions
+"""
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from .app import db
+from .services.counters import reconcile_counters
+from .services.csv_ingest import SOURCES, ingest_csv
+from .services.leaderboards import rebuild_leaderboards, verify_leaderboards
+from .services.sessions import prune_sessions
+
+@click.command('ingest-csv')
+@click.option('--source', 'sources', type=click.Choice(sorted(SOURCES)), multiple=True,
+              help='CSV source to ingest (repeatable); all sources by default')
+@click.option('--chunk-size', type=int, default=None, help='Rows per committed chunk')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and ingest from the first row')
+@click.option('--country', default='Unknown', show_default=True, help='Country of newly created players')
+@with_appcontext
+def ingest_csv_command(sources, chunk_size, restart, country):
+    """Stream the CSV datasets into players and player statistics"""
+    chunk_size = max(1, chunk_size or current_app.config['CSV_INGEST_CHUNK_SIZE'])
+
+    def progress(summary):
+        click.echo(f"{summary['source']}: {summary['rows_committed']} rows committed "
+                   f"({summary['chunks_committed']} chunks)")
+
+    for source in sources or SOURCES:
+        summary = ingest_csv(source, current_app.config['CSV_DATA_DIR'], chunk_size=chunk_size,
+                             restart=restart, default_country=country, on_chunk=progress)
+        if summary['resumed_from']:
+            click.echo(f"{source}: resumed after row {summary['resumed_from']}")
+        click.echo(f"{source}: {summary['rows_read']} rows read, {summary['players_created']} players created, "
+                   f"{summary['statistics_inserted']} statistics inserted, "
+                   f"{summary['statistics_updated']} updated, {summary['error_count']} rows rejected")
+        for error in summary['errors']:
+            click.echo(f"  line {error['line']}: {error['error']}", err=True)
+
+@click.command('check-leaderboards')
+@click.option('--repair', is_flag=True, help='Rebuild the leaderboards when they differ from the statistics')
+@with_appcontext
+def check_leaderboards_command(repair):
+    """Compare the materialized leaderboards with the live statistics"""
+    drift = verify_leaderboards()
+    for label, entries in (('missing', drift['missing']), ('unexpected', drift['unexpected'])):
+        for match_format, metric, player_id, role, value in entries:
+            click.echo(f"{label}: {match_format.value} {metric} player {player_id} ({role.value}) = {value}", err=True)
+
+    if not drift['missing'] and not drift['unexpected']:
+        click.echo('Leaderboards match the player statistics')
+    elif repair:
+        rebuild_leaderboards()
+        db.session.commit()
+        click.echo(f"Leaderboards rebuilt ({len(drift['missing'])} missing, {len(drift['unexpected'])} unexpected)")
+    else:
+        raise click.ClickException(
+            f"{len(drift['missing'])} entries missing, {len(drift['unexpected'])} unexpected; rerun with --repair"
+        )
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_counters_command():
+    """Recount the admin dashboard counters from the tables; run nightly"""
+    _, drift = reconcile_counters()
+    db.session.commit()
+    for name, (stored, exact) in drift.items():
+        click.echo(f"{name}: {stored} -> {exact}")
+    click.echo(f"Counters reconciled ({len(drift)} corrected)")
+
+@click.command('prune-sessions')
+@with_appcontext
+def prune_sessions_command():
+    """Delete expired and revoked refresh token sessions"""
+    deleted = prune_sessions()
+    db.session.commit()
+    click.echo(f"{deleted} sessions deleted")
+
+def register_commands(app):
+    app.cli.add_command(ingest_csv_command)
+    app.cli.add_command(check_leaderboards_command)
+    app.cli.add_command(reconcile_counters_command)
+    app.cli.add_command(prune_sessions_command)
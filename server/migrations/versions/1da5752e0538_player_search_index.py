@@ -0,0 +1,70 @@
+"""Player search index
+
+FTS5 trigram table kept in sync by triggers on SQLite, pg_trgm GIN indexes
+on PostgreSQL, and a lower(name) index for short typeahead prefixes. The
+statements are copied from services/player_search.py so this revision does
+not change when that module does.
+
+Revision ID: 1da5752e0538
+Revises: eb6aff0e315f
+Create Date: 2026-10-16 22:59:13.678633
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1da5752e0538'
+down_revision = 'eb6aff0e315f'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_INDEX_DDL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS players_fts USING fts5("
+        "name, country, content='players', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS players_fts_insert AFTER INSERT ON players BEGIN "
+        "INSERT INTO players_fts(rowid, name, country) VALUES (new.id, new.name, new.country); END",
+        "CREATE TRIGGER IF NOT EXISTS players_fts_delete AFTER DELETE ON players BEGIN "
+        "INSERT INTO players_fts(players_fts, rowid, name, country) "
+        "VALUES ('delete', old.id, old.name, old.country); END",
+        "CREATE TRIGGER IF NOT EXISTS players_fts_update AFTER UPDATE OF name, country ON players BEGIN "
+        "INSERT INTO players_fts(players_fts, rowid, name, country) "
+        "VALUES ('delete', old.id, old.name, old.country); "
+        "INSERT INTO players_fts(rowid, name, country) VALUES (new.id, new.name, new.country); END",
+        # Index the players that already exist
+        "INSERT INTO players_fts(players_fts) VALUES ('rebuild')",
+    ],
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_players_name_trgm ON players USING gin (name gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_players_country_trgm ON players USING gin (country gin_trgm_ops)",
+    ],
+}
+
+DROP_SEARCH_INDEX_DDL = {
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS players_fts_insert",
+        "DROP TRIGGER IF EXISTS players_fts_delete",
+        "DROP TRIGGER IF EXISTS players_fts_update",
+        "DROP TABLE IF EXISTS players_fts",
+    ],
+    'postgresql': [
+        "DROP INDEX IF EXISTS ix_players_country_trgm",
+        "DROP INDEX IF EXISTS ix_players_name_trgm",
+    ],
+}
+
+
+def upgrade():
+    op.create_index('ix_players_name_lower', 'players', [sa.text('lower(name)')], unique=False)
+    for statement in SEARCH_INDEX_DDL.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade():
+    for statement in DROP_SEARCH_INDEX_DDL.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+    op.drop_index('ix_players_name_lower', table_name='players')
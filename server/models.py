@@ -30,6 +30,13 @@ class Weather(Enum):
     RAINY = "Rainy"
     HUMID = "Humid"
 
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -38,7 +45,8 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.Enum(UserRole), default=UserRole.USER)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped by role changes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -47,13 +55,29 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+class AuthSession(db.Model):
+    """A signed-in client: the refresh token it currently holds, rotated on every refresh"""
+    __tablename__ = 'auth_sessions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    refresh_jti = db.Column(db.String(36), nullable=False)  # jti of the only refresh token still accepted
+    previous_jti = db.Column(db.String(36))  # jti it replaced, recognized for a short grace period
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    refreshed_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<AuthSession {self.id} user {self.user_id}>'
+
 class Player(db.Model):
     __tablename__ = 'players'
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    role = db.Column(db.Enum(PlayerRole), nullable=False)
-    country = db.Column(db.String(50), nullable=False)
+    role = db.Column(db.Enum(PlayerRole), nullable=False, index=True)
+    country = db.Column(db.String(50), nullable=False, index=True)
     matches_played = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -61,6 +85,9 @@ class Player(db.Model):
     # Relationships
     statistics = db.relationship('PlayerStatistics', backref='player', lazy=True, cascade='all, delete-orphan')
     
+    # Short typeahead prefixes; longer queries use the trigram search index
+    __table_args__ = (db.Index('ix_players_name_lower', db.func.lower(name)),)
+    
     def __repr__(self):
         return f'<Player {self.name}>'
 
@@ -78,21 +105,81 @@ class PlayerStatistics(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    __table_args__ = (db.UniqueConstraint('player_id', 'format', name='_player_format_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('player_id', 'format', name='_player_format_uc'),
+    )
+
+class LeaderboardEntry(db.Model):
+    """A player's value of one ranking metric in a format, kept by services/leaderboards.py"""
+    __tablename__ = 'leaderboard_entries'
+
+    format = db.Column(db.Enum(MatchFormat), primary_key=True)
+    metric = db.Column(db.String(20), primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True, index=True)
+    role = db.Column(db.Enum(PlayerRole), nullable=False)
+    value = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        # Leaderboard pages and rank counts are range scans in value order
+        db.Index('ix_leaderboard_entries_rank', 'format', 'metric', 'value', 'player_id'),
+        db.Index('ix_leaderboard_entries_role_rank', 'format', 'metric', 'role', 'value', 'player_id'),
+    )
+
+class SystemCounter(db.Model):
+    """A row count behind the admin dashboard, kept by services/counters.py"""
+    __tablename__ = 'system_counters'
+
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class PlayerStatisticsTotals(db.Model):
+    """Running sums behind the statistics ingested from a CSV source"""
+    __tablename__ = 'player_statistics_totals'
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id', ondelete='CASCADE'), nullable=False)
+    format = db.Column(db.Enum(MatchFormat), nullable=False)
+    source = db.Column(db.String(50), nullable=False)
+    innings = db.Column(db.Integer, nullable=False, default=0)
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    dismissals = db.Column(db.Integer, nullable=False, default=0)
+    balls_faced = db.Column(db.Integer, nullable=False, default=0)
+    balls_bowled = db.Column(db.Integer, nullable=False, default=0)
+    runs_conceded = db.Column(db.Integer, nullable=False, default=0)
+    wickets = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('player_id', 'format', 'source', name='_player_format_source_uc'),)
+
+class IngestionCheckpoint(db.Model):
+    """Progress of a CSV ingestion, committed together with each chunk"""
+    __tablename__ = 'ingestion_checkpoints'
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(50), unique=True, nullable=False)
+    file_size = db.Column(db.Integer, nullable=False)
+    rows_committed = db.Column(db.Integer, nullable=False, default=0)
+    chunks_committed = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<IngestionCheckpoint {self.source} {self.rows_committed}>'
 
 class Squad(db.Model):
     __tablename__ = 'squads'
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     captain_id = db.Column(db.Integer, db.ForeignKey('players.id'))
     wicket_keeper_id = db.Column(db.Integer, db.ForeignKey('players.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    squad_players = db.relationship('SquadPlayer', backref='squad', lazy=True, cascade='all, delete-orphan')
+    squad_players = db.relationship('SquadPlayer', backref='squad', lazy=True, cascade='all, delete-orphan',
+                                    order_by='SquadPlayer.id')
     
     def __repr__(self):
         return f'<Squad {self.name}>'
@@ -105,6 +192,10 @@ class SquadPlayer(db.Model):
     player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Relationships
+    player = db.relationship('Player', lazy=True)
+    
+    # Also the index for squad_id lookups
     __table_args__ = (db.UniqueConstraint('squad_id', 'player_id', name='_squad_player_uc'),)
 
 class MatchConditions(db.Model):
@@ -145,4 +236,25 @@ class SuggestionPlayer(db.Model):
     priority = db.Column(db.Integer, default=0)  # Higher number = higher priority
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    __table_args__ = (db.UniqueConstraint('suggestion_id', 'player_id', name='_suggestion_player_uc'),) 
\ No newline at end of file
+    __table_args__ = (db.UniqueConstraint('suggestion_id', 'player_id', name='_suggestion_player_uc'),) 
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.Enum(JobStatus), nullable=False, default=JobStatus.QUEUED, index=True)
+    params = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    rows_total = db.Column(db.Integer)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status.value}>'
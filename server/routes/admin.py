@@ -1,26 +1,46 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func, desc
+import codecs
+from flask import Blueprint, current_app, request, jsonify, url_for
+from flask_jwt_extended import get_jwt_identity
+from marshmallow import ValidationError
 from ..app import db
-from ..models import User, UserRole, Player, Squad, PlayerStatistics
-from ..schemas import UserSchema
+from ..models import AuthSession, User, UserRole, Player, Squad, PlayerStatistics, MatchFormat, Job, JobStatus
+from ..schemas import UserSchema, JobSchema
+from ..services.authorization import admin_required, get_admin_roster
+from ..services.counters import system_statistics
+from ..services.csv_ingest import SOURCES as CSV_SOURCES
+from ..services.csv_upload import UploadError, UploadTooLarge, remove_spool, request_csv_blocks, spool_upload
+from ..services.jobs import get_job_runner, public_job_types
+from ..services.rate_limit import get_rate_limiter
+from ..services.model_registry import ModelUnavailable, get_model_registry
+from ..services.inference_scheduler import get_inference_scheduler
+from ..services.response_cache import get_response_cache
+from ..services.token_cache import get_token_cache
+from ..utils import keyset_paginate, validate_pagination_params
 
 admin_bp = Blueprint('admin', __name__)
 user_schema = UserSchema()
+job_schema = JobSchema()
 
 @admin_bp.route('/users', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_all_users():
     """Get all users (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        
-        if not current_user or current_user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor')
+        
+        # ?cursor= (empty for the first page) switches to keyset mode on id
+        if cursor is not None:
+            page_data = keyset_paginate(
+                User.query, 'id', [User.id], cursor,
+                per_page=validate_pagination_params(1, per_page)['per_page'],
+                include_total=request.args.get('include_total', 0, type=int) == 1
+            )
+            return jsonify({
+                'users': [user_schema.dump(user) for user in page_data['items']],
+                'pagination': page_data['pagination']
+            }), 200
         
         users = User.query.paginate(
             page=page, per_page=per_page, error_out=False
@@ -43,20 +63,16 @@ def get_all_users():
             }
         }), 200
         
+    except ValidationError as e:
+        return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch users', 'message': str(e)}), 500
 
 @admin_bp.route('/users/<int:user_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_user_role(user_id):
     """Update user role (admin only)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if not current_user or current_user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         user = User.query.get(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -67,8 +83,11 @@ def update_user_role(user_id):
         if new_role not in [role.value for role in UserRole]:
             return jsonify({'error': 'Invalid role'}), 400
         
-        user.role = UserRole(new_role)
+        if user.role != UserRole(new_role):
+            user.role = UserRole(new_role)
+            user.token_version = (user.token_version or 0) + 1  # Tokens with the old role claim stop working
         db.session.commit()
+        get_admin_roster().invalidate()
         
         return jsonify({
             'message': 'User role updated successfully',
@@ -80,25 +99,21 @@ def update_user_role(user_id):
         return jsonify({'error': 'Failed to update user role', 'message': str(e)}), 500
 
 @admin_bp.route('/users/<int:user_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_user(user_id):
     """Delete user (admin only)"""
     try:
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if not current_user or current_user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
-        if current_user_id == user_id:
+        if get_jwt_identity() == user_id:
             return jsonify({'error': 'Cannot delete your own account'}), 400
         
         user = User.query.get(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
+        AuthSession.query.filter_by(user_id=user_id).delete()
         db.session.delete(user)
         db.session.commit()
+        get_admin_roster().invalidate()
         
         return jsonify({'message': 'User deleted successfully'}), 200
         
@@ -107,231 +122,216 @@ def delete_user(user_id):
         return jsonify({'error': 'Failed to delete user', 'message': str(e)}), 500
 
 @admin_bp.route('/statistics', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_system_statistics():
     """Get system statistics (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        
-        if not current_user or current_user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
-        # Count total users
-        total_users = User.query.count()
-        admin_users = User.query.filter_by(role=UserRole.ADMIN).count()
-        regular_users = total_users - admin_users
-        
-        # Count total players
-        total_players = Player.query.count()
-        
-        # Count players by role
-        players_by_role = db.session.query(
-            Player.role, func.count(Player.id)
-        ).group_by(Player.role).all()
-        
-        role_distribution = {}
-        for role, count in players_by_role:
-            role_distribution[role.value] = count
-        
-        # Count total squads
-        total_squads = Squad.query.count()
-        
-        # Count squads by user
-        squads_by_user = db.session.query(
-            Squad.user_id, func.count(Squad.id)
-        ).group_by(Squad.user_id).all()
-        
-        # Count total statistics records
-        total_statistics = PlayerStatistics.query.count()
-        
-        # Get recent activity (last 7 days)
-        from datetime import datetime, timedelta
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        
-        recent_users = User.query.filter(
-            User.created_at >= week_ago
-        ).count()
-        
-        recent_squads = Squad.query.filter(
-            Squad.created_at >= week_ago
-        ).count()
-        
-        statistics = {
-            'users': {
-                'total': total_users,
-                'admins': admin_users,
-                'regular': regular_users,
-                'recent_registrations': recent_users
-            },
-            'players': {
-                'total': total_players,
-                'by_role': role_distribution
-            },
-            'squads': {
-                'total': total_squads,
-                'recent_created': recent_squads
-            },
-            'statistics': {
-                'total_records': total_statistics
-            }
-        }
+        # Counters kept by the write paths; ?exact=1 recounts the tables and corrects them
+        exact = request.args.get('exact', 0, type=int) == 1
+        statistics = system_statistics(exact=exact)
+        if exact:
+            db.session.commit()
         
-        return jsonify({'statistics': statistics}), 200
+        return jsonify({'statistics': statistics, 'exact': exact}), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': 'Failed to fetch statistics', 'message': str(e)}), 500
 
+def queue_job(kind, params=None, payload=None, message='Job queued'):
+    """Submit a background job and answer 202 with its status URL"""
+    job = get_job_runner().submit(kind, params=params, payload=payload, user_id=get_jwt_identity())
+    response = jsonify({'message': message, 'job': job_schema.dump(job)})
+    response.headers['Location'] = url_for('admin.get_job', job_id=job.id)
+    return response, 202
+
 @admin_bp.route('/players/bulk-import', methods=['POST'])
-@jwt_required()
+@admin_required
 def bulk_import_players():
-    """Bulk import players from CSV (admin only)"""
+    """Bulk import players from CSV as a background job (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        
-        if not current_user or current_user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.get_json()
         players_data = data.get('players', [])
         
         if not players_data:
             return jsonify({'error': 'No players data provided'}), 400
         
-        imported_count = 0
-        errors = []
+        chunk_size = request.args.get('chunk_size', current_app.config['BULK_IMPORT_CHUNK_SIZE'], type=int)
+        return queue_job('import_players', params={'chunk_size': max(1, chunk_size)}, payload=players_data,
+                         message=f'Import of {len(players_data)} players queued')
         
-        for player_data in players_data:
-            try:
-                # Validate required fields
-                required_fields = ['name', 'role', 'country']
-                for field in required_fields:
-                    if field not in player_data:
-                        errors.append(f"Player {player_data.get('name', 'Unknown')}: Missing {field}")
-                        continue
-                
-                # Check if player already exists
-                existing_player = Player.query.filter_by(name=player_data['name']).first()
-                if existing_player:
-                    errors.append(f"Player {player_data['name']}: Already exists")
-                    continue
-                
-                # Create new player
-                new_player = Player(
-                    name=player_data['name'],
-                    role=PlayerRole(player_data['role']),
-                    country=player_data['country'],
-                    matches_played=player_data.get('matches_played', 0)
-                )
-                
-                db.session.add(new_player)
-                imported_count += 1
-                
-            except Exception as e:
-                errors.append(f"Player {player_data.get('name', 'Unknown')}: {str(e)}")
-        
-        db.session.commit()
-        
-        return jsonify({
-            'message': f'Successfully imported {imported_count} players',
-            'imported_count': imported_count,
-            'errors': errors
-        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import players', 'message': str(e)}), 500
+
+@admin_bp.route('/players/upload-csv', methods=['POST'])
+@admin_required
+def upload_players_csv():
+    """Import players from a streamed CSV upload as a background job (admin only)"""
+    path = None
+    try:
+        max_bytes = current_app.config['CSV_UPLOAD_MAX_BYTES']
+        if request.content_length and request.content_length > max_bytes:
+            return jsonify({'error': f'File size exceeds {max_bytes} bytes'}), 413
         
+        encoding = request.args.get('encoding', 'utf-8-sig')
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            return jsonify({'error': f'Unknown encoding {encoding}'}), 400
+        
+        # The request body has to be consumed before responding, so it is
+        # streamed to a spool file that the job parses
+        blocks = request_csv_blocks(request.stream, request.headers.get('Content-Type'), max_bytes)
+        path = spool_upload(blocks, current_app.config['JOB_UPLOAD_DIR'])
+        
+        batch_size = request.args.get('batch_size', current_app.config['BULK_IMPORT_CHUNK_SIZE'], type=int)
+        return queue_job('upload_players_csv', params={
+            'path': path,
+            'encoding': encoding,
+            'batch_size': max(1, batch_size),
+            'format': request.args.get('format', MatchFormat.ODI.value)
+        }, message='CSV upload queued for import')
+        
+    except UploadTooLarge as e:
+        remove_spool(path)
+        return jsonify({'error': 'Upload too large', 'message': str(e)}), 413
+    except UploadError as e:
+        remove_spool(path)
+        return jsonify({'error': 'Invalid CSV upload', 'message': str(e)}), 400
     except Exception as e:
+        remove_spool(path)
         db.session.rollback()
         return jsonify({'error': 'Failed to import players', 'message': str(e)}), 500
 
 @admin_bp.route('/players/bulk-statistics', methods=['POST'])
-@jwt_required()
+@admin_required
 def bulk_import_statistics():
-    """Bulk import player statistics (admin only)"""
+    """Bulk import player statistics as a background job (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        
-        if not current_user or current_user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.get_json()
         statistics_data = data.get('statistics', [])
         
         if not statistics_data:
             return jsonify({'error': 'No statistics data provided'}), 400
         
-        imported_count = 0
-        updated_count = 0
-        errors = []
+        chunk_size = request.args.get('chunk_size', current_app.config['BULK_IMPORT_CHUNK_SIZE'], type=int)
+        return queue_job('import_statistics', params={'chunk_size': max(1, chunk_size)}, payload=statistics_data,
+                         message=f'Import of {len(statistics_data)} statistics queued')
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import statistics', 'message': str(e)}), 500
+
+@admin_bp.route('/ingest/csv', methods=['POST'])
+@admin_required
+def ingest_csv_files():
+    """Stream the CSV datasets into players and statistics as a background job (admin only)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        sources = data.get('sources') or list(CSV_SOURCES)
+        unknown = [source for source in sources if source not in CSV_SOURCES]
+        if unknown:
+            return jsonify({'error': f"Unknown sources: {', '.join(map(str, unknown))}",
+                            'available': sorted(CSV_SOURCES)}), 400
+        
+        chunk_size = data.get('chunk_size') or current_app.config['CSV_INGEST_CHUNK_SIZE']
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            return jsonify({'error': 'chunk_size must be a positive integer'}), 400
+        
+        return queue_job('ingest_csv', params={
+            'sources': sources,
+            'chunk_size': chunk_size,
+            'restart': bool(data.get('restart')),
+            'country': data.get('country') or 'Unknown'
+        }, message='CSV ingestion queued')
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to ingest CSV files', 'message': str(e)}), 500
+
+@admin_bp.route('/jobs', methods=['POST'])
+@admin_required
+def create_job():
+    """Queue a background job (admin only)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        kind = data.get('type')
+        params = data.get('params') or {}
+        if kind not in public_job_types():
+            return jsonify({'error': f'Unknown job type {kind}', 'available': public_job_types()}), 400
+        if not isinstance(params, dict):
+            return jsonify({'error': 'params must be an object'}), 400
+        if kind == 'ingest_csv':
+            params.setdefault('sources', list(CSV_SOURCES))
+            if any(source not in CSV_SOURCES for source in params['sources']):
+                return jsonify({'error': 'Unknown CSV source', 'available': sorted(CSV_SOURCES)}), 400
+        
+        return queue_job(kind, params=params, payload=data.get('rows'))
         
-        for stat_data in statistics_data:
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to queue job', 'message': str(e)}), 500
+
+@admin_bp.route('/jobs', methods=['GET'])
+@admin_required
+def get_jobs():
+    """List recent background jobs (admin only)"""
+    try:
+        get_job_runner().recover()
+        query = Job.query
+        status = request.args.get('status')
+        if status:
             try:
-                # Validate required fields
-                required_fields = ['player_id', 'format']
-                for field in required_fields:
-                    if field not in stat_data:
-                        errors.append(f"Statistics for player {stat_data.get('player_id', 'Unknown')}: Missing {field}")
-                        continue
-                
-                # Check if player exists
-                player = Player.query.get(stat_data['player_id'])
-                if not player:
-                    errors.append(f"Player ID {stat_data['player_id']}: Player not found")
-                    continue
-                
-                # Check if statistics already exist
-                existing_stats = PlayerStatistics.query.filter_by(
-                    player_id=stat_data['player_id'],
-                    format=MatchFormat(stat_data['format'])
-                ).first()
-                
-                if existing_stats:
-                    # Update existing statistics
-                    for key, value in stat_data.items():
-                        if key not in ['player_id', 'format'] and hasattr(existing_stats, key):
-                            setattr(existing_stats, key, value)
-                    updated_count += 1
-                else:
-                    # Create new statistics
-                    new_stats = PlayerStatistics(
-                        player_id=stat_data['player_id'],
-                        format=MatchFormat(stat_data['format']),
-                        batting_average=stat_data.get('batting_average'),
-                        bowling_average=stat_data.get('bowling_average'),
-                        strike_rate=stat_data.get('strike_rate'),
-                        economy_rate=stat_data.get('economy_rate'),
-                        recent_form=stat_data.get('recent_form')
-                    )
-                    db.session.add(new_stats)
-                    imported_count += 1
-                
-            except Exception as e:
-                errors.append(f"Statistics for player {stat_data.get('player_id', 'Unknown')}: {str(e)}")
+                query = query.filter(Job.status == JobStatus(status))
+            except ValueError:
+                return jsonify({'error': f'Unknown status {status}'}), 400
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
         
-        db.session.commit()
+        return jsonify({'jobs': job_schema.dump(jobs, many=True)}), 200
         
-        return jsonify({
-            'message': f'Successfully imported {imported_count} new statistics and updated {updated_count} existing',
-            'imported_count': imported_count,
-            'updated_count': updated_count,
-            'errors': errors
-        }), 200
+    except Exception as e:
+        return jsonify({'error': 'Failed to get jobs', 'message': str(e)}), 500
+
+@admin_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@admin_required
+def get_job(job_id):
+    """Status, progress and row counts of a background job (admin only)"""
+    try:
+        get_job_runner().recover()
+        # Updated by the worker thread's session
+        job = db.session.get(Job, job_id, populate_existing=True)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify({'job': job_schema.dump(job)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get job', 'message': str(e)}), 500
+
+@admin_bp.route('/jobs/<int:job_id>/cancel', methods=['POST'])
+@admin_required
+def cancel_job(job_id):
+    """Cancel a queued or running background job (admin only)"""
+    try:
+        job, requested = get_job_runner().cancel(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        if not requested:
+            return jsonify({'error': f'Job already {job.status.value}', 'job': job_schema.dump(job)}), 409
+        
+        return jsonify({'message': 'Cancellation requested', 'job': job_schema.dump(job)}), 202
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': 'Failed to import statistics', 'message': str(e)}), 500
+        return jsonify({'error': 'Failed to cancel job', 'message': str(e)}), 500
 
 @admin_bp.route('/system/health', methods=['GET'])
-@jwt_required()
+@admin_required
 def system_health():
     """Get system health status (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        
-        if not current_user or current_user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         # Check database connectivity
         try:
             db.session.execute('SELECT 1')
@@ -362,4 +362,56 @@ def system_health():
         return jsonify({'health': health_status}), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to check system health', 'message': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': 'Failed to check system health', 'message': str(e)}), 500
+
+@admin_bp.route('/model', methods=['GET'])
+@admin_required
+def get_model_status():
+    """Get prediction model status (admin only)"""
+    try:
+        return jsonify({
+            'model': get_model_registry().status(),
+            'scheduler': get_inference_scheduler().metrics()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get model status', 'message': str(e)}), 500
+
+@admin_bp.route('/cache', methods=['GET'])
+@admin_required
+def get_cache_status():
+    """Get response and verified token cache hit/miss counters (admin only)"""
+    try:
+        return jsonify({'cache': get_response_cache().stats(), 'tokens': get_token_cache().stats()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get cache status', 'message': str(e)}), 500
+
+@admin_bp.route('/rate-limits', methods=['GET'])
+@admin_required
+def get_rate_limits():
+    """Get allowed and rejected login attempt counters (admin only)"""
+    try:
+        return jsonify({'rate_limits': get_rate_limiter().metrics()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to get rate limits', 'message': str(e)}), 500
+
+@admin_bp.route('/model/reload', methods=['POST'])
+@admin_required
+def reload_model():
+    """Hot-reload the prediction model, optionally switching version (admin only)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        registry = get_model_registry()
+        registry.reload(version=data.get('version'))
+        
+        return jsonify({
+            'message': 'Model reloaded successfully',
+            'model': registry.status()
+        }), 200
+        
+    except ModelUnavailable as e:
+        return jsonify({'error': 'Failed to reload model', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Failed to reload model', 'message': str(e)}), 500
@@ -1,29 +1,79 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
 from marshmallow import ValidationError
-from ..app import db, bcrypt
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from ..app import db
 from ..models import User, UserRole
 from ..schemas import UserSchema, UserLoginSchema
+from ..services.authorization import create_user_token, current_user
+from ..services.passwords import PasswordHasherBusy, get_password_hasher
+from ..services.rate_limit import RateLimited, get_rate_limiter, retry_after_header
+from ..services.sessions import (SessionError, refresh_session, revoke_session, revoke_user_sessions,
+                                 start_session)
 
 auth_bp = Blueprint('auth', __name__)
 user_schema = UserSchema()
 user_login_schema = UserLoginSchema()
 
+def busy_response():
+    """503 for a request turned away by the bounded password hasher"""
+    response = jsonify({'error': 'Too many authentication requests, try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def taken_user_field(username=None, email=None, exclude_id=None):
+    """'username' or 'email' when another user already has it, from a single query"""
+    conditions = []
+    if username is not None:
+        conditions.append(User.username == username)
+    if email is not None:
+        conditions.append(User.email == email)
+    if not conditions:
+        return None
+    query = db.session.query(User.username, User.email).filter(or_(*conditions))
+    if exclude_id is not None:
+        query = query.filter(User.id != exclude_id)
+    taken = query.limit(2).all()
+    if any(row.username == username for row in taken):
+        return 'username'
+    if taken:
+        return 'email'
+    return None
+
+def duplicate_user_field(error):
+    """'username' or 'email' for an IntegrityError from its unique constraint, else None"""
+    # SQLite says "users.username", PostgreSQL "users_username_key" and "Key (username)=..."
+    message = str(error.orig)
+    for field in ('username', 'email'):
+        if f'users.{field}' in message or f'users_{field}' in message or f'({field})' in message:
+            return field
+    return None
+
+def duplicate_response(field):
+    """400 for a username or email that belongs to another user"""
+    return jsonify({'error': f'{field.capitalize()} already exists'}), 400
+
+def rate_limited_response(e):
+    """429 for a login attempt over the address or username limit"""
+    response = jsonify({'error': 'Too many login attempts, try again later', 'message': str(e)})
+    response.headers['Retry-After'] = retry_after_header(e.retry_after)
+    return response, 429
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user"""
     try:
         data = user_schema.load(request.get_json())
         
-        # Check if user already exists
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({'error': 'Username already exists'}), 400
-        
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({'error': 'Email already exists'}), 400
+        # Turn away known duplicates before hashing; the unique constraints
+        # settle registrations racing past this check
+        taken = taken_user_field(username=data['username'], email=data['email'])
+        if taken:
+            return duplicate_response(taken)
         
         # Hash password
-        password_hash = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+        password_hash = get_password_hasher().hash(data['password'])
         
         # Create new user
         new_user = User(
@@ -34,24 +84,36 @@ def register():
         )
         
         db.session.add(new_user)
-        db.session.commit()
+        db.session.flush()
         
-        # Create access token
-        access_token = create_access_token(identity=new_user.id)
+        # Start a session and build the response while the row is loaded;
+        # the commit expires it and reading it afterwards would query again
+        access_token, refresh_token = start_session(new_user)
+        user_data = {
+            'id': new_user.id,
+            'username': new_user.username,
+            'email': new_user.email,
+            'role': new_user.role.value
+        }
+        db.session.commit()
         
         return jsonify({
             'message': 'User registered successfully',
             'access_token': access_token,
-            'user': {
-                'id': new_user.id,
-                'username': new_user.username,
-                'email': new_user.email,
-                'role': new_user.role.value
-            }
+            'refresh_token': refresh_token,
+            'user': user_data
         }), 201
         
     except ValidationError as e:
         return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except IntegrityError as e:
+        db.session.rollback()
+        field = duplicate_user_field(e)
+        if field is None:
+            return jsonify({'error': 'Registration failed', 'message': str(e)}), 500
+        return duplicate_response(field)
+    except PasswordHasherBusy:
+        return busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Registration failed', 'message': str(e)}), 500
@@ -60,20 +122,61 @@ def register():
 def login():
     """Login user and return JWT token"""
     try:
-        data = user_login_schema.load(request.get_json())
+        # Turn away over-limit attempts before any query or hashing
+        payload = request.get_json()
+        username = payload.get('username') if isinstance(payload, dict) else None
+        get_rate_limiter().check_login(request.remote_addr, username)
+        
+        data = user_login_schema.load(payload)
         
         # Find user by username
         user = User.query.filter_by(username=data['username']).first()
         
-        if not user or not bcrypt.check_password_hash(user.password_hash, data['password']):
+        hasher = get_password_hasher()
+        if not user or not hasher.check(user.password_hash, data['password']):
             return jsonify({'error': 'Invalid username or password'}), 401
         
-        # Create access token
-        access_token = create_access_token(identity=user.id)
+        # Upgrade hashes made with an outdated cost while the password is at hand
+        if hasher.needs_rehash(user.password_hash):
+            user.password_hash = hasher.hash(data['password'])
+        
+        # Start a session, committed with any rehash
+        access_token, refresh_token = start_session(user)
+        user_data = {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'role': user.role.value
+        }
+        db.session.commit()
         
         return jsonify({
             'message': 'Login successful',
             'access_token': access_token,
+            'refresh_token': refresh_token,
+            'user': user_data
+        }), 200
+        
+    except ValidationError as e:
+        return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except RateLimited as e:
+        return rate_limited_response(e)
+    except PasswordHasherBusy:
+        return busy_response()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Login failed', 'message': str(e)}), 500
+
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    """Exchange a refresh token for a new access token and a new refresh token"""
+    try:
+        user, access_token, refresh_token = refresh_session(get_jwt_identity(), get_jwt())
+        
+        return jsonify({
+            'access_token': access_token,
+            'refresh_token': refresh_token,
             'user': {
                 'id': user.id,
                 'username': user.username,
@@ -82,18 +185,33 @@ def login():
             }
         }), 200
         
-    except ValidationError as e:
-        return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except SessionError as e:
+        db.session.rollback()
+        return jsonify({'error': 'Session expired, please log in again', 'message': str(e)}), 401
     except Exception as e:
-        return jsonify({'error': 'Login failed', 'message': str(e)}), 500
+        db.session.rollback()
+        return jsonify({'error': 'Failed to refresh session', 'message': str(e)}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(refresh=True)
+def logout():
+    """Revoke the session of a refresh token"""
+    try:
+        revoke_session(get_jwt().get('sid'), get_jwt_identity())
+        db.session.commit()
+        
+        return jsonify({'message': 'Logged out successfully'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to log out', 'message': str(e)}), 500
 
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     """Get current user profile"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -117,33 +235,30 @@ def get_profile():
 def update_profile():
     """Update current user profile"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         data = request.get_json()
         
+        # Check both fields against other users at once
+        taken = taken_user_field(username=data.get('username'), email=data.get('email'), exclude_id=user.id)
+        if taken:
+            return duplicate_response(taken)
+        
         # Update allowed fields
         if 'email' in data:
-            # Check if email is already taken by another user
-            existing_user = User.query.filter_by(email=data['email']).first()
-            if existing_user and existing_user.id != user.id:
-                return jsonify({'error': 'Email already exists'}), 400
             user.email = data['email']
         
         if 'username' in data:
-            # Check if username is already taken by another user
-            existing_user = User.query.filter_by(username=data['username']).first()
-            if existing_user and existing_user.id != user.id:
-                return jsonify({'error': 'Username already exists'}), 400
             user.username = data['username']
         
         db.session.commit()
         
         return jsonify({
             'message': 'Profile updated successfully',
+            'access_token': create_user_token(user, get_jwt().get('sid')),  # With the new username claim
             'user': {
                 'id': user.id,
                 'username': user.username,
@@ -153,6 +268,12 @@ def update_profile():
             }
         }), 200
         
+    except IntegrityError as e:
+        db.session.rollback()
+        field = duplicate_user_field(e)
+        if field is None:
+            return jsonify({'error': 'Failed to update profile', 'message': str(e)}), 500
+        return duplicate_response(field)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to update profile', 'message': str(e)}), 500
@@ -162,8 +283,7 @@ def update_profile():
 def change_password():
     """Change user password"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -174,19 +294,23 @@ def change_password():
             return jsonify({'error': 'Current password and new password are required'}), 400
         
         # Verify current password
-        if not bcrypt.check_password_hash(user.password_hash, data['current_password']):
+        hasher = get_password_hasher()
+        if not hasher.check(user.password_hash, data['current_password']):
             return jsonify({'error': 'Current password is incorrect'}), 401
         
         # Validate new password
         if len(data['new_password']) < 6:
             return jsonify({'error': 'New password must be at least 6 characters long'}), 400
         
-        # Hash new password
-        user.password_hash = bcrypt.generate_password_hash(data['new_password']).decode('utf-8')
+        # Hash new password and sign out every other session
+        user.password_hash = hasher.hash(data['new_password'])
+        revoke_user_sessions(user.id, keep=get_jwt().get('sid'))
         db.session.commit()
         
         return jsonify({'message': 'Password changed successfully'}), 200
         
+    except PasswordHasherBusy:
+        return busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to change password', 'message': str(e)}), 500 
\ No newline at end of file
@@ -1,10 +1,15 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, request, jsonify
 from marshmallow import ValidationError
-from sqlalchemy import or_
 from ..app import db
-from ..models import Player, PlayerStatistics, PlayerRole, MatchFormat, User, UserRole
+from ..models import Player, PlayerStatistics, PlayerRole, MatchFormat
 from ..schemas import PlayerSchema, PlayerStatisticsSchema, PlayerWithStatsSchema, PlayerComparisonSchema
+from ..services.authorization import admin_required
+from ..services.leaderboards import refresh_leaderboards, remove_from_leaderboards
+from ..services.player_catalog import CURSOR_ORDERINGS, get_player_catalog
+from ..services.player_search import fuzzy_player_ids
+from ..services.response_cache import cached_response, get_response_cache
+from ..services.score_matrix import get_score_matrix
+from ..utils import validate_pagination_params
 
 players_bp = Blueprint('players', __name__)
 player_schema = PlayerSchema()
@@ -12,6 +17,22 @@ player_stats_schema = PlayerStatisticsSchema()
 player_with_stats_schema = PlayerWithStatsSchema()
 player_comparison_schema = PlayerComparisonSchema()
 
+def update_score_matrix(player_ids=(), deleted_id=None):
+    """Bring the score matrix up to date after a committed write
+
+    The write stands either way, so a failed refresh only drops the matrix
+    for a full rebuild on its next read.
+    """
+    matrix = get_score_matrix()
+    try:
+        if deleted_id is not None:
+            matrix.remove_player(deleted_id)
+        matrix.refresh_players(player_ids)
+    except Exception:
+        db.session.rollback()
+        matrix.invalidate()
+        current_app.logger.exception('Score matrix refresh failed; it is rebuilt on the next read')
+
 @players_bp.route('/', methods=['GET'])
 def get_players():
     """Get all players with optional filtering"""
@@ -22,57 +43,91 @@ def get_players():
         country = request.args.get('country')
         search = request.args.get('search')
         format = request.args.get('format')
+        cursor = request.args.get('cursor')
+        
+        # Served from the in-process catalog; only ?format= statistics hit the database
+        catalog = get_player_catalog().snapshot()
+        rows = catalog.filter(role=PlayerRole(role) if role else None, country=country, search=search)
         
-        query = Player.query
-        
-        # Apply filters
-        if role:
-            query = query.filter(Player.role == PlayerRole(role))
-        if country:
-            query = query.filter(Player.country.ilike(f'%{country}%'))
-        if search:
-            query = query.filter(
-                or_(
-                    Player.name.ilike(f'%{search}%'),
-                    Player.country.ilike(f'%{search}%')
-                )
+        # Pagination: ?cursor= (empty for the first page) switches to keyset mode
+        if cursor is not None:
+            sort = request.args.get('sort', 'id')
+            if sort not in CURSOR_ORDERINGS:
+                return jsonify({'error': f"Invalid sort. Allowed: {', '.join(CURSOR_ORDERINGS)}"}), 400
+            
+            page_data = catalog.keyset_page(
+                rows, sort, cursor,
+                per_page=validate_pagination_params(1, per_page)['per_page'],
+                include_total=request.args.get('include_total', 0, type=int) == 1
             )
+            page_rows = page_data['rows']
+            pagination_data = page_data['pagination']
+        else:
+            pagination = catalog.page(rows, page, per_page)
+            page_rows = pagination['rows']
+            pagination_data = {
+                'page': page,
+                'per_page': per_page,
+                'total': pagination['total'],
+                'pages': pagination['pages'],
+                'has_next': pagination['has_next'],
+                'has_prev': pagination['has_prev']
+            }
         
-        # Pagination
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        players_data = [catalog.serialize(row) for row in page_rows]
         
-        players_data = []
-        for player in pagination.items:
-            player_dict = player_schema.dump(player)
+        # Add statistics if format is specified, fetched for the whole page at once
+        if format and players_data:
+            page_stats = PlayerStatistics.query.filter(
+                PlayerStatistics.player_id.in_([player['id'] for player in players_data]),
+                PlayerStatistics.format == MatchFormat(format)
+            ).all()
+            stats_by_player = {stats.player_id: stats for stats in page_stats}
             
-            # Add statistics if format is specified
-            if format:
-                stats = PlayerStatistics.query.filter_by(
-                    player_id=player.id, format=MatchFormat(format)
-                ).first()
+            for player_dict in players_data:
+                stats = stats_by_player.get(player_dict['id'])
                 if stats:
-                    player_dict['statistics'] = player_stats_schema.dump(stats)
-            
-            players_data.append(player_dict)
+                    player_dict['statistics'] = serialize_statistics(stats)
         
         return jsonify({
             'players': players_data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
+            'pagination': pagination_data
         }), 200
         
+    except ValidationError as e:
+        return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch players', 'message': str(e)}), 500
 
+@players_bp.route('/search', methods=['GET'])
+def search_players_by_name():
+    """Ranked typeahead search over player names"""
+    try:
+        query = request.args.get('q', '')
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        fuzzy = request.args.get('fuzzy', 1, type=int) == 1
+        
+        # Prefix, word prefix and substring matches come from the catalog;
+        # fuzzy matches for the remaining places from the trigram index
+        catalog = get_player_catalog().snapshot()
+        results = catalog.search(query, limit=limit)
+        if fuzzy and len(results) < limit:
+            found = {int(catalog.ids[row]) for row, _ in results}
+            for player_id, score in fuzzy_player_ids(query, limit - len(results), exclude=found):
+                row = catalog.row_of(player_id)
+                if row is not None:
+                    results.append((row, score))
+        
+        return jsonify({
+            'query': query,
+            'players': [dict(catalog.serialize(row), score=score) for row, score in results]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to search players', 'message': str(e)}), 500
+
 @players_bp.route('/<int:player_id>', methods=['GET'])
+@cached_response()
 def get_player(player_id):
     """Get a specific player with statistics"""
     try:
@@ -89,16 +144,10 @@ def get_player(player_id):
         return jsonify({'error': 'Failed to fetch player', 'message': str(e)}), 500
 
 @players_bp.route('/', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_player():
     """Create a new player (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user or user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = player_schema.load(request.get_json())
         
         new_player = Player(
@@ -110,6 +159,8 @@ def create_player():
         
         db.session.add(new_player)
         db.session.commit()
+        get_player_catalog().invalidate()
+        get_response_cache().invalidate()
         
         return jsonify({
             'message': 'Player created successfully',
@@ -123,16 +174,10 @@ def create_player():
         return jsonify({'error': 'Failed to create player', 'message': str(e)}), 500
 
 @players_bp.route('/<int:player_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_player(player_id):
     """Update a player (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user or user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         player = Player.query.get(player_id)
         
         if not player:
@@ -149,8 +194,13 @@ def update_player(player_id):
             player.country = data['country']
         if 'matches_played' in data:
             player.matches_played = data['matches_played']
+        if 'role' in data:
+            refresh_leaderboards([player.id])
         
         db.session.commit()
+        get_player_catalog().invalidate()
+        get_response_cache().invalidate()
+        update_score_matrix([player.id])
         
         return jsonify({
             'message': 'Player updated successfully',
@@ -162,23 +212,21 @@ def update_player(player_id):
         return jsonify({'error': 'Failed to update player', 'message': str(e)}), 500
 
 @players_bp.route('/<int:player_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_player(player_id):
     """Delete a player (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user or user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         player = Player.query.get(player_id)
         
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
+        remove_from_leaderboards(player_id)
         db.session.delete(player)
         db.session.commit()
+        get_player_catalog().invalidate()
+        get_response_cache().invalidate()
+        update_score_matrix(deleted_id=player_id)
         
         return jsonify({'message': 'Player deleted successfully'}), 200
         
@@ -187,16 +235,10 @@ def delete_player(player_id):
         return jsonify({'error': 'Failed to delete player', 'message': str(e)}), 500
 
 @players_bp.route('/<int:player_id>/statistics', methods=['POST'])
-@jwt_required()
+@admin_required
 def add_player_statistics(player_id):
     """Add or update player statistics (admin only)"""
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user or user.role != UserRole.ADMIN:
-            return jsonify({'error': 'Admin access required'}), 403
-        
         player = Player.query.get(player_id)
         
         if not player:
@@ -215,13 +257,17 @@ def add_player_statistics(player_id):
             for key, value in data.items():
                 if key != 'player_id':
                     setattr(existing_stats, key, value)
-            db.session.commit()
             stats = existing_stats
         else:
             # Create new statistics
             stats = PlayerStatistics(**data)
             db.session.add(stats)
-            db.session.commit()
+        
+        refresh_leaderboards([player_id])
+        db.session.commit()
+        
+        get_response_cache().invalidate()
+        update_score_matrix([player_id])
         
         return jsonify({
             'message': 'Player statistics updated successfully',
@@ -275,6 +321,7 @@ def compare_players():
         return jsonify({'error': 'Failed to compare players', 'message': str(e)}), 500
 
 @players_bp.route('/roles', methods=['GET'])
+@cached_response(static=True)
 def get_player_roles():
     """Get all available player roles"""
     return jsonify({
@@ -282,12 +329,33 @@ def get_player_roles():
     }), 200
 
 @players_bp.route('/countries', methods=['GET'])
+@cached_response()
 def get_countries():
     """Get all countries with players"""
     try:
-        countries = db.session.query(Player.country).distinct().all()
         return jsonify({
-            'countries': [country[0] for country in countries]
+            'countries': get_player_catalog().snapshot().countries
         }), 200
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch countries', 'message': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': 'Failed to fetch countries', 'message': str(e)}), 500 
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+def _float(value):
+    return float(value) if value is not None else None
+
+def serialize_statistics(stats):
+    """Serialize player statistics like PlayerStatisticsSchema.dump"""
+    return {
+        'id': stats.id,
+        'player_id': stats.player_id,
+        'format': stats.format.name if stats.format is not None else None,
+        'batting_average': _float(stats.batting_average),
+        'bowling_average': _float(stats.bowling_average),
+        'strike_rate': _float(stats.strike_rate),
+        'economy_rate': _float(stats.economy_rate),
+        'recent_form': _float(stats.recent_form),
+        'created_at': _isoformat(stats.created_at),
+        'updated_at': _isoformat(stats.updated_at)
+    }
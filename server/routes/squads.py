@@ -5,6 +5,7 @@ from sqlalchemy import and_
 from ..app import db
 from ..models import Squad, SquadPlayer, Player, PlayerRole, User
 from ..schemas import SquadSchema, SquadWithPlayersSchema, SquadPlayerSchema
+from ..services.squads import user_squads_query, get_user_squad, squad_members
 
 squads_bp = Blueprint('squads', __name__)
 squad_schema = SquadSchema()
@@ -18,41 +19,8 @@ def get_user_squads():
     try:
         user_id = get_jwt_identity()
         
-        squads = Squad.query.filter_by(user_id=user_id).all()
-        squads_data = []
-        
-        for squad in squads:
-            squad_dict = squad_schema.dump(squad)
-            
-            # Get squad players
-            squad_players = SquadPlayer.query.filter_by(squad_id=squad.id).all()
-            players = []
-            captain = None
-            wicket_keeper = None
-            
-            for squad_player in squad_players:
-                player = Player.query.get(squad_player.player_id)
-                if player:
-                    player_dict = {
-                        'id': player.id,
-                        'name': player.name,
-                        'role': player.role.value,
-                        'country': player.country,
-                        'matches_played': player.matches_played
-                    }
-                    players.append(player_dict)
-                    
-                    # Check if this player is captain or wicket keeper
-                    if squad.captain_id == player.id:
-                        captain = player_dict
-                    if squad.wicket_keeper_id == player.id:
-                        wicket_keeper = player_dict
-            
-            squad_dict['players'] = players
-            squad_dict['captain'] = captain
-            squad_dict['wicket_keeper'] = wicket_keeper
-            
-            squads_data.append(squad_dict)
+        squads = user_squads_query(user_id).all()
+        squads_data = [serialize_squad(squad) for squad in squads]
         
         return jsonify({'squads': squads_data}), 200
         
@@ -65,40 +33,12 @@ def get_squad(squad_id):
     """Get a specific squad with players"""
     try:
         user_id = get_jwt_identity()
-        squad = Squad.query.filter_by(id=squad_id, user_id=user_id).first()
+        squad = get_user_squad(user_id, squad_id)
         
         if not squad:
             return jsonify({'error': 'Squad not found'}), 404
         
-        squad_dict = squad_schema.dump(squad)
-        
-        # Get squad players
-        squad_players = SquadPlayer.query.filter_by(squad_id=squad.id).all()
-        players = []
-        captain = None
-        wicket_keeper = None
-        
-        for squad_player in squad_players:
-            player = Player.query.get(squad_player.player_id)
-            if player:
-                player_dict = {
-                    'id': player.id,
-                    'name': player.name,
-                    'role': player.role.value,
-                    'country': player.country,
-                    'matches_played': player.matches_played
-                }
-                players.append(player_dict)
-                
-                # Check if this player is captain or wicket keeper
-                if squad.captain_id == player.id:
-                    captain = player_dict
-                if squad.wicket_keeper_id == player.id:
-                    wicket_keeper = player_dict
-        
-        squad_dict['players'] = players
-        squad_dict['captain'] = captain
-        squad_dict['wicket_keeper'] = wicket_keeper
+        squad_dict = serialize_squad(squad)
         
         return jsonify({'squad': squad_dict}), 200
         
@@ -362,19 +302,12 @@ def validate_squad(squad_id):
     """Validate squad composition"""
     try:
         user_id = get_jwt_identity()
-        squad = Squad.query.filter_by(id=squad_id, user_id=user_id).first()
+        squad = get_user_squad(user_id, squad_id)
         
         if not squad:
             return jsonify({'error': 'Squad not found'}), 404
         
-        # Get squad players
-        squad_players = SquadPlayer.query.filter_by(squad_id=squad_id).all()
-        players = []
-        
-        for squad_player in squad_players:
-            player = Player.query.get(squad_player.player_id)
-            if player:
-                players.append(player)
+        players = squad_members(squad)
         
         # Validate squad composition
         validation = {
@@ -416,4 +349,33 @@ def validate_squad(squad_id):
         return jsonify({'validation': validation}), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to validate squad', 'message': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': 'Failed to validate squad', 'message': str(e)}), 500 
+
+def serialize_squad(squad):
+    """Serialize an eager-loaded squad with its players, captain and wicket keeper"""
+    squad_dict = squad_schema.dump(squad)
+    players = []
+    captain = None
+    wicket_keeper = None
+    
+    for player in squad_members(squad):
+        player_dict = {
+            'id': player.id,
+            'name': player.name,
+            'role': player.role.value,
+            'country': player.country,
+            'matches_played': player.matches_played
+        }
+        players.append(player_dict)
+        
+        # Check if this player is captain or wicket keeper
+        if squad.captain_id == player.id:
+            captain = player_dict
+        if squad.wicket_keeper_id == player.id:
+            wicket_keeper = player_dict
+    
+    squad_dict['players'] = players
+    squad_dict['captain'] = captain
+    squad_dict['wicket_keeper'] = wicket_keeper
+    
+    return squad_dict
@@ -1,13 +1,16 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
-from sqlalchemy import func, desc
 from ..app import db
 from ..models import (
-    Player, PlayerStatistics, Squad, SquadPlayer, MatchConditions, 
+    PlayerStatistics, Squad, SquadPlayer, MatchConditions, 
     SmartSuggestion, SuggestionPlayer, PlayerRole, MatchFormat, PitchType, Weather
 )
 from ..schemas import MatchConditionsSchema, SmartSuggestionSchema, SquadAnalysisSchema
+from ..services.leaderboards import METRICS as LEADERBOARD_METRICS, player_rank, top_entries
+from ..services.response_cache import cached_response
+from ..services.score_matrix import get_score_matrix
+from ..services.squads import get_user_squad, squad_members
 
 statistics_bp = Blueprint('statistics', __name__)
 match_conditions_schema = MatchConditionsSchema()
@@ -69,13 +72,8 @@ def generate_smart_suggestion():
         squad_players = SquadPlayer.query.filter_by(squad_id=squad_id).all()
         current_player_ids = [sp.player_id for sp in squad_players]
         
-        # Get all available players
-        all_players = Player.query.all()
-        
         # Analyze match conditions and suggest players
-        suggestions = analyze_match_conditions(
-            match_conditions, all_players, current_player_ids
-        )
+        suggestions = analyze_match_conditions(match_conditions, current_player_ids)
         
         # Create smart suggestion record
         reasoning = generate_reasoning(match_conditions, suggestions)
@@ -125,7 +123,7 @@ def analyze_squad():
         user_id = get_jwt_identity()
         data = squad_analysis_schema.load(request.get_json())
         
-        squad = Squad.query.filter_by(id=data['squad_id'], user_id=user_id).first()
+        squad = get_user_squad(user_id, data['squad_id'])
         if not squad:
             return jsonify({'error': 'Squad not found'}), 404
         
@@ -133,36 +131,38 @@ def analyze_squad():
         if not match_conditions:
             return jsonify({'error': 'Match conditions not found'}), 404
         
-        # Get squad players
-        squad_players = SquadPlayer.query.filter_by(squad_id=data['squad_id']).all()
-        players = []
+        # Get statistics for the match format for all squad players at once
+        squad_players = squad_members(squad)
+        stats_by_player = {
+            stats.player_id: stats
+            for stats in PlayerStatistics.query.filter(
+                PlayerStatistics.player_id.in_([player.id for player in squad_players]),
+                PlayerStatistics.format == match_conditions.format
+            ).all()
+        }
         
-        for squad_player in squad_players:
-            player = Player.query.get(squad_player.player_id)
-            if player:
-                # Get player statistics for the match format
-                stats = PlayerStatistics.query.filter_by(
-                    player_id=player.id, format=match_conditions.format
-                ).first()
-                
-                player_data = {
-                    'id': player.id,
-                    'name': player.name,
-                    'role': player.role.value,
-                    'country': player.country,
-                    'statistics': None
+        players = []
+        for player in squad_players:
+            stats = stats_by_player.get(player.id)
+            
+            player_data = {
+                'id': player.id,
+                'name': player.name,
+                'role': player.role.value,
+                'country': player.country,
+                'statistics': None
+            }
+            
+            if stats:
+                player_data['statistics'] = {
+                    'batting_average': stats.batting_average,
+                    'bowling_average': stats.bowling_average,
+                    'strike_rate': stats.strike_rate,
+                    'economy_rate': stats.economy_rate,
+                    'recent_form': stats.recent_form
                 }
-                
-                if stats:
-                    player_data['statistics'] = {
-                        'batting_average': stats.batting_average,
-                        'bowling_average': stats.bowling_average,
-                        'strike_rate': stats.strike_rate,
-                        'economy_rate': stats.economy_rate,
-                        'recent_form': stats.recent_form
-                    }
-                
-                players.append(player_data)
+            
+            players.append(player_data)
         
         # Analyze squad composition
         analysis = analyze_squad_composition(players, match_conditions)
@@ -183,30 +183,15 @@ def analyze_squad():
         return jsonify({'error': 'Failed to analyze squad', 'message': str(e)}), 500
 
 @statistics_bp.route('/top-players', methods=['GET'])
+@cached_response()
 def get_top_players():
-    """Get top players by statistics"""
+    """Get top players by statistics, read from the materialized leaderboards"""
     try:
-        format = request.args.get('format', 'T20')
-        role = request.args.get('role')
+        match_format, role, metric, descending = leaderboard_args()
         limit = request.args.get('limit', 10, type=int)
+        offset = max(request.args.get('offset', 0, type=int), 0)
         
-        query = db.session.query(Player, PlayerStatistics).join(
-            PlayerStatistics, Player.id == PlayerStatistics.player_id
-        ).filter(PlayerStatistics.format == MatchFormat(format))
-        
-        if role:
-            query = query.filter(Player.role == PlayerRole(role))
-        
-        # Order by batting average for batsmen, bowling average for bowlers
-        if role == 'Batsman':
-            query = query.order_by(desc(PlayerStatistics.batting_average))
-        elif role == 'Bowler':
-            query = query.order_by(desc(PlayerStatistics.bowling_average))
-        else:
-            # For all-rounders or general, use a combination
-            query = query.order_by(desc(PlayerStatistics.batting_average))
-        
-        results = query.limit(limit).all()
+        results = top_entries(match_format, metric, role=role, descending=descending, limit=limit, offset=offset)
         
         top_players = []
         for player, stats in results:
@@ -225,12 +210,49 @@ def get_top_players():
             }
             top_players.append(player_data)
         
-        return jsonify({'top_players': top_players}), 200
+        return jsonify({
+            'top_players': top_players,
+            'metric': metric,
+            'order': 'desc' if descending else 'asc'
+        }), 200
         
+    except ValidationError as e:
+        return jsonify({'error': 'Validation error', 'details': e.messages}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch top players', 'message': str(e)}), 500
 
+@statistics_bp.route('/top-players/rank', methods=['GET'])
+@cached_response()
+def get_player_rank():
+    """Where a player ranks on a leaderboard"""
+    try:
+        player_id = request.args.get('player_id', type=int)
+        if player_id is None:
+            return jsonify({'error': 'player_id is required'}), 400
+        
+        match_format, role, metric, descending = leaderboard_args()
+        rank = player_rank(player_id, match_format, metric, role=role, descending=descending,
+                           include_total=request.args.get('include_total', 0, type=int) == 1)
+        
+        if rank is None:
+            return jsonify({'error': 'Player is not ranked on this leaderboard'}), 404
+        
+        return jsonify({
+            'player_id': player_id,
+            'format': match_format.value,
+            'role': role.value if role else None,
+            'metric': metric,
+            'order': 'desc' if descending else 'asc',
+            **rank
+        }), 200
+        
+    except ValidationError as e:
+        return jsonify({'error': 'Validation error', 'details': e.messages}), 400
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch player rank', 'message': str(e)}), 500
+
 @statistics_bp.route('/formats', methods=['GET'])
+@cached_response(static=True)
 def get_match_formats():
     """Get all available match formats"""
     return jsonify({
@@ -238,6 +260,7 @@ def get_match_formats():
     }), 200
 
 @statistics_bp.route('/pitch-types', methods=['GET'])
+@cached_response(static=True)
 def get_pitch_types():
     """Get all available pitch types"""
     return jsonify({
@@ -245,88 +268,46 @@ def get_pitch_types():
     }), 200
 
 @statistics_bp.route('/weather-conditions', methods=['GET'])
+@cached_response(static=True)
 def get_weather_conditions():
     """Get all available weather conditions"""
     return jsonify({
         'weather_conditions': [weather.value for weather in Weather]
     }), 200
 
-def analyze_match_conditions(match_conditions, all_players, current_player_ids):
-    """Analyze match conditions and suggest players"""
-    suggestions = []
-    
-    for player in all_players:
-        if player.id in current_player_ids:
-            continue  # Skip players already in squad
-        
-        # Get player statistics for the match format
-        stats = PlayerStatistics.query.filter_by(
-            player_id=player.id, format=match_conditions.format
-        ).first()
-        
-        if not stats:
-            continue
-        
-        score = calculate_player_score(player, stats, match_conditions)
-        
-        if score > 0:
-            suggestions.append({
-                'id': player.id,
-                'name': player.name,
-                'role': player.role.value,
-                'country': player.country,
-                'score': score,
-                'statistics': {
-                    'batting_average': stats.batting_average,
-                    'bowling_average': stats.bowling_average,
-                    'strike_rate': stats.strike_rate,
-                    'economy_rate': stats.economy_rate,
-                    'recent_form': stats.recent_form
-                }
-            })
-    
-    # Sort by score (highest first)
-    suggestions.sort(key=lambda x: x['score'], reverse=True)
-    
-    return suggestions[:10]  # Return top 10 suggestions
+def leaderboard_args():
+    """(format, role, metric, descending) of a leaderboard request
 
-def calculate_player_score(player, stats, match_conditions):
-    """Calculate player suitability score based on match conditions"""
-    score = 0
+    Without ?metric= the legacy ordering applies: bowlers by bowling average,
+    everyone else by batting average, both descending.
+    """
+    match_format = MatchFormat(request.args.get('format', 'T20'))
+    role = request.args.get('role')
+    metric = request.args.get('metric')
+    order = request.args.get('order')
     
-    # Base score from recent form
-    if stats.recent_form:
-        score += stats.recent_form * 0.3
+    if metric is None:
+        metric = 'bowling_average' if role == 'Bowler' else 'batting_average'
+        descending = True
+    elif metric not in LEADERBOARD_METRICS:
+        raise ValidationError({'metric': [f"Must be one of: {', '.join(LEADERBOARD_METRICS)}"]})
+    else:
+        descending = LEADERBOARD_METRICS[metric]
+    if order is not None:
+        if order not in ('asc', 'desc'):
+            raise ValidationError({'order': ['Must be asc or desc']})
+        descending = order == 'desc'
     
-    # Format-specific scoring
-    if match_conditions.format == MatchFormat.T20:
-        if stats.strike_rate:
-            score += stats.strike_rate * 0.2
-        if stats.economy_rate:
-            score += (50 - stats.economy_rate) * 0.1  # Lower economy is better
-    elif match_conditions.format == MatchFormat.TEST:
-        if stats.batting_average:
-            score += stats.batting_average * 0.4
-        if stats.bowling_average:
-            score += (50 - stats.bowling_average) * 0.3  # Lower average is better
-    
-    # Pitch type considerations
-    if match_conditions.pitch_type == PitchType.BATTING:
-        if player.role == PlayerRole.BATSMAN and stats.batting_average:
-            score += stats.batting_average * 0.3
-    elif match_conditions.pitch_type == PitchType.BOWLING:
-        if player.role == PlayerRole.BOWLER and stats.bowling_average:
-            score += (50 - stats.bowling_average) * 0.3
-    elif match_conditions.pitch_type == PitchType.SPIN_FRIENDLY:
-        if player.role == PlayerRole.BOWLER:
-            score += 20  # Bonus for bowlers on spin-friendly pitches
-    
-    # Weather considerations
-    if match_conditions.weather == Weather.RAINY:
-        if player.role == PlayerRole.BOWLER:
-            score += 15  # Bowlers get advantage in rainy conditions
-    
-    return max(0, score)
+    return match_format, PlayerRole(role) if role else None, metric, descending
+
+def analyze_match_conditions(match_conditions, current_player_ids, limit=10):
+    """Analyze match conditions and suggest players"""
+    # Scores are precomputed for every condition combination, so this is a
+    # column read plus a top-k rather than a database scan
+    return get_score_matrix().suggest(
+        match_conditions.format, match_conditions.pitch_type, match_conditions.weather,
+        exclude_ids=current_player_ids, limit=limit
+    )
 
 def generate_reasoning(match_conditions, suggestions):
     """Generate reasoning for suggestions"""
@@ -1,5 +1,5 @@
 from marshmallow import Schema, fields, validate, ValidationError
-from .models import PlayerRole, MatchFormat, PitchType, Weather, UserRole
+from .models import PlayerRole, MatchFormat, PitchType, Weather, UserRole, JobStatus
 
 class UserSchema(Schema):
     id = fields.Int(dump_only=True)
@@ -90,6 +90,30 @@ class SquadAnalysisSchema(Schema):
     squad_id = fields.Int(required=True)
     match_conditions_id = fields.Int(required=True)
 
+class JobSchema(Schema):
+    id = fields.Int(dump_only=True)
+    kind = fields.Str(dump_only=True)
+    status = fields.Enum(JobStatus, by_value=True, dump_only=True)
+    params = fields.Dict(dump_only=True)
+    result = fields.Raw(dump_only=True)
+    error = fields.Str(dump_only=True)
+    rows_total = fields.Int(dump_only=True)
+    rows_processed = fields.Int(dump_only=True)
+    progress = fields.Method('get_progress', dump_only=True)
+    cancel_requested = fields.Bool(dump_only=True)
+    created_by = fields.Int(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    started_at = fields.DateTime(dump_only=True)
+    finished_at = fields.DateTime(dump_only=True)
+
+    def get_progress(self, job):
+        """Fraction of rows processed, when the total is known"""
+        if job.status == JobStatus.SUCCEEDED:
+            return 1.0
+        if not job.rows_total:
+            return None
+        return round(min(job.rows_processed / job.rows_total, 1.0), 4)
+
 # Response schemas
 class SuccessResponseSchema(Schema):
     message = fields.Str(required=True)
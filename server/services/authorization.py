@@ -0,0 +1,115 @@
+"""
+Authorization checks for JWT-protected routes.
+
+current_user() loads the user behind the request's token once and keeps it
+on flask.g. admin_required replaces the per-route "load the user, compare
+the role" block.
+
+Tokens issued by create_user_token() carry the user's role and token
+version as claims. An admin check on such a token needs no query: a
+non-admin role is rejected outright, and an admin role is accepted only
+while the admin roster (ids and token versions of the current admins, held
+per process) lists the user with the same version. Changing a user's role
+bumps users.token_version, so a token from before a demotion stays invalid
+even after a later promotion. The roster is reloaded after role changes and
+deletes: every admin check reads the shared admins version, which those
+writes bump in their own transaction (see counters.py), with one primary
+key lookup, so changes made by other workers apply to the next request.
+Writes that bypass the session (manual SQL) apply within
+AUTH_ROSTER_MAX_AGE seconds. Tokens without the claims fall back to the
+database through current_user().
+"""
+
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, jsonify
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, jwt_required
+from ..app import db
+from ..models import User, UserRole
+from .counters import ADMINS_VERSION, read_version
+
+def create_user_token(user, session_id=None):
+    """Access token for user, with the username, role and token version claims
+
+    session_id, the refresh token session the token was issued for, is
+    added as the `sid` claim.
+    """
+    claims = {
+        'username': user.username,
+        'role': user.role.value,
+        'ver': user.token_version or 0
+    }
+    if session_id is not None:
+        claims['sid'] = session_id
+    return create_access_token(identity=user.id, additional_claims=claims)
+
+class AdminRoster:
+    """Versioned in-process map of admin user id -> token version"""
+
+    def __init__(self, max_age=30):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = 0
+        self._loaded = None  # (version, shared version, loaded_at, {user_id: token_version})
+
+    def invalidate(self):
+        """Call after committing a role change or user delete; the next check reloads"""
+        with self._lock:
+            self._version += 1
+
+    def _stale(self, loaded, shared_version):
+        return loaded is None or loaded[0] != self._version or loaded[1] != shared_version or (
+            self.max_age is not None and time.monotonic() - loaded[2] > self.max_age
+        )
+
+    def admins(self):
+        """{user_id: token_version} of the current admins, reloaded when stale"""
+        shared_version = read_version(ADMINS_VERSION)  # Before the users, as in the player catalog
+        loaded = self._loaded
+        if not self._stale(loaded, shared_version):
+            return loaded[3]
+        with self._lock:
+            if self._stale(self._loaded, shared_version):
+                version = self._version
+                users = User.__table__.c
+                rows = db.session.connection().execute(
+                    db.select(users.id, users.token_version).where(users.role == UserRole.ADMIN)
+                )
+                self._loaded = (version, shared_version, time.monotonic(),
+                                {user_id: token_version or 0 for user_id, token_version in rows})
+            return self._loaded[3]
+
+def get_admin_roster():
+    """Admin roster of the current application"""
+    return current_app.extensions['admin_roster']
+
+def current_user():
+    """User of the request's token, loaded at most once per request; None when deleted"""
+    # Keyed on the decoded token, which is new for every request, since an
+    # app context (and so g) may outlive a request
+    claims = get_jwt()
+    cached = g.get('current_user')
+    if cached is None or cached[0] is not claims:
+        cached = g.current_user = (claims, db.session.get(User, get_jwt_identity()))
+    return cached[1]
+
+def is_admin():
+    """Whether the request's token belongs to an admin"""
+    claims = get_jwt()
+    if 'role' in claims and 'ver' in claims:
+        if claims['role'] != UserRole.ADMIN.value:
+            return False
+        return get_admin_roster().admins().get(get_jwt_identity()) == claims['ver']
+    user = current_user()
+    return user is not None and user.role == UserRole.ADMIN
+
+def admin_required(view):
+    """jwt_required() plus a 403 for anyone but an admin"""
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not is_admin():
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
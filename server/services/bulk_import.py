@@ -0,0 +1,251 @@
+"""
+Set-based bulk imports for players and statistics.
+
+Rows are validated in memory against data prefetched in a single query, then
+written with multi-row INSERT statements in fixed-size chunks, instead of one
+lookup and one ORM object per row.
+"""
+
+import numbers
+from datetime import datetime
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from ..app import db
+from ..models import Player, PlayerStatistics, PlayerRole, MatchFormat
+from .counters import increment_counters, player_deltas
+from .leaderboards import refresh_leaderboards
+
+DEFAULT_CHUNK_SIZE = 1000
+
+STATISTICS_FIELDS = ['batting_average', 'bowling_average', 'strike_rate', 'economy_rate', 'recent_form']
+
+# Dialects supporting INSERT ... ON CONFLICT (...) DO UPDATE ... RETURNING
+UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def validate_player_row(row):
+    """Return (mapping, error) for one incoming player row"""
+    if not isinstance(row, dict):
+        return None, 'Invalid row'
+
+    missing = [field for field in ('name', 'role', 'country') if row.get(field) is None]
+    if missing:
+        return None, f"Missing {', '.join(missing)}"
+
+    name = str(row['name'])
+    country = str(row['country'])
+    if len(name) > 100:
+        return None, 'Name is longer than 100 characters'
+    if len(country) > 50:
+        return None, 'Country is longer than 50 characters'
+
+    try:
+        role = PlayerRole(row['role'])
+    except ValueError:
+        return None, f"Invalid role {row['role']}"
+
+    matches_played = row.get('matches_played', 0) or 0
+    if not isinstance(matches_played, int) or isinstance(matches_played, bool) or matches_played < 0:
+        return None, 'matches_played must be a non-negative integer'
+
+    return {'name': name, 'role': role, 'country': country, 'matches_played': matches_played}, None
+
+def load_player_names():
+    """Names of all players, in one query"""
+    return {name for (name,) in db.session.query(Player.name)}
+
+def import_players(rows, chunk_size=DEFAULT_CHUNK_SIZE, existing_names=None):
+    """Insert new players, skipping names that already exist.
+
+    existing_names lets a caller importing several batches load the names
+    once; it is updated with the imported names. Returns imported_count, the
+    imported mappings and a list of per-row errors
+    ({'row': index, 'name': ..., 'error': ...}).
+    """
+    # One query for every existing name instead of one lookup per row
+    if existing_names is None:
+        existing_names = load_player_names()
+
+    mappings = []
+    errors = []
+    for index, row in enumerate(rows):
+        mapping, error = validate_player_row(row)
+        if mapping and mapping['name'] in existing_names:
+            error = 'Already exists'
+        if error:
+            name = row.get('name', 'Unknown') if isinstance(row, dict) else 'Unknown'
+            errors.append({'row': index, 'name': name, 'error': error})
+            continue
+
+        existing_names.add(mapping['name'])  # Later duplicates in the same import are rejected too
+        mappings.append(mapping)
+
+    for chunk in _chunks(mappings, chunk_size):
+        db.session.execute(insert(Player), chunk)
+    increment_counters(player_deltas(mappings))
+
+    return {'imported_count': len(mappings), 'players': mappings, 'errors': errors}
+
+def validate_statistics_row(row):
+    """Return (mapping, error) for one incoming statistics row.
+
+    The mapping only holds the statistics fields present in the row, so an
+    update leaves the other columns untouched.
+    """
+    if not isinstance(row, dict):
+        return None, 'Invalid row'
+
+    missing = [field for field in ('player_id', 'format') if row.get(field) is None]
+    if missing:
+        return None, f"Missing {', '.join(missing)}"
+
+    player_id = row['player_id']
+    if not isinstance(player_id, int) or isinstance(player_id, bool):
+        return None, 'player_id must be an integer'
+
+    try:
+        match_format = MatchFormat(row['format'])
+    except ValueError:
+        return None, f"Invalid format {row['format']}"
+
+    mapping = {'player_id': player_id, 'format': match_format}
+    for field in STATISTICS_FIELDS:
+        if field not in row:
+            continue
+        value = row[field]
+        if value is not None and (
+            not isinstance(value, numbers.Number) or isinstance(value, bool) or value < 0
+        ):
+            return None, f'{field} must be a non-negative number'
+        mapping[field] = value
+
+    return mapping, None
+
+def upsert_statistics(mappings, fields, now):
+    """Upsert statistics rows that carry the same fields; returns (inserted, updated).
+
+    One INSERT ... ON CONFLICT (player_id, format) DO UPDATE statement on the
+    _player_format_uc constraint. Inserted rows are told apart from updated
+    ones through RETURNING: a new row still has created_at == updated_at.
+    Other dialects look the keys up first and run an UPDATE and an INSERT.
+    """
+    table = PlayerStatistics.__table__
+    values = [
+        dict({field: mapping.get(field) for field in STATISTICS_FIELDS},
+             player_id=mapping['player_id'], format=mapping['format'], created_at=now, updated_at=now)
+        for mapping in mappings
+    ]
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in UPSERT_INSERTS:
+        return _update_then_insert_statistics(values, fields, now)
+
+    statement = UPSERT_INSERTS[dialect](table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.player_id, table.c.format],
+        set_=dict({field: statement.excluded[field] for field in fields}, updated_at=statement.excluded.updated_at)
+    ).returning(table.c.created_at == table.c.updated_at)
+
+    # executemany with RETURNING is batched into multi-row VALUES by SQLAlchemy
+    # while the compiled statement stays cached between chunks
+    results = db.session.execute(statement, values).scalars().all()
+    inserted = sum(1 for was_inserted in results if was_inserted)
+    return inserted, len(results) - inserted
+
+def _update_then_insert_statistics(values, fields, now):
+    """upsert_statistics() without ON CONFLICT: one lookup, then an UPDATE and an INSERT"""
+    table = PlayerStatistics.__table__
+    existing = {
+        (player_id, match_format): statistics_id
+        for statistics_id, player_id, match_format in db.session.execute(
+            select(table.c.id, table.c.player_id, table.c.format).where(
+                table.c.player_id.in_({row['player_id'] for row in values}),
+                table.c.format.in_({row['format'] for row in values})
+            )
+        )
+    }
+    updates = [
+        dict({f'new_{field}': row[field] for field in fields},
+             statistics_id=existing[row['player_id'], row['format']], new_updated_at=now)
+        for row in values if (row['player_id'], row['format']) in existing
+    ]
+    inserts = [row for row in values if (row['player_id'], row['format']) not in existing]
+    if updates:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('statistics_id')).values(
+                dict({field: bindparam(f'new_{field}') for field in fields}, updated_at=bindparam('new_updated_at'))
+            ),
+            updates
+        )
+    if inserts:
+        db.session.execute(insert(table), inserts)
+    return len(inserts), len(updates)
+
+def load_player_ids():
+    """Ids of all players, in one query"""
+    return {player_id for (player_id,) in db.session.query(Player.id)}
+
+def import_statistics(rows, chunk_size=DEFAULT_CHUNK_SIZE, player_ids=None):
+    """Insert or update statistics keyed on (player_id, format).
+
+    player_ids lets a caller importing several batches load the ids once.
+    Returns imported_count, updated_count, the ids of the touched players and
+    a list of per-row errors ({'row': index, 'player_id': ..., 'error': ...}).
+    """
+    # One query for every valid player id instead of one lookup per row
+    if player_ids is None:
+        player_ids = load_player_ids()
+
+    # A later row for the same (player_id, format) overrides the fields of an
+    # earlier one, as applying them one after another would
+    merged = {}
+    errors = []
+    for index, row in enumerate(rows):
+        mapping, error = validate_statistics_row(row)
+        if mapping and mapping['player_id'] not in player_ids:
+            error = 'Player not found'
+        if error:
+            player_id = row.get('player_id', 'Unknown') if isinstance(row, dict) else 'Unknown'
+            errors.append({'row': index, 'player_id': player_id, 'error': error})
+            continue
+
+        key = (mapping['player_id'], mapping['format'])
+        merged[key] = dict(merged.get(key, {}), **mapping)
+
+    imported_count, updated_count = write_statistics(list(merged.values()), chunk_size)
+
+    return {
+        'imported_count': imported_count,
+        'updated_count': updated_count,
+        'player_ids': {player_id for player_id, _ in merged},
+        'errors': errors
+    }
+
+def write_statistics(mappings, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Upsert validated statistics mappings (unique per key); returns (inserted, updated)
+
+    The leaderboard entries of the touched players are rewritten, and the
+    statistics counter moved by the inserted rows, in the same transaction.
+    """
+    # DO UPDATE sets the same columns for every row of a statement, so rows
+    # are grouped by the statistics fields they carry
+    groups = {}
+    for mapping in mappings:
+        fields = tuple(field for field in STATISTICS_FIELDS if field in mapping)
+        groups.setdefault(fields, []).append(mapping)
+
+    now = datetime.utcnow()
+    imported_count = updated_count = 0
+    for fields, group in groups.items():
+        for chunk in _chunks(group, chunk_size):
+            inserted, updated = upsert_statistics(chunk, fields, now)
+            imported_count += inserted
+            updated_count += updated
+    refresh_leaderboards(mapping['player_id'] for mapping in mappings)
+    increment_counters({'player_statistics': imported_count})
+    return imported_count, updated_count
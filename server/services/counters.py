@@ -0,0 +1,243 @@
+"""
+Row counts behind GET /api/admin/statistics.
+
+system_counters holds one row per figure of the admin dashboard: users,
+admins, players, players per role, squads and statistics records, plus the
+users and squads created per UTC day for the recent activity figures. The
+dashboard reads them all in one query instead of counting the tables.
+
+ORM writes are counted by an after_flush hook on the session, so every route
+that adds, deletes or re-roles users, players, squads or statistics moves the
+counters inside its own transaction. The bulk paths insert with Core
+statements the hook does not see and call increment_counters() themselves.
+
+reconcile_counters() recounts the tables and overwrites the counters, which
+corrects drift from writes that bypass both (manual SQL, or an increment
+lost to a concurrent reconciliation) and drops day buckets that left the
+recent window. Run it nightly with `flask reconcile-counters` or the
+reconcile_counters job.
+
+The same hook moves version counters: PLAYERS_VERSION goes up with every
+transaction that writes players, ADMINS_VERSION with every one that adds,
+deletes, re-roles or revokes the tokens of an admin. In-process caches of a table read their
+version (one primary key lookup) to notice writes made by other workers.
+Versions are not row counts, so reconciliation leaves them alone.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, func, inspect, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from ..app import db
+from ..models import Player, PlayerRole, PlayerStatistics, Squad, SystemCounter, User, UserRole
+
+# Days before today whose creation buckets count as recent activity
+RECENT_DAYS = 7
+
+# Version counters, bumped by writes to a table and never reconciled
+VERSION_PREFIX = 'version.'
+PLAYERS_VERSION = VERSION_PREFIX + 'players'
+ADMINS_VERSION = VERSION_PREFIX + 'admins'
+
+# Dialects supporting INSERT ... ON CONFLICT (...) DO UPDATE; bulk_import
+# has the same map but imports this module
+UPSERT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert
+}
+
+def _bucket(kind, day):
+    return f'{kind}.created.{day:%Y-%m-%d}'
+
+def _window_start(now):
+    """Midnight of the oldest day in the recent window"""
+    return datetime.combine((now - timedelta(days=RECENT_DAYS)).date(), datetime.min.time())
+
+def _expired(name, since):
+    return '.created.' in name and name.rsplit('.', 1)[1] < f'{since:%Y-%m-%d}'
+
+def player_deltas(mappings):
+    """Counter changes for inserting player mappings ({'role': PlayerRole, ...})"""
+    deltas = Counter(f"players.role.{mapping['role'].name}" for mapping in mappings)
+    deltas['players'] = len(mappings)
+    deltas[PLAYERS_VERSION] = 1 if mappings else 0
+    return deltas
+
+def _apply(connection, deltas):
+    rows = [{'name': name, 'value': change} for name, change in sorted(deltas.items()) if change]
+    if not rows:
+        return
+    table = SystemCounter.__table__
+    dialect = connection.dialect.name
+    if dialect not in UPSERT_INSERTS:
+        # Plain UPDATE, then INSERT for the names that have no row yet
+        for row in rows:
+            updated = connection.execute(
+                update(table).where(table.c.name == row['name']).values(value=table.c.value + row['value'])
+            ).rowcount
+            if not updated:
+                connection.execute(insert(table), row)
+        return
+
+    statement = UPSERT_INSERTS[dialect](table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.name], set_={'value': table.c.value + statement.excluded.value}
+    )
+    # Rows in name order, so concurrent writers lock them in the same order
+    connection.execute(statement, rows)
+
+def increment_counters(deltas):
+    """Add {name: change} to the counters in the current transaction"""
+    _apply(db.session.connection(), deltas)
+
+def read_version(name):
+    """Current value of a version counter, 0 before the first write"""
+    table = SystemCounter.__table__
+    return db.session.connection().execute(
+        db.select(table.c.value).where(table.c.name == name)
+    ).scalar() or 0
+
+def _count_object(obj, sign, deltas, since):
+    if isinstance(obj, User):
+        deltas['users'] += sign
+        deltas['users.admin'] += sign if obj.role == UserRole.ADMIN else 0
+        if obj.role == UserRole.ADMIN:
+            deltas[ADMINS_VERSION] = 1
+        created = obj.created_at or datetime.utcnow()
+        if created >= since:
+            deltas[_bucket('users', created)] += sign
+    elif isinstance(obj, Player):
+        deltas['players'] += sign
+        deltas[f'players.role.{obj.role.name}'] += sign
+        deltas[PLAYERS_VERSION] = 1
+    elif isinstance(obj, Squad):
+        deltas['squads'] += sign
+        created = obj.created_at or datetime.utcnow()
+        if created >= since:
+            deltas[_bucket('squads', created)] += sign
+    elif isinstance(obj, PlayerStatistics):
+        deltas['player_statistics'] += sign
+
+def _count_role_change(obj, deltas):
+    history = inspect(obj).attrs.role.history
+    if not history.added or not history.deleted:
+        return
+    old, new = history.deleted[0], history.added[0]
+    if isinstance(obj, User):
+        deltas['users.admin'] += (new == UserRole.ADMIN) - (old == UserRole.ADMIN)
+    else:
+        deltas[f'players.role.{old.name}'] -= 1
+        deltas[f'players.role.{new.name}'] += 1
+
+def _roster_changed(user):
+    """Whether a flushed user changed what the admin roster holds for it"""
+    attrs = inspect(user).attrs
+    return attrs.role.history.has_changes() or attrs.token_version.history.has_changes()
+
+@event.listens_for(db.session, 'after_flush')
+def _count_flushed(session, flush_context):
+    """Move the counters by the rows the flush inserted, deleted or re-roled"""
+    deltas = Counter()
+    since = _window_start(datetime.utcnow())
+    for obj in session.new:
+        _count_object(obj, 1, deltas, since)
+    for obj in session.deleted:
+        _count_object(obj, -1, deltas, since)
+    for obj in session.dirty:
+        if isinstance(obj, (User, Player)) and obj not in session.deleted:
+            _count_role_change(obj, deltas)
+        if isinstance(obj, Player) and session.is_modified(obj):
+            deltas[PLAYERS_VERSION] = 1
+        elif isinstance(obj, User) and _roster_changed(obj):
+            deltas[ADMINS_VERSION] = 1
+    _apply(session.connection(), deltas)
+
+def read_counters():
+    """All counters but the versions as {name: value}, in one query"""
+    return dict(db.session.query(SystemCounter.name, SystemCounter.value)
+                .filter(SystemCounter.name.not_like(VERSION_PREFIX + '%')))
+
+def recount_counters(now=None):
+    """Exact counter values, counted from the tables"""
+    since = _window_start(now or datetime.utcnow())
+    counts = {
+        'users': User.query.count(),
+        'users.admin': User.query.filter_by(role=UserRole.ADMIN).count(),
+        'players': Player.query.count(),
+        'squads': Squad.query.count(),
+        'player_statistics': PlayerStatistics.query.count()
+    }
+    for role, count in db.session.query(Player.role, func.count(Player.id)).group_by(Player.role):
+        counts[f'players.role.{role.name}'] = count
+    for kind, model in (('users', User), ('squads', Squad)):
+        day = func.date(model.created_at)
+        created = db.session.query(day, func.count(model.id)).filter(model.created_at >= since).group_by(day)
+        for created_on, count in created:
+            counts[f'{kind}.created.{created_on}'] = count
+    return counts
+
+def reconcile_counters():
+    """Overwrite the counters with a recount; the caller commits.
+
+    Returns (exact counts, {name: (stored, exact)} of the counters that were
+    off). Day buckets dropped for leaving the recent window are not drift.
+    """
+    since = _window_start(datetime.utcnow())
+    exact = recount_counters()
+    stored = read_counters()
+    drift = {
+        name: (stored.get(name, 0), exact.get(name, 0))
+        for name in sorted(set(stored) | set(exact))
+        if stored.get(name, 0) != exact.get(name, 0) and not _expired(name, since)
+    }
+
+    table = SystemCounter.__table__
+    db.session.execute(delete(table).where(table.c.name.not_like(VERSION_PREFIX + '%')))
+    db.session.execute(insert(table), [{'name': name, 'value': value} for name, value in exact.items()])
+    return exact, drift
+
+def system_statistics(exact=False):
+    """Figures of the admin dashboard, from the counters or, with exact, from a recount
+
+    The exact figures also correct the counters and count recent activity
+    over the last 7 * 24 hours rather than by day; the caller commits.
+    """
+    now = datetime.utcnow()
+    if exact:
+        counters = reconcile_counters()[0]
+        week_ago = now - timedelta(days=RECENT_DAYS)
+        recent = {
+            'users': User.query.filter(User.created_at >= week_ago).count(),
+            'squads': Squad.query.filter(Squad.created_at >= week_ago).count()
+        }
+    else:
+        counters = read_counters()
+        recent = {
+            kind: sum(counters.get(_bucket(kind, now - timedelta(days=days)), 0) for days in range(RECENT_DAYS + 1))
+            for kind in ('users', 'squads')
+        }
+
+    total_users = counters.get('users', 0)
+    admin_users = counters.get('users.admin', 0)
+    return {
+        'users': {
+            'total': total_users,
+            'admins': admin_users,
+            'regular': total_users - admin_users,
+            'recent_registrations': recent['users']
+        },
+        'players': {
+            'total': counters.get('players', 0),
+            'by_role': {
+                role.value: counters[f'players.role.{role.name}']
+                for role in PlayerRole if counters.get(f'players.role.{role.name}')
+            }
+        },
+        'squads': {
+            'total': counters.get('squads', 0),
+            'recent_created': recent['squads']
+        },
+        'statistics': {
+            'total_records': counters.get('player_statistics', 0)
+        }
+    }
@@ -0,0 +1,314 @@
+"""
+Streaming ingestion of the CSV datasets in public/ into players and statistics.
+
+Files are read through a generator in fixed-size chunks, so memory does not
+grow with the file. Each chunk is reduced to per-player partial sums that are
+added to player_statistics_totals, the PlayerStatistics of the touched
+players are recomputed from those totals, and the checkpoint of the source
+moves forward, all in one transaction. A failed run resumes after the last
+committed chunk without counting any row twice.
+"""
+
+import csv
+import os
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from ..app import db
+from ..models import Player, PlayerRole, PlayerStatisticsTotals, IngestionCheckpoint, MatchFormat
+from .bulk_import import DEFAULT_CHUNK_SIZE, UPSERT_INSERTS, validate_player_row, write_statistics
+from .counters import increment_counters, player_deltas
+from .player_catalog import get_player_catalog
+from .response_cache import get_response_cache
+from .score_matrix import get_score_matrix
+
+TOTAL_COLUMNS = ['innings', 'runs', 'dismissals', 'balls_faced', 'balls_bowled', 'runs_conceded', 'wickets']
+
+MAX_ROW_ERRORS = 100
+
+def normalize_name(name):
+    """Player name key, as train_model.ipynb does with .str.strip().str.lower()"""
+    return name.strip().lower()
+
+def overs_to_balls(overs):
+    """'6.2' overs -> 38 balls"""
+    whole, _, part = str(overs).strip().partition('.')
+    balls = int(part) if part else 0
+    if balls > 5:
+        raise ValueError(f'Invalid overs {overs}')
+    return int(whole) * 6 + balls
+
+def _player_name(row, column):
+    name = (row.get(column) or '').strip()
+    if not name:
+        raise ValueError(f'Missing {column}')
+    if len(name) > 100:
+        raise ValueError('Name is longer than 100 characters')
+    return name
+
+def parse_batting_row(row):
+    """One innings of players.csv -> (name, role, partial totals)"""
+    name = _player_name(row, 'Player_Name')
+    try:
+        role = PlayerRole(row.get('Player_Type', '').strip())
+    except ValueError:
+        role = PlayerRole.BATSMAN
+    return name, role, {
+        'innings': 1,
+        'runs': int(row['Runs']),
+        'dismissals': 0 if row.get('How_Out', '').strip().lower() == 'not out' else 1,
+        'balls_faced': int(row['Balls_Faced'])
+    }
+
+def parse_bowling_row(row):
+    """One bowling innings of odi_bowling.csv -> (name, role, partial totals)"""
+    name = _player_name(row, 'Player Name')
+    return name, PlayerRole.BOWLER, {
+        'balls_bowled': overs_to_balls(row['Overs']),
+        'runs_conceded': int(row['Runs']),
+        'wickets': int(row['Wkts'])
+    }
+
+# Neither file carries a format column; odi_bowling.csv is ODI data and the
+# batting innings are ingested alongside it
+SOURCES = {
+    'players': {'file': 'players.csv', 'encoding': 'utf-8', 'format': MatchFormat.ODI, 'parse': parse_batting_row},
+    'odi_bowling': {'file': 'odi_bowling.csv', 'encoding': 'latin1', 'format': MatchFormat.ODI, 'parse': parse_bowling_row}
+}
+
+def read_chunks(path, chunk_size, encoding='utf-8', skip_rows=0):
+    """Yield lists of at most chunk_size CSV rows (dicts), after skipping skip_rows"""
+    with open(path, newline='', encoding=encoding) as csv_file:
+        rows = islice(csv.DictReader(csv_file), skip_rows, None)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+def derive_statistics(totals):
+    """PlayerStatistics fields from summed totals; fields without data are left out"""
+    statistics = {}
+    if totals['innings']:
+        statistics['batting_average'] = (
+            round(totals['runs'] / totals['dismissals'], 2) if totals['dismissals'] else None
+        )
+        statistics['strike_rate'] = (
+            round(totals['runs'] * 100 / totals['balls_faced'], 2) if totals['balls_faced'] else None
+        )
+    if totals['balls_bowled']:
+        statistics['bowling_average'] = (
+            round(totals['runs_conceded'] / totals['wickets'], 2) if totals['wickets'] else None
+        )
+        statistics['economy_rate'] = round(totals['runs_conceded'] * 6 / totals['balls_bowled'], 2)
+    return statistics
+
+def _resolve_players(names, default_country):
+    """Map normalized name -> player id, creating players that do not exist yet.
+
+    names maps normalized name -> (display name, role) of its first row.
+    Returns (ids, created_count).
+    """
+    def lookup():
+        ids = {}
+        rows = db.session.query(Player.name, Player.id).order_by(Player.id)
+        if all(name.isascii() for name in names):
+            # Narrowed through ix_players_name_lower; SQLite's lower() folds
+            # ASCII letters only, so other names are matched in Python alone
+            rows = rows.filter(func.lower(Player.name).in_(list(names)))
+        for name, player_id in rows:
+            name = normalize_name(name)
+            if name in names:
+                ids.setdefault(name, player_id)
+        return ids
+
+    ids = lookup()
+    missing = []
+    for name, (display_name, role) in names.items():
+        if name in ids:
+            continue
+        mapping, error = validate_player_row({'name': display_name, 'role': role.value, 'country': default_country})
+        if error:
+            raise ValueError(f'Player {display_name}: {error}')
+        missing.append(mapping)
+
+    if missing:
+        db.session.execute(insert(Player), missing)
+        increment_counters(player_deltas(missing))
+        ids = lookup()
+    return ids, len(missing)
+
+def _add_totals(partials, match_format, source):
+    """Add per-player partial sums to player_statistics_totals"""
+    table = PlayerStatisticsTotals.__table__
+    now = datetime.utcnow()
+    values = [
+        dict({column: sums.get(column, 0) for column in TOTAL_COLUMNS},
+             player_id=player_id, format=match_format, source=source, updated_at=now)
+        for player_id, sums in partials.items()
+    ]
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in UPSERT_INSERTS:
+        _update_then_insert_totals(values, match_format, source)
+        return
+
+    statement = UPSERT_INSERTS[dialect](table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.player_id, table.c.format, table.c.source],
+        set_=dict({column: table.c[column] + statement.excluded[column] for column in TOTAL_COLUMNS},
+                  updated_at=statement.excluded.updated_at)
+    )
+    db.session.execute(statement, values)
+
+def _update_then_insert_totals(values, match_format, source):
+    """_add_totals() without ON CONFLICT: one lookup, then an UPDATE and an INSERT"""
+    table = PlayerStatisticsTotals.__table__
+    existing = set(db.session.scalars(
+        select(table.c.player_id).where(
+            table.c.player_id.in_([row['player_id'] for row in values]),
+            table.c.format == match_format, table.c.source == source
+        )
+    ))
+    updates = [
+        dict({f'add_{column}': row[column] for column in TOTAL_COLUMNS},
+             key_player_id=row['player_id'], new_updated_at=row['updated_at'])
+        for row in values if row['player_id'] in existing
+    ]
+    inserts = [row for row in values if row['player_id'] not in existing]
+    if updates:
+        db.session.execute(
+            update(table).where(
+                table.c.player_id == bindparam('key_player_id'),
+                table.c.format == match_format, table.c.source == source
+            ).values(dict({column: table.c[column] + bindparam(f'add_{column}') for column in TOTAL_COLUMNS},
+                          updated_at=bindparam('new_updated_at'))),
+            updates
+        )
+    if inserts:
+        db.session.execute(insert(table), inserts)
+
+def _refresh_statistics(player_ids, match_format):
+    """Recompute PlayerStatistics of the given players from their totals over all sources"""
+    rows = db.session.query(
+        PlayerStatisticsTotals.player_id,
+        *[func.sum(PlayerStatisticsTotals.__table__.c[column]) for column in TOTAL_COLUMNS]
+    ).filter(
+        PlayerStatisticsTotals.player_id.in_(list(player_ids)),
+        PlayerStatisticsTotals.format == match_format
+    ).group_by(PlayerStatisticsTotals.player_id)
+
+    mappings = [
+        dict(derive_statistics(dict(zip(TOTAL_COLUMNS, sums))), player_id=player_id, format=match_format)
+        for player_id, *sums in rows
+    ]
+    return write_statistics(mappings)
+
+def _checkpoint(source, file_size, restart):
+    checkpoint = IngestionCheckpoint.query.filter_by(source=source).first()
+    if checkpoint and (restart or checkpoint.file_size != file_size):
+        if not restart:
+            raise ValueError(f'{source} changed since the last ingestion; restart it from the beginning')
+        # Totals of the previous run would otherwise be counted twice
+        db.session.execute(delete(PlayerStatisticsTotals).where(PlayerStatisticsTotals.source == source))
+        checkpoint.rows_committed = checkpoint.chunks_committed = 0
+        checkpoint.completed = False
+        checkpoint.file_size = file_size
+    elif not checkpoint:
+        checkpoint = IngestionCheckpoint(source=source, file_size=file_size, rows_committed=0,
+                                         chunks_committed=0, completed=False)
+        db.session.add(checkpoint)
+    db.session.commit()
+    return checkpoint
+
+def _ingest_chunk(chunk, spec, source, default_country, summary):
+    """Parse, aggregate and write one chunk; returns the touched player ids"""
+    names = {}
+    parsed = []
+    for offset, row in enumerate(chunk):
+        try:
+            display_name, role, partial = spec['parse'](row)
+        except (KeyError, TypeError, ValueError) as e:
+            summary['error_count'] += 1
+            if len(summary['errors']) < MAX_ROW_ERRORS:
+                # Line numbers count the header
+                line = summary['rows_committed'] + offset + 2
+                summary['errors'].append({'line': line, 'error': str(e) or 'Invalid row'})
+            continue
+        name = normalize_name(display_name)
+        names.setdefault(name, (display_name.strip(), role))
+        parsed.append((name, partial))
+
+    partials = {}
+    if not parsed:
+        return partials
+
+    ids, created = _resolve_players(names, default_country)
+    summary['players_created'] += created
+    for name, partial in parsed:
+        sums = partials.setdefault(ids[name], {})
+        for column, value in partial.items():
+            sums[column] = sums.get(column, 0) + value
+
+    _add_totals(partials, spec['format'], source)
+    inserted, updated = _refresh_statistics(partials, spec['format'])
+    summary['statistics_inserted'] += inserted
+    summary['statistics_updated'] += updated
+    return partials
+
+def ingest_csv(source, data_dir, chunk_size=DEFAULT_CHUNK_SIZE, restart=False,
+               default_country='Unknown', on_chunk=None):
+    """Ingest one CSV source chunk by chunk, resuming from its checkpoint.
+
+    New players get default_country, as the files only record the country of
+    the ground. on_chunk(summary) is called after every committed chunk.
+    Returns a summary of the run.
+    """
+    if source not in SOURCES:
+        raise ValueError(f'Unknown source {source}')
+    spec = SOURCES[source]
+    path = os.path.join(data_dir, spec['file'])
+
+    checkpoint = _checkpoint(source, os.path.getsize(path), restart)
+    summary = {
+        'source': source,
+        'resumed_from': checkpoint.rows_committed,
+        'rows_read': 0,
+        'rows_committed': checkpoint.rows_committed,
+        'chunks_committed': checkpoint.chunks_committed,
+        'players_created': 0,
+        'statistics_inserted': 0,
+        'statistics_updated': 0,
+        'error_count': 0,
+        'errors': [],
+        'completed': checkpoint.completed
+    }
+    if checkpoint.completed:
+        return summary
+
+    chunks = read_chunks(path, chunk_size, encoding=spec['encoding'], skip_rows=checkpoint.rows_committed)
+    try:
+        for chunk in chunks:
+            try:
+                partials = _ingest_chunk(chunk, spec, source, default_country, summary)
+                checkpoint.rows_committed += len(chunk)
+                checkpoint.chunks_committed += 1
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            get_player_catalog().invalidate()
+            get_response_cache().invalidate()
+            get_score_matrix().refresh_players(partials)
+            summary['rows_read'] += len(chunk)
+            summary['rows_committed'] = checkpoint.rows_committed
+            summary['chunks_committed'] = checkpoint.chunks_committed
+            if on_chunk:
+                on_chunk(summary)
+    finally:
+        chunks.close()
+
+    checkpoint.completed = True
+    db.session.commit()
+    summary['completed'] = True
+    return summary
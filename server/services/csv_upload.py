@@ -0,0 +1,228 @@
+"""
+Streaming CSV upload of players.
+
+The request body is read from request.stream in small blocks, unwrapped from
+multipart/form-data with werkzeug's incremental decoder when needed, decoded
+through a text wrapper and parsed by csv.reader, so neither the upload nor
+the parsed rows are ever held in memory as a whole. The size limit is
+enforced on the bytes actually read, and rows are written in committed
+batches.
+"""
+
+import csv
+import io
+import os
+import tempfile
+from itertools import chain
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
+from ..app import db
+from ..models import Player, MatchFormat
+from .player_catalog import get_player_catalog
+from .response_cache import get_response_cache
+from .score_matrix import get_score_matrix
+from .bulk_import import DEFAULT_CHUNK_SIZE, import_players, load_player_names, validate_statistics_row, write_statistics
+
+BLOCK_SIZE = 64 * 1024
+
+MAX_ROW_ERRORS = 100
+
+STATISTICS_COLUMNS = ['batting_average', 'bowling_average', 'strike_rate', 'economy_rate', 'recent_form']
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the size limit"""
+
+class UploadError(ValueError):
+    """Raised for uploads that are not a usable CSV file"""
+
+def read_limited(stream, max_bytes, block_size=BLOCK_SIZE):
+    """Yield blocks of a byte stream, failing once more than max_bytes were read"""
+    total = 0
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            return
+        total += len(block)
+        if total > max_bytes:
+            raise UploadTooLarge(f'Upload exceeds {max_bytes} bytes')
+        yield block
+
+def multipart_file_blocks(blocks, boundary, field_name='file'):
+    """Yield the content of one file field from multipart/form-data blocks"""
+    decoder = MultipartDecoder(boundary)
+    in_file = found = False
+    for block in chain(blocks, [None]):  # None tells the decoder the body ended
+        decoder.receive_data(block)
+        event = decoder.next_event()
+        while not isinstance(event, (NeedData, Epilogue)):
+            if isinstance(event, File):
+                in_file = event.name == field_name and not found
+                found = found or in_file
+            elif isinstance(event, Data) and in_file:
+                if event.data:
+                    yield event.data
+                if not event.more_data:
+                    in_file = False
+            event = decoder.next_event()
+        if isinstance(event, Epilogue):
+            break
+    if not found:
+        raise UploadError(f"No '{field_name}' file in the upload")
+
+def request_csv_blocks(stream, content_type, max_bytes):
+    """CSV bytes of a raw text/csv body or of the 'file' field of a multipart form"""
+    mimetype, options = parse_options_header(content_type or '')
+    blocks = read_limited(stream, max_bytes)
+    if mimetype == 'multipart/form-data':
+        if not options.get('boundary'):
+            raise UploadError('Missing multipart boundary')
+        return multipart_file_blocks(blocks, options['boundary'].encode('latin1'))
+    if mimetype not in ('text/csv', 'application/csv', 'text/plain', 'application/octet-stream'):
+        raise UploadError('Upload a CSV file as multipart/form-data or text/csv')
+    return blocks
+
+def spool_upload(blocks, directory=None):
+    """Write upload blocks to a temporary file and return its path"""
+    fd, path = tempfile.mkstemp(prefix='upload-', suffix='.csv', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as spool:
+            for block in blocks:
+                spool.write(block)
+    except UploadError:
+        os.remove(path)
+        raise
+    except ValueError as e:  # Malformed multipart body
+        os.remove(path)
+        raise UploadError(str(e))
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def remove_spool(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+class IterStream(io.RawIOBase):
+    """Read-only file object over an iterator of byte blocks"""
+
+    def __init__(self, blocks):
+        self._blocks = iter(blocks)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = next(self._blocks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+def iter_csv_records(blocks, encoding='utf-8-sig'):
+    """Yield (line number, row dict) with lower-cased headers from CSV byte blocks"""
+    text = io.TextIOWrapper(io.BufferedReader(IterStream(blocks), BLOCK_SIZE), encoding=encoding, newline='')
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if not header:
+        raise UploadError('The CSV file is empty')
+    columns = [column.strip().lower() for column in header]
+    if 'name' not in columns:
+        raise UploadError('The CSV file needs a name column')
+
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        yield reader.line_num, dict(zip(columns, (value.strip() for value in values)))
+
+def _number(value, cast):
+    return cast(value) if value not in (None, '') else None
+
+def player_row(record, default_format):
+    """Split one CSV record into (player row, statistics fields, format)"""
+    row = {'name': record.get('name'), 'role': record.get('role'), 'country': record.get('country')}
+    matches_played = _number(record.get('matches_played'), int)
+    if matches_played is not None:
+        row['matches_played'] = matches_played
+
+    statistics = {}
+    for column in STATISTICS_COLUMNS:
+        value = _number(record.get(column), float)
+        if value is not None:
+            statistics[column] = value
+    return row, statistics, record.get('format') or default_format
+
+def _import_batch(batch, existing_names, default_format, summary):
+    """Insert one batch of players and their statistics, then commit"""
+    statistics = {}
+    rows = []
+    for line, record in batch:
+        try:
+            row, stats, match_format = player_row(record, default_format)
+        except ValueError as e:
+            _row_error(summary, line, record.get('name'), str(e))
+            continue
+        rows.append((line, row, stats, match_format))
+
+    result = import_players([row for _, row, _, _ in rows], existing_names=existing_names)
+    rejected = {error['row']: error['error'] for error in result['errors']}
+    for index, (line, row, stats, match_format) in enumerate(rows):
+        if index in rejected:
+            _row_error(summary, line, row['name'], rejected[index])
+        elif stats:
+            statistics[row['name']] = (line, dict(stats, format=match_format))
+
+    ids = {}
+    if statistics:
+        ids = dict(db.session.query(Player.name, Player.id).filter(Player.name.in_(list(statistics))))
+        mappings = []
+        for name, (line, stats) in statistics.items():
+            mapping, error = validate_statistics_row(dict(stats, player_id=ids.get(name)))
+            if error:
+                _row_error(summary, line, name, error)
+            else:
+                mappings.append(mapping)
+        summary['statistics_count'] += sum(write_statistics(mappings))
+
+    db.session.commit()
+    get_player_catalog().invalidate()
+    get_response_cache().invalidate()
+    get_score_matrix().refresh_players(ids.values())
+    summary['imported_count'] += result['imported_count']
+
+def _row_error(summary, line, name, error):
+    summary['error_count'] += 1
+    if len(summary['errors']) < MAX_ROW_ERRORS:
+        summary['errors'].append({'line': line, 'name': name or 'Unknown', 'error': error})
+
+def import_player_csv(records, batch_size=DEFAULT_CHUNK_SIZE, default_format=MatchFormat.ODI.value, on_batch=None):
+    """Import (line, record) pairs in committed batches of batch_size rows.
+
+    Columns follow the client template: name, role, country, matches_played
+    and optional statistics columns with an optional format column.
+    on_batch(summary) is called after every committed batch.
+    """
+    summary = {'rows': 0, 'imported_count': 0, 'statistics_count': 0, 'batches': 0, 'error_count': 0, 'errors': []}
+    existing_names = load_player_names()
+
+    batch = []
+    for line, record in records:
+        batch.append((line, record))
+        summary['rows'] += 1
+        if len(batch) >= batch_size:
+            _import_batch(batch, existing_names, default_format, summary)
+            summary['batches'] += 1
+            batch = []
+            if on_batch:
+                on_batch(summary)
+    if batch:
+        _import_batch(batch, existing_names, default_format, summary)
+        summary['batches'] += 1
+        if on_batch:
+            on_batch(summary)
+    return summary
@@ -0,0 +1,128 @@
+"""
+Micro-batching scheduler for single-record predictions.
+
+Concurrent /api/predict calls are queued and a worker thread drains the
+queue into batches, closing a batch once it holds max_batch_size records or
+max_latency_ms has passed since its first record arrived. Each batch is one
+model.predict call; every caller gets its own result through a Future.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from flask import current_app
+from .prediction import encode_records, predict_matrix
+
+class InferenceScheduler:
+    """Groups concurrent prediction requests into batched model calls"""
+
+    def __init__(self, load_bundle, max_batch_size=64, max_latency_ms=3.0):
+        self.load_bundle = load_bundle
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._metrics = {
+            'batches': 0,
+            'rows': 0,
+            'max_batch_size_seen': 0,
+            'max_queue_depth': 0
+        }
+
+    def _ensure_worker(self):
+        # Started on first use so pre-forking servers get one thread per worker process
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(
+                        target=self._run, name='inference-scheduler', daemon=True
+                    )
+                    self._worker.start()
+
+    def submit(self, record):
+        """Queue one record; the returned Future resolves to its prediction"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((record, future))
+        depth = self._queue.qsize()
+        if depth > self._metrics['max_queue_depth']:
+            self._metrics['max_queue_depth'] = depth
+        return future
+
+    def predict(self, record, timeout=None):
+        """Submit a record and wait for its prediction"""
+        return self.submit(record).result(timeout=timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch closes"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._process(batch)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch):
+        bundle = self.load_bundle()
+
+        # Rows of a matrix must have the same width, so group by feature count
+        groups = {}
+        for record, future in batch:
+            features = record.get('features') if isinstance(record, dict) else None
+            width = len(features) if isinstance(features, list) else -1
+            groups.setdefault(width, []).append((record, future))
+
+        for group in groups.values():
+            records = [record for record, _ in group]
+            matrix, positions, errors = encode_records(records, bundle.role_index, bundle.type_index,
+                                                       bundle.n_features)
+            for position, message in errors.items():
+                group[position][1].set_exception(ValueError(message))
+            if not positions:
+                continue
+
+            try:
+                predictions, _ = predict_matrix(bundle.model, matrix)
+            except Exception as e:
+                for position in positions:
+                    group[position][1].set_exception(e)
+                continue
+
+            for row, position in enumerate(positions):
+                group[position][1].set_result(int(predictions[row]))
+
+        self._metrics['batches'] += 1
+        self._metrics['rows'] += len(batch)
+        if len(batch) > self._metrics['max_batch_size_seen']:
+            self._metrics['max_batch_size_seen'] = len(batch)
+
+    def metrics(self):
+        batches = self._metrics['batches']
+        return dict(
+            self._metrics,
+            queue_depth=self._queue.qsize(),
+            average_batch_size=round(self._metrics['rows'] / batches, 2) if batches else 0,
+            max_batch_size=self.max_batch_size,
+            max_latency_ms=self.max_latency * 1000
+        )
+
+def get_inference_scheduler():
+    """Inference scheduler of the current application"""
+    return current_app.extensions['inference_scheduler']
@@ -0,0 +1,322 @@
+"""
+Background jobs for long-running admin work.
+
+Jobs are rows of the jobs table, so any worker process can report their
+status, progress and row counts or flag them for cancellation. The work
+itself runs on a thread pool of the process that accepted the job, inside an
+application context. A thread pool rather than a process pool keeps the
+handlers on the app's extensions, e.g. the score matrix cache they refresh.
+
+Handlers receive a JobContext and report progress through it. Each progress
+call commits the session and raises JobCancelled once cancellation was
+requested, so a cancelled import keeps the chunks committed before it.
+
+Payloads live only in the memory of the accepting process, so a job whose
+process died cannot be resumed. The first time a process uses its runner,
+queued and running jobs that have not moved for JOB_STALE_AFTER seconds are
+marked failed; running jobs move with every progress call.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from ..app import db
+from ..models import Job, JobStatus, MatchFormat
+from .bulk_import import (
+    DEFAULT_CHUNK_SIZE, import_players, import_statistics, load_player_ids, load_player_names
+)
+from .counters import reconcile_counters
+from .csv_ingest import ingest_csv
+from .csv_upload import import_player_csv, iter_csv_records, remove_spool
+from .player_catalog import get_player_catalog
+from .response_cache import get_response_cache
+from .score_matrix import get_score_matrix
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+STALE_ERROR = 'Worker restarted before the job finished'
+
+# kind -> (handler, whether POST /api/admin/jobs may submit it, discard)
+JOB_HANDLERS = {}
+
+def job_handler(kind, public=True, discard=None):
+    """Register handler(context, params, payload) for a job kind.
+
+    discard(params) cleans up after a job that was cancelled before it ran.
+    """
+    def register(func):
+        JOB_HANDLERS[kind] = (func, public, discard)
+        return func
+    return register
+
+class JobCancelled(Exception):
+    """Raised inside a handler once its job was cancelled"""
+
+class JobContext:
+    """Handle passed to job handlers for progress reporting"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def progress(self, rows_processed, rows_total=None):
+        """Record progress and commit the session; raises JobCancelled when requested"""
+        values = {'rows_processed': rows_processed, 'updated_at': datetime.utcnow()}
+        if rows_total is not None:
+            values['rows_total'] = rows_total
+        db.session.execute(update(Job).where(Job.id == self.job_id).values(**values))
+        db.session.commit()
+        if self.cancel_requested():
+            raise JobCancelled()
+
+    def cancel_requested(self):
+        return bool(db.session.query(Job.cancel_requested).filter(Job.id == self.job_id).scalar())
+
+class JobRunner:
+    """Runs jobs on a thread pool and tracks them in the jobs table"""
+
+    def __init__(self, app, max_workers=2, stale_after=900):
+        self.app = app
+        self.max_workers = max_workers
+        self.stale_after = stale_after
+        self._executor = None
+        self._futures = {}
+        self._recovered = False
+        self._lock = threading.Lock()
+
+    def recover(self):
+        """Fail jobs left queued or running by a process that died; once per process"""
+        with self._lock:
+            if self._recovered:
+                return 0
+            self._recovered = True
+        return self.fail_stale_jobs()
+
+    def fail_stale_jobs(self):
+        """Mark queued and running jobs idle for stale_after seconds failed. Returns how many"""
+        now = datetime.utcnow()
+        unfinished = Job.status.in_((JobStatus.QUEUED, JobStatus.RUNNING))
+        idle = Job.updated_at < now - timedelta(seconds=self.stale_after)
+        failed = []
+        for job_id, kind, params in db.session.query(Job.id, Job.kind, Job.params).filter(unfinished, idle).all():
+            # Conditional, so a job that moved in the meantime is left alone
+            if db.session.execute(
+                update(Job).where(Job.id == job_id, unfinished, idle)
+                .values(status=JobStatus.FAILED, error=STALE_ERROR, cancel_requested=True,
+                        finished_at=now, updated_at=now)
+            ).rowcount:
+                failed.append((kind, params))
+        db.session.commit()
+        for kind, params in failed:
+            discard = JOB_HANDLERS.get(kind, (None, None, None))[2]
+            if discard:
+                discard(dict(params or {}))
+        return len(failed)
+
+    def _pool(self):
+        # Created on first use so pre-forking servers get one pool per worker process
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            return self._executor
+
+    def submit(self, kind, params=None, payload=None, user_id=None, public_only=False):
+        """Queue a job; payload is handed to the handler in memory and not stored"""
+        if kind not in JOB_HANDLERS or (public_only and not JOB_HANDLERS[kind][1]):
+            raise ValueError(f'Unknown job type {kind}')
+        self.recover()
+
+        job = Job(kind=kind, status=JobStatus.QUEUED, params=params or {}, rows_processed=0,
+                  cancel_requested=False, created_by=user_id)
+        db.session.add(job)
+        db.session.commit()
+
+        future = self._pool().submit(self._run, job.id, payload)
+        with self._lock:
+            self._futures[job.id] = future
+        future.add_done_callback(lambda _, job_id=job.id: self._forget(job_id))
+        return job
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        # A job already failed as stale keeps that status
+        db.session.execute(update(Job).where(Job.id == job_id, Job.status == JobStatus.RUNNING).values(
+            status=status, result=result, error=error, finished_at=datetime.utcnow(), updated_at=datetime.utcnow()
+        ))
+        db.session.commit()
+
+    def _run(self, job_id, payload):
+        with self.app.app_context():
+            # Only a queued job starts; a cancelled one is left alone
+            started = db.session.execute(
+                update(Job).where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+                .values(status=JobStatus.RUNNING, started_at=datetime.utcnow())
+            ).rowcount
+            db.session.commit()
+            job = db.session.get(Job, job_id)
+            if not started:
+                discard = JOB_HANDLERS[job.kind][2]
+                if discard:
+                    discard(dict(job.params or {}))
+                return
+
+            handler = JOB_HANDLERS[job.kind][0]
+            try:
+                result = handler(JobContext(job_id), dict(job.params or {}), payload)
+            except JobCancelled:
+                db.session.rollback()
+                self._finish(job_id, JobStatus.CANCELLED)
+            except Exception as e:
+                db.session.rollback()
+                self._finish(job_id, JobStatus.FAILED, error=str(e))
+            else:
+                self._finish(job_id, JobStatus.SUCCEEDED, result=result)
+
+    def cancel(self, job_id):
+        """Cancel a queued job or ask a running one to stop.
+
+        Returns (job, requested); job is None when unknown and requested is
+        False when the job had already finished.
+        """
+        self.recover()
+        job = db.session.get(Job, job_id, populate_existing=True)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job, False
+
+        db.session.execute(update(Job).where(Job.id == job_id).values(cancel_requested=True))
+        db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+            .values(status=JobStatus.CANCELLED, finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future and future.cancel():
+            # _run will never see the job, so clean up here
+            discard = JOB_HANDLERS[job.kind][2]
+            if discard:
+                discard(dict(job.params or {}))
+        db.session.refresh(job)
+        return job, True
+
+    def wait(self, job_id, timeout=None):
+        """Block until a job submitted by this process has finished"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future:
+            future.result(timeout=timeout)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+def get_job_runner():
+    """Job runner of the current application"""
+    return current_app.extensions['job_runner']
+
+def public_job_types():
+    """Job kinds that POST /api/admin/jobs accepts"""
+    return sorted(kind for kind, (_, public, _) in JOB_HANDLERS.items() if public)
+
+@job_handler('import_players')
+def run_import_players(context, params, rows):
+    rows = rows or []
+    chunk_size = max(1, params.get('chunk_size') or DEFAULT_CHUNK_SIZE)
+    existing_names = load_player_names()
+    context.progress(0, len(rows))
+
+    imported_count = 0
+    row_errors = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        result = import_players(chunk, chunk_size=chunk_size, existing_names=existing_names)
+        imported_count += result['imported_count']
+        row_errors.extend(dict(error, row=error['row'] + start) for error in result['errors'])
+        try:
+            context.progress(start + len(chunk))  # Commits the chunk
+        finally:
+            get_player_catalog().invalidate()
+            get_response_cache().invalidate()
+
+    return {
+        'imported_count': imported_count,
+        'errors': [f"Player {error['name']}: {error['error']}" for error in row_errors],
+        'row_errors': row_errors
+    }
+
+@job_handler('import_statistics')
+def run_import_statistics(context, params, rows):
+    rows = rows or []
+    chunk_size = max(1, params.get('chunk_size') or DEFAULT_CHUNK_SIZE)
+    player_ids = load_player_ids()
+    context.progress(0, len(rows))
+
+    imported_count = updated_count = 0
+    row_errors = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        result = import_statistics(chunk, chunk_size=chunk_size, player_ids=player_ids)
+        imported_count += result['imported_count']
+        updated_count += result['updated_count']
+        row_errors.extend(dict(error, row=error['row'] + start) for error in result['errors'])
+        try:
+            context.progress(start + len(chunk))  # Commits the chunk
+        finally:
+            get_response_cache().invalidate()
+        get_score_matrix().refresh_players(result['player_ids'])
+
+    return {
+        'imported_count': imported_count,
+        'updated_count': updated_count,
+        'errors': [f"Statistics for player {error['player_id']}: {error['error']}" for error in row_errors],
+        'row_errors': row_errors
+    }
+
+@job_handler('ingest_csv')
+def run_ingest_csv(context, params, payload):
+    results = []
+    rows_done = 0
+    for source in params.get('sources') or []:
+        def on_chunk(summary, rows_before=rows_done):
+            context.progress(rows_before + summary['rows_read'])
+
+        summary = ingest_csv(
+            source, current_app.config['CSV_DATA_DIR'],
+            chunk_size=max(1, params.get('chunk_size') or current_app.config['CSV_INGEST_CHUNK_SIZE']),
+            restart=bool(params.get('restart')),
+            default_country=params.get('country') or 'Unknown',
+            on_chunk=on_chunk
+        )
+        rows_done += summary['rows_read']
+        results.append(summary)
+    return {'results': results}
+
+def remove_upload(params):
+    remove_spool(params['path'])
+
+@job_handler('upload_players_csv', public=False, discard=remove_upload)
+def run_upload_players_csv(context, params, payload):
+    """Import a spooled upload; the file is removed afterwards"""
+    path = params['path']
+    try:
+        with open(path, 'rb') as upload:
+            blocks = iter(lambda: upload.read(64 * 1024), b'')
+            return import_player_csv(
+                iter_csv_records(blocks, encoding=params.get('encoding') or 'utf-8-sig'),
+                batch_size=max(1, params.get('batch_size') or DEFAULT_CHUNK_SIZE),
+                default_format=params.get('format') or MatchFormat.ODI.value,
+                on_batch=lambda summary: context.progress(summary['rows'])
+            )
+    finally:
+        remove_upload(params)
+
+@job_handler('reconcile_counters')
+def run_reconcile_counters(context, params, payload):
+    _, drift = reconcile_counters()  # Committed with the job's result
+    return {'corrected': {name: {'stored': stored, 'exact': exact} for name, (stored, exact) in drift.items()}}
@@ -0,0 +1,128 @@
+"""
+Materialized leaderboards behind /api/statistics/top-players.
+
+leaderboard_entries holds one row per (format, metric, player) for every
+ranking metric the player has a value for, with the player's role copied
+in. Its indexes on (format, metric, value, player_id), and the same with
+role after metric, keep every leaderboard in ranking order: a page is an
+index range scan of offset + limit rows however many players the format
+has, and a player's rank is a count over the part of the range ahead of
+them.
+
+Entries are rewritten per player inside the transaction of the write that
+changes them: statistics upserts (write_statistics(), which every bulk and
+CSV path goes through), the statistics endpoint, role changes and player
+deletes. The statements are plain INSERT ... SELECT and DELETE, so SQLite
+and PostgreSQL run the same code. verify_leaderboards() compares the table
+with the live join it replaces; `flask check-leaderboards` reports drift
+and repairs it with --repair.
+"""
+
+from sqlalchemy import and_, delete, func, insert, literal, select, union_all
+from ..app import db
+from ..models import LeaderboardEntry, Player, PlayerStatistics
+
+# Ranking metric -> whether higher values rank first unless ?order= says otherwise
+METRICS = {
+    'batting_average': True,
+    'strike_rate': True,
+    'recent_form': True,
+    'bowling_average': False,
+    'economy_rate': False,
+}
+
+# Player ids per IN (...) when rewriting entries
+REFRESH_CHUNK_SIZE = 500
+
+ENTRY_COLUMNS = ['format', 'metric', 'player_id', 'role', 'value']
+
+def _live_entries(player_ids=None):
+    """Select of entry rows computed from player_statistics and players"""
+    selects = []
+    for metric in METRICS:
+        column = getattr(PlayerStatistics, metric)
+        statement = select(
+            PlayerStatistics.format, literal(metric, db.String(20)).label('metric'),
+            PlayerStatistics.player_id, Player.role, column.label('value')
+        ).join(Player, Player.id == PlayerStatistics.player_id).where(column.isnot(None))
+        if player_ids is not None:
+            statement = statement.where(PlayerStatistics.player_id.in_(player_ids))
+        selects.append(statement)
+    return union_all(*selects)
+
+def refresh_leaderboards(player_ids):
+    """Rewrite the entries of the given players from their statistics and role"""
+    table = LeaderboardEntry.__table__
+    player_ids = sorted(set(player_ids))
+    db.session.flush()
+    for start in range(0, len(player_ids), REFRESH_CHUNK_SIZE):
+        chunk = player_ids[start:start + REFRESH_CHUNK_SIZE]
+        db.session.execute(delete(table).where(table.c.player_id.in_(chunk)))
+        db.session.execute(insert(table).from_select(ENTRY_COLUMNS, _live_entries(chunk)))
+
+def remove_from_leaderboards(player_id):
+    """Drop a player's entries; call before deleting the player"""
+    table = LeaderboardEntry.__table__
+    db.session.execute(delete(table).where(table.c.player_id == player_id))
+
+def rebuild_leaderboards():
+    """Recompute every entry from the live statistics"""
+    table = LeaderboardEntry.__table__
+    db.session.flush()
+    db.session.execute(delete(table))
+    db.session.execute(insert(table).from_select(ENTRY_COLUMNS, _live_entries()))
+
+def _partition(match_format, metric, role=None):
+    conditions = [LeaderboardEntry.format == match_format, LeaderboardEntry.metric == metric]
+    if role is not None:
+        conditions.append(LeaderboardEntry.role == role)
+    return and_(*conditions)
+
+def top_entries(match_format, metric, role=None, descending=True, limit=10, offset=0):
+    """(Player, PlayerStatistics) pairs of one leaderboard page, best first"""
+    entry = LeaderboardEntry
+    order = (entry.value.desc(), entry.player_id.desc()) if descending else (entry.value, entry.player_id)
+    return (
+        db.session.query(Player, PlayerStatistics)
+        .select_from(entry)
+        .join(Player, Player.id == entry.player_id)
+        .join(PlayerStatistics, and_(PlayerStatistics.player_id == entry.player_id,
+                                     PlayerStatistics.format == entry.format))
+        .filter(_partition(match_format, metric, role))
+        .order_by(*order)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+def player_rank(player_id, match_format, metric, role=None, descending=True, include_total=False):
+    """Rank (ties share one) and value of a player, or None when unranked
+
+    The rank counts the index entries ahead of the player; include_total
+    also counts the whole board.
+    """
+    entry = db.session.get(LeaderboardEntry, (match_format, metric, player_id))
+    if entry is None or (role is not None and entry.role != role):
+        return None
+
+    partition = _partition(match_format, metric, role)
+    ahead = LeaderboardEntry.value > entry.value if descending else LeaderboardEntry.value < entry.value
+    ranked_ahead = db.session.query(func.count()).select_from(LeaderboardEntry).filter(partition, ahead).scalar()
+    rank = {'rank': ranked_ahead + 1, 'value': entry.value}
+    if include_total:
+        rank['total'] = db.session.query(func.count()).select_from(LeaderboardEntry).filter(partition).scalar()
+    return rank
+
+def verify_leaderboards():
+    """Entries the live statistics produce but the table lacks, and the reverse
+
+    Each side is a list of (format, metric, player_id, role, value) tuples;
+    both are empty when the table is in sync.
+    """
+    table = LeaderboardEntry.__table__
+    live = set(db.session.execute(_live_entries()).all())
+    stored = set(db.session.execute(select(*(table.c[column] for column in ENTRY_COLUMNS))).all())
+    return {
+        'missing': sorted((tuple(row) for row in live - stored), key=str),
+        'unexpected': sorted((tuple(row) for row in stored - live), key=str)
+    }
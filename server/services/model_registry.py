@@ -0,0 +1,120 @@
+"""
+Lazy, thread-safe registry for the prediction model and its encoders.
+
+Artifacts are loaded on first use rather than at import time, numpy-backed
+arrays are memory-mapped so forked workers share pages, and a new model
+version can be swapped in without restarting the process.
+
+Layout of MODEL_DIR: model.pkl, role_encoder.pkl and type_encoder.pkl at the
+top level, or the same three files in a <version>/ subdirectory.
+"""
+
+import os
+import threading
+import time
+import joblib
+from flask import current_app
+from .prediction import label_index
+
+MODEL_FILE = 'model.pkl'
+ROLE_ENCODER_FILE = 'role_encoder.pkl'
+TYPE_ENCODER_FILE = 'type_encoder.pkl'
+
+class ModelUnavailable(Exception):
+    """Raised when the model artifacts cannot be loaded"""
+
+class ModelBundle:
+    """A loaded model with its encoders and precomputed label lookups"""
+
+    def __init__(self, model, role_encoder, type_encoder, version, signature):
+        self.model = model
+        self.role_encoder = role_encoder
+        self.type_encoder = type_encoder
+        self.role_index = label_index(role_encoder)
+        self.type_index = label_index(type_encoder)
+        self.n_features = getattr(model, 'n_features_in_', None)  # role, type and the features
+        self.version = version
+        self.signature = signature
+        self.loaded_at = time.time()
+
+class ModelRegistry:
+    """Loads model artifacts on first use and hot-swaps new versions"""
+
+    def __init__(self, model_dir, version=None, mmap_mode='r', check_interval=30):
+        self.model_dir = model_dir
+        self.version = version
+        self.mmap_mode = mmap_mode
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._bundle = None
+        self._checked_at = 0.0
+
+    def _paths(self, version):
+        if version and (os.path.basename(version) != version or version in ('.', '..')):
+            raise ModelUnavailable(f'Invalid model version: {version}')
+        directory = os.path.join(self.model_dir, version) if version else self.model_dir
+        return [os.path.join(directory, name) for name in (MODEL_FILE, ROLE_ENCODER_FILE, TYPE_ENCODER_FILE)]
+
+    def _signature(self, version):
+        """(mtime, size) of every artifact, used to detect replaced files"""
+        try:
+            return tuple((stat.st_mtime_ns, stat.st_size) for stat in map(os.stat, self._paths(version)))
+        except OSError as e:
+            raise ModelUnavailable(f'Model artifacts not found: {e}')
+
+    def _load(self, version):
+        signature = self._signature(version)
+        model_path, role_path, type_path = self._paths(version)
+        try:
+            model = joblib.load(model_path, mmap_mode=self.mmap_mode)
+            role_encoder = joblib.load(role_path)
+            type_encoder = joblib.load(type_path)
+        except Exception as e:
+            raise ModelUnavailable(f'Failed to load model or encoders: {e}')
+        return ModelBundle(model, role_encoder, type_encoder, version, signature)
+
+    def get(self):
+        """Return the current bundle, loading or reloading it if needed"""
+        bundle = self._bundle
+        if bundle is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return bundle
+
+        with self._lock:
+            bundle = self._bundle
+            if bundle is None:
+                self._bundle = self._load(self.version)
+            elif time.monotonic() - self._checked_at >= self.check_interval:
+                # Pick up artifacts replaced on disk, e.g. by a deploy on another worker
+                try:
+                    changed = self._signature(bundle.version) != bundle.signature
+                except ModelUnavailable:
+                    changed = False  # Keep serving the loaded model
+                if changed:
+                    try:
+                        self._bundle = self._load(bundle.version)
+                    except ModelUnavailable:
+                        pass  # Half-written files; retry on the next check
+            self._checked_at = time.monotonic()
+            return self._bundle
+
+    def reload(self, version=None):
+        """Load a (new) version and swap it in atomically; the old one serves until then"""
+        bundle = self._load(version if version is not None else self.version)
+        with self._lock:
+            self._bundle = bundle
+            self.version = bundle.version
+            self._checked_at = time.monotonic()
+        return bundle
+
+    def status(self):
+        bundle = self._bundle
+        return {
+            'loaded': bundle is not None,
+            'version': bundle.version if bundle else self.version,
+            'loaded_at': bundle.loaded_at if bundle else None,
+            'model_dir': self.model_dir
+        }
+
+def get_model_registry():
+    """Model registry of the current application"""
+    return current_app.extensions['model_registry']
@@ -0,0 +1,126 @@
+"""
+Password hashing off the request thread.
+
+bcrypt is deliberately slow (about 0.3 s per hash or check at cost 12), so
+register, login and change-password hand it to a bounded pool instead of
+running it on the thread serving the request. At most max_pending
+operations are queued or running per process; beyond that callers get
+PasswordHasherBusy (503) at once rather than waiting behind a login storm.
+
+The bcrypt package releases the GIL while hashing, so the default pool is
+threads: they cost no pickling or worker processes and still run hashes in
+parallel with each other and with other requests. executor='process' moves
+the work to a process pool instead, and executor='inline' runs it on the
+request thread as before; bench_login compares the three.
+
+Hashes are written with the configured cost (BCRYPT_LOG_ROUNDS, as for
+Flask-Bcrypt), and needs_rehash() tells login to rewrite hashes made with
+another cost once the password is known to be right.
+
+bcrypt only uses the first 72 bytes of a password. bcrypt 4 dropped the rest
+silently and bcrypt 5 raises instead, so passwords are cut to 72 bytes here:
+long passwords can still register, and hashes made by bcrypt 4 still match.
+"""
+
+import hmac
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import bcrypt
+from flask import current_app
+
+# Bytes of the UTF-8 password that bcrypt uses
+MAX_PASSWORD_BYTES = 72
+
+def _password_bytes(password):
+    return password.encode('utf-8')[:MAX_PASSWORD_BYTES]
+
+class PasswordHasherBusy(Exception):
+    """Raised when max_pending hashing operations are already in flight"""
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check_password(password_hash, password):
+    try:
+        return hmac.compare_digest(bcrypt.hashpw(password, password_hash), password_hash)
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+def hash_cost(password_hash):
+    """Cost factor of a bcrypt hash ('$2b$12$...' -> 12), or None when malformed"""
+    parts = password_hash.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded thread or process pool"""
+
+    def __init__(self, rounds=12, max_workers=None, max_pending=64, executor='thread', timeout=30):
+        if executor not in ('thread', 'process', 'inline'):
+            raise ValueError(f'Unknown password hash executor {executor}')
+        self.rounds = rounds
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.executor = executor
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool_instance = None
+        self._metrics = {'hashed': 0, 'checked': 0, 'rejected': 0}
+
+    def _pool(self):
+        # Created on first use so pre-forking servers get one pool per worker process
+        with self._lock:
+            if self._pool_instance is None:
+                if self.executor == 'process':
+                    self._pool_instance = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._pool_instance = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                             thread_name_prefix='bcrypt')
+            return self._pool_instance
+
+    def _run(self, func, *args):
+        if self.executor == 'inline':
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            self._metrics['rejected'] += 1
+            raise PasswordHasherBusy(f'{self.max_pending} password operations already in flight')
+        try:
+            future = self._pool().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password):
+        """bcrypt hash of password (str) with the configured cost"""
+        self._metrics['hashed'] += 1
+        return self._run(_hash_password, _password_bytes(password), self.rounds)
+
+    def check(self, password_hash, password):
+        """Whether password matches password_hash"""
+        self._metrics['checked'] += 1
+        return self._run(_check_password, password_hash.encode('utf-8'), _password_bytes(password))
+
+    def needs_rehash(self, password_hash):
+        """Whether a hash was made with a cost other than the configured one"""
+        cost = hash_cost(password_hash)
+        return cost is not None and cost != self.rounds
+
+    def metrics(self):
+        return dict(self._metrics, rounds=self.rounds, executor=self.executor,
+                    max_workers=self.max_workers, max_pending=self.max_pending)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool_instance = self._pool_instance, None
+        if pool:
+            pool.shutdown(wait=wait)
+
+def get_password_hasher():
+    """Password hasher of the current application"""
+    return current_app.extensions['password_hasher']
@@ -0,0 +1,302 @@
+"""
+In-process catalog of players for the read-only player endpoints.
+
+Names, roles and countries change rarely but are read on almost every page,
+so the players table is loaded once into compact arrays, one row per player
+in id order: ids, role codes, country codes and matches played as NumPy
+arrays, names and timestamps as lists. Listing, filtering,
+pagination and autocomplete are then answered without the database.
+
+Autocomplete uses a prefix trie flattened into sorted arrays of normalized
+keys: the players under a trie node form one contiguous range of the array,
+found with two binary searches, already in name order. One array holds the
+whole names, another the tail of each name from its second word on.
+
+Snapshots are immutable and replaced whole. Player writes in this process
+(create, update, delete, bulk imports) call invalidate() after committing,
+which bumps the catalog version; the next read finds its snapshot behind
+and reloads. Every transaction writing players also bumps the shared
+players version in system_counters (see counters.py), which each read
+checks with one primary key lookup, so writes made by another worker are
+picked up by the next read too. Writes that bypass both (manual SQL) are
+picked up once the snapshot is older than PLAYER_CATALOG_MAX_AGE seconds.
+"""
+
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from math import ceil
+import numpy as np
+from flask import current_app
+from marshmallow import ValidationError
+from ..app import db
+from ..models import Player, PlayerRole
+from ..utils import decode_cursor, encode_cursor
+from .counters import PLAYERS_VERSION, read_version
+from .player_search import MIN_QUERY_LENGTH, RANK_SCORES, normalize_query
+
+ROLES = list(PlayerRole)
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+
+# Unique key tuples that cursor pagination can seek on, by ?sort= value
+CURSOR_ORDERINGS = {
+    'id': ('id',),
+    'name': ('name', 'id')
+}
+
+# Stored for a missing matches_played
+NO_MATCHES = -1
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+def _tails(key):
+    """Suffixes of a normalized name starting at its second, third... word"""
+    start = key.find(' ')
+    while start != -1:
+        yield key[start + 1:]
+        start = key.find(' ', start + 1)
+
+def _prefix_range(keys, prefix):
+    """Slice of the sorted keys starting with prefix"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return bisect_left(keys, prefix), bisect_left(keys, upper)
+
+class CatalogSnapshot:
+    """All players at one catalog version, in compact arrays"""
+
+    def __init__(self, version, records, shared_version=0):
+        self.version = version
+        self.shared_version = shared_version
+        self.loaded_at = time.monotonic()
+        ids, names, roles, countries, matches_played, created_at, updated_at = (
+            map(list, zip(*records)) if records else ([] for _ in range(7))
+        )
+
+        self.ids = np.array(ids, dtype=np.int64)
+        self.names = names
+        self.role_codes = np.array([ROLE_CODES[role] for role in roles], dtype=np.int8)
+        self.countries = sorted(set(countries))
+        country_codes = {country: code for code, country in enumerate(self.countries)}
+        self.country_codes = np.array([country_codes[country] for country in countries], dtype=np.int32)
+        self.matches_played = np.array(
+            [NO_MATCHES if matches is None else matches for matches in matches_played], dtype=np.int32
+        )
+        # Formatted when serialized, only for the rows of a page
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+        # Lowercase names for substring filters; rows sorted by (name, id) for ?sort=name
+        self._folded = [name.lower() for name in names]
+        self.name_order = np.array(sorted(range(len(names)), key=names.__getitem__), dtype=np.int64)
+
+        # Flattened prefix tries over normalized names and over their later words
+        keys = [' '.join(name.split()) for name in self._folded]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._name_keys = [keys[row] for row in order]
+        self._name_rows = np.array(order, dtype=np.int64)
+        tails = sorted(
+            (tail, row) for row, key in enumerate(keys) if ' ' in key
+            for tail in _tails(key)
+        )
+        self._tail_keys = [tail for tail, _ in tails]
+        self._tail_rows = np.array([row for _, row in tails], dtype=np.int64)
+
+        # Normalized names joined in id order, for substring matches that stop early
+        self._haystack = '\n'.join(keys)
+        self._starts = [0]
+        for key in keys:
+            self._starts.append(self._starts[-1] + len(key) + 1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row_of(self, player_id):
+        """Row of a player id, or None when the player is not in this snapshot"""
+        row = int(np.searchsorted(self.ids, player_id))
+        if row < len(self.ids) and self.ids[row] == player_id:
+            return row
+        return None
+
+    def serialize(self, row):
+        """A player as PlayerSchema.dump() would return it"""
+        matches_played = int(self.matches_played[row])
+        return {
+            'id': int(self.ids[row]),
+            'name': self.names[row],
+            'role': ROLES[self.role_codes[row]].name,
+            'country': self.countries[self.country_codes[row]],
+            'matches_played': None if matches_played == NO_MATCHES else matches_played,
+            'created_at': _isoformat(self.created_at[row]),
+            'updated_at': _isoformat(self.updated_at[row])
+        }
+
+    def _containing(self, text):
+        """Mask of rows whose name contains text, case-insensitively"""
+        text = text.lower()
+        return np.fromiter((text in name for name in self._folded), dtype=bool, count=len(self))
+
+    def _in_countries(self, text):
+        """Mask of rows whose country contains text, case-insensitively"""
+        text = text.lower()
+        codes = [code for code, country in enumerate(self.countries) if text in country.lower()]
+        return np.isin(self.country_codes, codes)
+
+    def filter(self, role=None, country=None, search=None):
+        """Rows in id order matching GET /api/players/ filters
+
+        role is a PlayerRole; country matches a substring of the country and
+        search a substring of the name or the country, ignoring case.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if role is not None:
+            mask &= self.role_codes == ROLE_CODES[role]
+        if country:
+            mask &= self._in_countries(country)
+        if search:
+            mask &= self._containing(search) | self._in_countries(search)
+        return np.flatnonzero(mask)
+
+    def page(self, rows, page, per_page):
+        """Offset pagination over rows, with paginate(error_out=False) semantics"""
+        page = page if page >= 1 else 1
+        per_page = per_page if per_page >= 1 else 20
+        total = len(rows)
+        pages = ceil(total / per_page) if total else 0
+        start = (page - 1) * per_page
+        return {
+            'rows': rows[start:start + per_page],
+            'total': total,
+            'pages': pages,
+            'has_next': page < pages,
+            'has_prev': page > 1
+        }
+
+    def _cursor_key(self, sort, row):
+        if sort == 'name':
+            return [self.names[row], int(self.ids[row])]
+        return [int(self.ids[row])]
+
+    def keyset_page(self, rows, sort, cursor, per_page, include_total=False):
+        """Cursor pagination over rows, producing the same cursors as keyset_paginate()"""
+        if sort == 'name':
+            selected = np.zeros(len(self), dtype=bool)
+            selected[rows] = True
+            ordered = self.name_order[selected[self.name_order]]
+        else:
+            ordered = rows
+
+        position = decode_cursor(cursor, sort)
+        start = 0
+        if position is not None:
+            if len(position) != len(CURSOR_ORDERINGS[sort]):
+                raise ValidationError('Cursor does not match the requested ordering')
+            if not isinstance(position[-1], int) or (sort == 'name' and not isinstance(position[0], str)):
+                raise ValidationError('Invalid cursor')
+            if sort == 'name':
+                start = bisect_right(ordered, tuple(position), key=lambda row: (self.names[row], self.ids[row]))
+            else:
+                start = int(np.searchsorted(self.ids[ordered], position[0], side='right'))
+
+        page_rows = ordered[start:start + per_page]
+        has_next = start + per_page < len(ordered)
+        pagination = {
+            'per_page': per_page,
+            'next_cursor': encode_cursor(sort, self._cursor_key(sort, page_rows[-1])) if has_next else None,
+            'has_next': has_next
+        }
+        if include_total:
+            pagination['total'] = len(rows)
+        return {'rows': page_rows, 'pagination': pagination}
+
+    def _substring_rows(self, text):
+        """Rows of normalized names containing text, in id order, lazily"""
+        position = self._haystack.find(text)
+        while position != -1:
+            row = bisect_right(self._starts, position) - 1
+            yield row
+            position = self._haystack.find(text, self._starts[row + 1])
+
+    def complete(self, prefix, limit=10):
+        """Rows of up to limit names starting with prefix, in name order"""
+        prefix = normalize_query(prefix)
+        if not prefix:
+            return []
+        lo, hi = _prefix_range(self._name_keys, prefix)
+        return self._name_rows[lo:min(hi, lo + limit)].tolist()
+
+    def search(self, query, limit=10):
+        """(row, score) pairs of the best prefix and substring matches, best first
+
+        Names starting with the query come first, then names with a later
+        word starting with it, then names containing it anywhere once the
+        query is MIN_QUERY_LENGTH characters long.
+        """
+        query = normalize_query(query)
+        results = [(row, RANK_SCORES[0]) for row in self.complete(query, limit)]
+        if len(query) < MIN_QUERY_LENGTH or len(results) >= limit:
+            return results
+
+        found = {row for row, _ in results}
+        lo, hi = _prefix_range(self._tail_keys, query)
+        for row in self._tail_rows[lo:hi].tolist():
+            if len(results) >= limit:
+                return results
+            if row not in found:
+                found.add(row)
+                results.append((row, RANK_SCORES[1]))
+
+        for row in self._substring_rows(query):
+            if len(results) >= limit:
+                break
+            if row not in found:
+                results.append((row, RANK_SCORES[2]))
+        return results
+
+class PlayerCatalog:
+    """Versioned in-process copy of the players table"""
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._version = 0
+        self._snapshot = None
+
+    @property
+    def version(self):
+        """Bumped by every invalidate(); feeds snapshot staleness"""
+        return self._version
+
+    def invalidate(self):
+        """Bump the version after a committed player write; the next read reloads"""
+        with self._lock:
+            self._version += 1
+
+    def _stale(self, snapshot, shared_version):
+        return snapshot is None or snapshot.version != self._version or snapshot.shared_version != shared_version or (
+            self.max_age is not None and time.monotonic() - snapshot.loaded_at > self.max_age
+        )
+
+    def snapshot(self):
+        """Current snapshot, reloaded from the database when stale"""
+        # Read before the players, so a write committed meanwhile leaves the
+        # snapshot behind the shared version and it is reloaded again
+        shared_version = read_version(PLAYERS_VERSION)
+        snapshot = self._snapshot
+        if not self._stale(snapshot, shared_version):
+            return snapshot
+        with self._lock:
+            if self._stale(self._snapshot, shared_version):
+                version = self._version
+                players = Player.__table__.c
+                records = db.session.connection().execute(
+                    db.select(players.id, players.name, players.role, players.country,
+                              players.matches_played, players.created_at, players.updated_at)
+                    .order_by(players.id)
+                ).all()
+                self._snapshot = CatalogSnapshot(version, records, shared_version)
+            return self._snapshot
+
+def get_player_catalog():
+    """Player catalog of the current application"""
+    return current_app.extensions['player_catalog']
@@ -0,0 +1,177 @@
+"""
+Player name search backed by a trigram index.
+
+On SQLite players_fts is an external-content FTS5 table with the trigram
+tokenizer over players.name and players.country. Triggers on players keep it
+in sync with every write path, ORM or bulk Core statement alike. On
+PostgreSQL pg_trgm GIN indexes serve the same queries and need no upkeep.
+
+Ranked typeahead (prefix, word prefix and substring matches) is answered by
+the in-process player catalog; this index supplies the fuzzy matches that
+fill the remaining places: names sharing enough trigrams with the query, so
+"karthick" still finds "Karthik".
+"""
+
+from sqlalchemy import DDL, event, func, literal, text
+from ..app import db
+from ..models import Player
+
+# Trigram indexes cannot answer shorter queries
+MIN_QUERY_LENGTH = 3
+
+# Trigram similarity a fuzzy match needs, as pg_trgm's default
+SIMILARITY_THRESHOLD = 0.3
+
+# Index postings read for fuzzy candidates before the similarity re-rank
+FUZZY_CANDIDATES = 200
+
+# Scores of the catalog's prefix, word prefix and substring matches; fuzzy
+# matches score below 0.5
+RANK_SCORES = (1.0, 0.75, 0.5)
+
+SEARCH_INDEX_DDL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS players_fts USING fts5("
+        "name, country, content='players', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS players_fts_insert AFTER INSERT ON players BEGIN "
+        "INSERT INTO players_fts(rowid, name, country) VALUES (new.id, new.name, new.country); END",
+        "CREATE TRIGGER IF NOT EXISTS players_fts_delete AFTER DELETE ON players BEGIN "
+        "INSERT INTO players_fts(players_fts, rowid, name, country) "
+        "VALUES ('delete', old.id, old.name, old.country); END",
+        "CREATE TRIGGER IF NOT EXISTS players_fts_update AFTER UPDATE OF name, country ON players BEGIN "
+        "INSERT INTO players_fts(players_fts, rowid, name, country) "
+        "VALUES ('delete', old.id, old.name, old.country); "
+        "INSERT INTO players_fts(rowid, name, country) VALUES (new.id, new.name, new.country); END",
+        "INSERT INTO players_fts(players_fts) VALUES ('rebuild')",
+    ],
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_players_name_trgm ON players USING gin (name gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_players_country_trgm ON players USING gin (country gin_trgm_ops)",
+    ],
+}
+
+DROP_SEARCH_INDEX_DDL = {
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS players_fts_insert",
+        "DROP TRIGGER IF EXISTS players_fts_delete",
+        "DROP TRIGGER IF EXISTS players_fts_update",
+        "DROP TABLE IF EXISTS players_fts",
+    ],
+    'postgresql': [
+        "DROP INDEX IF EXISTS ix_players_country_trgm",
+        "DROP INDEX IF EXISTS ix_players_name_trgm",
+    ],
+}
+
+# Created and dropped with the players table by create_all() and drop_all();
+# migrated databases get them from the search index revision
+for _dialect, _statements in SEARCH_INDEX_DDL.items():
+    for _statement in _statements:
+        event.listen(Player.__table__, 'after_create', DDL(_statement).execute_if(dialect=_dialect))
+for _dialect, _statements in DROP_SEARCH_INDEX_DDL.items():
+    for _statement in _statements:
+        event.listen(Player.__table__, 'before_drop', DDL(_statement).execute_if(dialect=_dialect))
+
+def trigrams(value):
+    """Lowercase trigrams of value, as the FTS5 trigram tokenizer splits it"""
+    value = value.lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+def _similarity(query, query_trigrams, name):
+    # A one-word query is compared with each word of the name, a longer one
+    # with the whole name
+    name = name.lower()
+    best = 0.0
+    for part in (name.split() if ' ' not in query else [name]):
+        part_trigrams = {part[i:i + 3] for i in range(len(part) - 2)}
+        shared = len(query_trigrams & part_trigrams)
+        if shared:
+            best = max(best, shared / (len(query_trigrams) + len(part_trigrams) - shared))
+    return best
+
+def similarity(query, name):
+    """Shared over total trigrams, in [0, 1], of the query and the name
+
+    A one-word query is compared with the name's best matching word, close
+    to pg_trgm's word_similarity: "karthick" is near "Dinesh Karthik"
+    although most of the name's trigrams are not in the query.
+    """
+    query = normalize_query(query)
+    return _similarity(query, trigrams(query), name)
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+def _dialect():
+    return db.engine.dialect.name
+
+def _phrase(value):
+    """FTS5 string literal, matched as a substring by the trigram tokenizer"""
+    return '"' + value.replace('"', '""') + '"'
+
+def _rare_trigrams(query):
+    """Query trigrams from rarest up, as many as FUZZY_CANDIDATES postings allow
+
+    Postings are counted up to the budget only, so a common trigram costs no
+    more to look at than a rare one.
+    """
+    query_trigrams = sorted(trigrams(query))
+    probes = ' UNION ALL '.join(
+        f'SELECT {i}, count(*) FROM (SELECT rowid FROM players_fts WHERE players_fts MATCH :match_{i} LIMIT :cap)'
+        for i in range(len(query_trigrams))
+    )
+    params = {f'match_{i}': 'name : ' + _phrase(trigram) for i, trigram in enumerate(query_trigrams)}
+    frequencies = {
+        query_trigrams[i]: count
+        for i, count in db.session.execute(text(probes), dict(params, cap=FUZZY_CANDIDATES + 1))
+        if count
+    }
+    chosen, postings = [], 0
+    for trigram in sorted(frequencies, key=frequencies.get):
+        if chosen and postings + frequencies[trigram] > FUZZY_CANDIDATES:
+            break
+        chosen.append(trigram)
+        postings += frequencies[trigram]
+    return chosen
+
+def _fuzzy_matches(query):
+    """(id, name) of candidates sharing trigrams with query"""
+    if _dialect() == 'sqlite':
+        # A name close enough to the query shares some of its rarer trigrams;
+        # the common ones would drag in most of the table
+        rare = _rare_trigrams(query)
+        if not rare:
+            return []
+        any_trigram = ' OR '.join(_phrase(trigram) for trigram in rare)
+        rows = db.session.execute(text(
+            'SELECT rowid, name FROM players_fts WHERE players_fts MATCH :match LIMIT :limit'
+        ), {'match': f'name : ({any_trigram})', 'limit': FUZZY_CANDIDATES})
+    elif _dialect() == 'postgresql':
+        rows = db.session.execute(
+            db.select(Player.id, Player.name)
+            .where(literal(query).op('<%')(Player.name))
+            .order_by(func.word_similarity(query, Player.name).desc()).limit(FUZZY_CANDIDATES)
+        )
+    else:
+        return []
+    return rows.all()
+
+def fuzzy_player_ids(query, limit=10, exclude=()):
+    """(player id, score) pairs of up to limit names close to query, best first
+
+    Scores are half the trigram similarity, below every substring match.
+    """
+    query = normalize_query(query)
+    # With a single trigram every fuzzy match is a substring match already found
+    query_trigrams = trigrams(query)
+    if len(query) < MIN_QUERY_LENGTH or _dialect() not in SEARCH_INDEX_DDL or len(query_trigrams) < 2:
+        return []
+    scored = sorted(
+        (-_similarity(query, query_trigrams, name), player_id) for player_id, name in _fuzzy_matches(query)
+        if player_id not in exclude
+    )
+    return [
+        (player_id, round(-score / 2, 4)) for score, player_id in scored[:limit]
+        if -score >= SIMILARITY_THRESHOLD
+    ]
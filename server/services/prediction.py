@@ -0,0 +1,77 @@
+"""
+Batched inference for the role prediction model.
+
+Encoders are turned into plain dict lookups once, records are encoded into a
+single NumPy matrix and the model is called once per batch instead of once
+per row.
+"""
+
+import numbers
+from collections import Counter
+import numpy as np
+
+def label_index(encoder):
+    """Map each class of a fitted LabelEncoder to its encoded value"""
+    return {label: code for code, label in enumerate(encoder.classes_.tolist())}
+
+def encode_records(records, role_index, type_index, n_features=None):
+    """Encode prediction records into a feature matrix.
+
+    n_features is the number of columns the model takes (its n_features_in_:
+    role, type and the features); records of another width are rejected.
+    When the model does not report it, the most common width among the
+    records is used.
+
+    Returns (matrix, positions, errors) where positions are the input indices
+    of the matrix rows and errors maps input index -> message for records
+    that could not be encoded.
+    """
+    encoded = []
+    errors = {}
+
+    for position, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[position] = 'Record must be an object'
+            continue
+
+        role = record.get('role')
+        player_type = record.get('type')
+        features = record.get('features')
+
+        if not (role and player_type and isinstance(features, list)):
+            errors[position] = 'Missing or invalid input'
+            continue
+        if not all(isinstance(value, numbers.Number) and not isinstance(value, bool) for value in features):
+            errors[position] = 'Features must be numbers'
+            continue
+        if role not in role_index:
+            errors[position] = f'Unknown role: {role}'
+            continue
+        if player_type not in type_index:
+            errors[position] = f'Unknown type: {player_type}'
+            continue
+
+        encoded.append((position, [role_index[role], type_index[player_type]] + features))
+
+    width = n_features
+    if width is None and encoded:
+        width = Counter(len(row) for _, row in encoded).most_common(1)[0][0]
+    rows = []
+    positions = []
+    for position, row in encoded:
+        if len(row) != width:
+            errors[position] = f'Expected {width - 2} features, got {len(row) - 2}'
+            continue
+        rows.append(row)
+        positions.append(position)
+
+    matrix = np.asarray(rows, dtype=np.float64) if rows else np.empty((0, 0))
+    return matrix, positions, errors
+
+def predict_matrix(model, matrix, with_probabilities=False):
+    """Run one predict (and optionally predict_proba) call for the whole matrix"""
+    if len(matrix) == 0:
+        return [], None
+    predictions = model.predict(matrix)
+    probabilities = model.predict_proba(matrix) if with_probabilities else None
+    return predictions, probabilities
@@ -0,0 +1,229 @@
+"""
+Token bucket rate limits for the login endpoint.
+
+Every login attempt takes a token from a bucket for the client address and
+one for the (case-folded) username. A bucket holds up to `burst` tokens and
+refills at `per_minute` tokens a minute, so a client may try a few passwords
+in a row but a brute-force run is held to the refill rate, and guessing one
+account's password from many addresses is held by the username bucket. An
+attempt finding either bucket empty is answered 429 before the request
+touches the database or bcrypt.
+
+The buckets live in a store named by RATELIMIT_STORAGE_URL:
+
+- sqlite:///path (sqlite:///ratelimit.db by default) keeps them in a small
+  SQLite file (relative paths are under the instance folder) that every
+  worker process on the host opens, so all gunicorn workers draw from the
+  same buckets. Taking a token is a single INSERT ... ON CONFLICT DO UPDATE
+  ... RETURNING statement, which SQLite runs under its write lock, so
+  concurrent workers cannot both spend the last token.
+- memory:// keeps them in a dict of the process. Each worker then counts on
+  its own, which is fine for tests.
+
+The store also keeps the allowed and rejected counts, shown by
+GET /api/admin/rate-limits for all workers sharing it.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app
+
+class BucketRule:
+    """Bucket of `burst` tokens refilled at `per_minute` tokens a minute"""
+
+    def __init__(self, burst, per_minute):
+        if burst < 1 or per_minute <= 0:
+            raise ValueError('A rate limit needs a burst of at least 1 and a positive refill rate')
+        self.burst = burst
+        self.rate = per_minute / 60.0  # tokens per second
+
+    @property
+    def idle_after(self):
+        """Seconds after which an untouched bucket is full again, and so can be forgotten"""
+        return self.burst / self.rate
+
+    def retry_after(self, tokens):
+        """Seconds until a bucket holding `tokens` has a whole token"""
+        return max(0.0, (1 - tokens) / self.rate)
+
+class MemoryBucketStore:
+    """Buckets and counters in a dict of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, updated_at)
+        self._counters = {}
+
+    def take(self, key, rule, now):
+        """(allowed, tokens left) after taking a token from the bucket if it has one"""
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (rule.burst, now))
+            tokens = min(rule.burst, tokens + (now - updated_at) * rule.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            return allowed, tokens
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def prune(self, before):
+        """Forget buckets untouched since `before`"""
+        with self._lock:
+            self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[1] >= before}
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._counters.clear()
+
+class SQLiteBucketStore:
+    """Buckets and counters in a SQLite file shared by the worker processes"""
+
+    # The SET expressions all see the row as it was, so the refill is worked
+    # out once from the old tokens and updated_at
+    TAKE = """
+        INSERT INTO rate_limit_buckets (key, tokens, updated_at, allowed)
+        VALUES (:key, :burst - 1, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = MIN(:burst, tokens + MAX(0, :now - updated_at) * :rate)
+                     - (MIN(:burst, tokens + MAX(0, :now - updated_at) * :rate) >= 1),
+            allowed = MIN(:burst, tokens + MAX(0, :now - updated_at) * :rate) >= 1,
+            updated_at = MAX(updated_at, :now)
+        RETURNING allowed, tokens
+    """
+    INCREMENT = """
+        INSERT INTO rate_limit_counters (name, value) VALUES (?, ?)
+        ON CONFLICT (name) DO UPDATE SET value = value + excluded.value
+    """
+
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS rate_limit_buckets ('
+                               'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                               'updated_at REAL NOT NULL, allowed INTEGER NOT NULL)')
+            connection.execute('CREATE TABLE IF NOT EXISTS rate_limit_counters ('
+                               'name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    def _connection(self):
+        # One connection per thread, opened again after a fork so worker
+        # processes never share the master's file handle
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.execute('PRAGMA synchronous=NORMAL')
+            local.pid = os.getpid()
+        return local.connection
+
+    def take(self, key, rule, now):
+        """(allowed, tokens left) after taking a token from the bucket if it has one"""
+        allowed, tokens = self._connection().execute(self.TAKE, {
+            'key': key, 'burst': rule.burst, 'rate': rule.rate, 'now': now
+        }).fetchone()
+        return bool(allowed), tokens
+
+    def increment(self, name, amount=1):
+        self._connection().execute(self.INCREMENT, (name, amount))
+
+    def counters(self):
+        return dict(self._connection().execute('SELECT name, value FROM rate_limit_counters'))
+
+    def prune(self, before):
+        """Forget buckets untouched since `before`"""
+        self._connection().execute('DELETE FROM rate_limit_buckets WHERE updated_at < ?', (before,))
+
+    def clear(self):
+        connection = self._connection()
+        connection.execute('DELETE FROM rate_limit_buckets')
+        connection.execute('DELETE FROM rate_limit_counters')
+
+def store_from_url(url, instance_path=None):
+    """Bucket store for a RATELIMIT_STORAGE_URL (memory:// or sqlite:///path)"""
+    if url in (None, '', 'memory://'):
+        return MemoryBucketStore()
+    if url.startswith('sqlite:///'):
+        path = url[len('sqlite:///'):]
+        if not os.path.isabs(path) and instance_path:
+            os.makedirs(instance_path, exist_ok=True)
+            path = os.path.join(instance_path, path)
+        return SQLiteBucketStore(path)
+    raise ValueError(f'Unsupported rate limit storage {url}')
+
+class RateLimited(Exception):
+    """Raised when a bucket of the request is empty"""
+
+    def __init__(self, scope, retry_after):
+        super().__init__(f'Too many login attempts for this {scope}')
+        self.scope = scope
+        self.retry_after = retry_after
+
+class RateLimiter:
+    """Per-address and per-username login buckets in a shared store"""
+
+    PRUNE_EVERY = 1000  # takes between sweeps of idle buckets
+
+    def __init__(self, store, ip_rule, username_rule, enabled=True, clock=time.time):
+        self.store = store
+        self.ip_rule = ip_rule
+        self.username_rule = username_rule
+        self.enabled = enabled
+        # Wall clock rather than monotonic, since the buckets are compared across processes
+        self.clock = clock
+        self._takes = 0
+
+    def check_login(self, address, username):
+        """Take a token for address and username, or raise RateLimited"""
+        if not self.enabled:
+            return
+        now = self.clock()
+        self._maybe_prune(now)
+        checks = [('address', f'login:ip:{address}', self.ip_rule)]
+        if isinstance(username, str) and username.strip():
+            checks.append(('username', f'login:user:{username.strip().casefold()}', self.username_rule))
+        for scope, key, rule in checks:
+            allowed, tokens = self.store.take(key, rule, now)
+            if not allowed:
+                self.store.increment(f'login.rejected.{scope}')
+                raise RateLimited(scope, rule.retry_after(tokens))
+        self.store.increment('login.allowed')
+
+    def _maybe_prune(self, now):
+        self._takes += 1
+        if self._takes % self.PRUNE_EVERY == 0:
+            self.store.prune(now - max(self.ip_rule.idle_after, self.username_rule.idle_after))
+
+    def metrics(self):
+        counters = self.store.counters()
+        rejected = {scope: counters.get(f'login.rejected.{scope}', 0) for scope in ('address', 'username')}
+        return {
+            'enabled': self.enabled,
+            'storage': type(self.store).__name__,
+            'login': {
+                'allowed': counters.get('login.allowed', 0),
+                'rejected': sum(rejected.values()),
+                'rejected_by': rejected,
+                'per_address': {'burst': self.ip_rule.burst, 'per_minute': self.ip_rule.rate * 60},
+                'per_username': {'burst': self.username_rule.burst, 'per_minute': self.username_rule.rate * 60}
+            }
+        }
+
+def retry_after_header(seconds):
+    """Whole seconds for a Retry-After header, at least 1"""
+    return str(max(1, math.ceil(seconds)))
+
+def get_rate_limiter():
+    """Rate limiter of the current application"""
+    return current_app.extensions['rate_limiter']
@@ -0,0 +1,154 @@
+"""
+Cache of rendered responses for read-only reference endpoints.
+
+Enum lists (roles, formats, pitch types, weather) never change while the
+process runs. Countries, player details and top players only change when
+an admin writes players or statistics; those write paths call
+invalidate(), which bumps the cache's data version and drops every entry
+rendered at an older one. Entries also expire after RESPONSE_CACHE_TTL
+seconds, so writes made by another worker are picked up, and the least
+recently used entry is evicted once RESPONSE_CACHE_SIZE are held.
+
+Every cached response carries a strong ETag, a hash of its body, and a
+Cache-Control header. A request whose If-None-Match matches gets 304 Not
+Modified without a body, straight from the cache when the entry is fresh.
+Because the ETag follows the content rather than a per-process counter,
+workers with different versions still agree on it.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, make_response, request
+
+# Cache-Control of static enum lists and of data that admins can change
+STATIC_CACHE_CONTROL = 'public, max-age=86400'
+DATA_CACHE_CONTROL = 'no-cache'
+
+class CachedResponse:
+    """A rendered 200 response and its validator"""
+
+    __slots__ = ('body', 'mimetype', 'etag', 'static', 'version', 'expires_at')
+
+    def __init__(self, body, mimetype, static, version, expires_at):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.static = static
+        self.version = version
+        self.expires_at = expires_at
+
+class ResponseCache:
+    """Bounded LRU of rendered responses with TTL and data versioning"""
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = 0
+        self._counters = {'hits': 0, 'misses': 0, 'not_modified': 0, 'evictions': 0, 'invalidations': 0}
+
+    @property
+    def version(self):
+        """Data version, bumped by invalidate()"""
+        return self._version
+
+    def invalidate(self):
+        """Drop data responses after a committed player or statistics write"""
+        with self._lock:
+            self._version += 1
+            self._counters['invalidations'] += 1
+            for key in [key for key, entry in self._entries.items() if not entry.static]:
+                del self._entries[key]
+
+    def get(self, key):
+        """Fresh entry for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.static or (
+                entry.version == self._version and time.monotonic() < entry.expires_at
+            )):
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self._counters['misses'] += 1
+            return None
+
+    def put(self, key, body, mimetype, static, version):
+        """Store a response rendered at data version; returns its entry
+
+        A response rendered before an invalidate() that ran meanwhile is
+        returned but not stored.
+        """
+        entry = CachedResponse(body, mimetype, static, version, time.monotonic() + self.ttl)
+        with self._lock:
+            if (static or version == self._version) and self.max_size > 0:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._counters['evictions'] += 1
+        return entry
+
+    def count_not_modified(self):
+        with self._lock:
+            self._counters['not_modified'] += 1
+
+    def stats(self):
+        """Counters for the admin API"""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return dict(
+                self._counters,
+                size=len(self._entries),
+                max_size=self.max_size,
+                ttl=self.ttl,
+                version=self._version,
+                hit_rate=round(self._counters['hits'] / lookups, 4) if lookups else None
+            )
+
+def get_response_cache():
+    """Response cache of the current application"""
+    return current_app.extensions['response_cache']
+
+def _request_key():
+    # Query parameters in a canonical order, so ?a=1&b=2 and ?b=2&a=1 share an entry
+    return f'{request.path}?{urlencode(sorted(request.args.items(multi=True)))}'
+
+def cached_response(static=False):
+    """Serve a GET view's 200 responses from the response cache with ETag revalidation
+
+    static marks responses that never change while the process runs; they
+    are not invalidated by writes and may be cached by clients for a day.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            key = _request_key()
+            entry = cache.get(key)
+            status = 'HIT'
+            if entry is None:
+                status = 'MISS'
+                version = cache.version
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = cache.put(key, response.get_data(), response.mimetype, static, version)
+
+            response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = STATIC_CACHE_CONTROL if static else DATA_CACHE_CONTROL
+            response.headers['X-Cache'] = status
+            response = response.make_conditional(request)
+            if response.status_code == 304:
+                cache.count_not_modified()
+            return response
+        return wrapper
+    return decorator
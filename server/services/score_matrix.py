@@ -0,0 +1,171 @@
+"""
+Precomputed smart-suggestion scores for every match condition.
+
+There are only len(MatchFormat) x len(PitchType) x len(Weather) condition
+combinations, so every player's suitability is computed once for all of them
+and kept in a compact float32 matrix (one row per player, one column per
+combination). Statistics writes refresh the affected rows; a suggestion is
+then a column read plus a partial sort.
+
+The matrix is per process. Writes made by another worker are picked up when
+the matrix exceeds SCORE_MATRIX_MAX_AGE seconds and is rebuilt.
+"""
+
+import threading
+import time
+import numpy as np
+from flask import current_app
+from ..models import MatchFormat, PitchType, Weather
+from .scoring import STAT_COLUMNS, compute_scores, load_format_frame, top_k_indices
+
+FORMATS = list(MatchFormat)
+PITCH_TYPES = list(PitchType)
+WEATHERS = list(Weather)
+CONDITION_COUNT = len(FORMATS) * len(PITCH_TYPES) * len(WEATHERS)
+
+# Player ids per IN (...) query when refreshing rows
+REFRESH_CHUNK_SIZE = 500
+
+def condition_index(match_format, pitch_type, weather):
+    """Column of the score matrix for a (format, pitch_type, weather) combination"""
+    return (
+        FORMATS.index(match_format) * len(PITCH_TYPES) + PITCH_TYPES.index(pitch_type)
+    ) * len(WEATHERS) + WEATHERS.index(weather)
+
+class ScoreMatrix:
+    """Per-player suitability scores for all match condition combinations"""
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._reset(capacity=0)
+        self._built_at = None
+
+    def _reset(self, capacity):
+        self._size = 0
+        self._row_of = {}
+        self._ids = np.full(capacity, -1, dtype=np.int64)
+        # NaN marks a format the player has no statistics for
+        self._scores = np.full((capacity, CONDITION_COUNT), np.nan, dtype=np.float32)
+        self._stats = np.full((capacity, len(FORMATS), len(STAT_COLUMNS)), np.nan, dtype=np.float64)
+        self._info = [None] * capacity
+
+    def _grow(self, capacity):
+        extra = capacity - len(self._ids)
+        self._ids = np.concatenate([self._ids, np.full(extra, -1, dtype=np.int64)])
+        self._scores = np.concatenate([
+            self._scores, np.full((extra, CONDITION_COUNT), np.nan, dtype=np.float32)
+        ])
+        self._stats = np.concatenate([
+            self._stats, np.full((extra, len(FORMATS), len(STAT_COLUMNS)), np.nan, dtype=np.float64)
+        ])
+        self._info.extend([None] * extra)
+
+    def _row_for(self, player_id):
+        row = self._row_of.get(player_id)
+        if row is None:
+            if self._size == len(self._ids):
+                self._grow(max(16, self._size * 2))
+            row = self._size
+            self._size += 1
+            self._row_of[player_id] = row
+            self._ids[row] = player_id
+        return row
+
+    def _clear_row(self, row):
+        self._scores[row] = np.nan
+        self._stats[row] = np.nan
+
+    def _load(self, player_ids=None):
+        """Write rows for the given players (all players when None)"""
+        loaded = set()
+        for format_position, match_format in enumerate(FORMATS):
+            frame = load_format_frame(match_format, player_ids)
+            if frame.empty:
+                continue
+
+            rows = np.array([self._row_for(int(pid)) for pid in frame['id']], dtype=np.int64)
+            for row, record in zip(rows, frame.itertuples(index=False)):
+                if record.id not in loaded:
+                    self._clear_row(row)
+                    loaded.add(int(record.id))
+                self._info[row] = (record.name, record.role, record.country)
+            self._stats[rows, format_position] = frame[STAT_COLUMNS].to_numpy()
+
+            for pitch_type in PITCH_TYPES:
+                for weather in WEATHERS:
+                    column = condition_index(match_format, pitch_type, weather)
+                    self._scores[rows, column] = compute_scores(frame, match_format, pitch_type, weather)
+        return loaded
+
+    def rebuild(self):
+        """Recompute the whole matrix from the database"""
+        with self._lock:
+            self._reset(capacity=0)
+            self._load()
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """Force a full rebuild on next read"""
+        with self._lock:
+            self._built_at = None
+
+    def _ensure_fresh(self):
+        if self._built_at is None or (
+            self.max_age is not None and time.monotonic() - self._built_at > self.max_age
+        ):
+            self.rebuild()
+
+    def refresh_players(self, player_ids):
+        """Recompute the rows of players whose statistics or role changed"""
+        player_ids = list(set(player_ids))
+        with self._lock:
+            if self._built_at is None:
+                return  # Next read rebuilds everything anyway
+            try:
+                for start in range(0, len(player_ids), REFRESH_CHUNK_SIZE):
+                    chunk = player_ids[start:start + REFRESH_CHUNK_SIZE]
+                    loaded = self._load(chunk)
+                    for player_id in set(chunk) - loaded:
+                        self.remove_player(player_id)
+            except Exception:
+                self._built_at = None
+                raise
+
+    def remove_player(self, player_id):
+        """Drop a deleted player (or one without statistics) from suggestions"""
+        with self._lock:
+            row = self._row_of.get(player_id)
+            if row is not None:
+                self._clear_row(row)
+
+    def suggest(self, match_format, pitch_type, weather, exclude_ids=(), limit=10):
+        """Return the best suggestions for the conditions, best first"""
+        with self._lock:
+            self._ensure_fresh()
+            size = self._size
+            ids = self._ids[:size]
+            scores = self._scores[:size, condition_index(match_format, pitch_type, weather)]
+            exclude_mask = np.isin(ids, list(exclude_ids))
+
+            format_position = FORMATS.index(match_format)
+            suggestions = []
+            for row in top_k_indices(scores, ids, limit, exclude_mask):
+                name, role, country = self._info[row]
+                stats = self._stats[row, format_position]
+                suggestions.append({
+                    'id': int(ids[row]),
+                    'name': name,
+                    'role': role,
+                    'country': country,
+                    'score': round(float(scores[row]), 3),
+                    'statistics': {
+                        column: None if np.isnan(value) else float(value)
+                        for column, value in zip(STAT_COLUMNS, stats)
+                    }
+                })
+            return suggestions
+
+def get_score_matrix():
+    """Score matrix of the current application"""
+    return current_app.extensions['score_matrix']
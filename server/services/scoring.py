@@ -0,0 +1,181 @@
+"""
+Vectorized player scoring for smart suggestions.
+
+Players and their statistics for one match format are loaded with a single
+join into a columnar pandas frame, every player is scored in one NumPy pass
+and the best candidates are picked with a partial sort.
+"""
+
+import numpy as np
+import pandas as pd
+from ..app import db
+from ..models import Player, PlayerStatistics, PlayerRole, MatchFormat, PitchType, Weather
+
+STAT_COLUMNS = ['batting_average', 'bowling_average', 'strike_rate', 'economy_rate', 'recent_form']
+FRAME_COLUMNS = ['id', 'name', 'role', 'country'] + STAT_COLUMNS
+
+def calculate_player_score(player, stats, match_conditions):
+    """Calculate player suitability score based on match conditions"""
+    score = 0
+
+    # Base score from recent form
+    if stats.recent_form:
+        score += stats.recent_form * 0.3
+
+    # Format-specific scoring
+    if match_conditions.format == MatchFormat.T20:
+        if stats.strike_rate:
+            score += stats.strike_rate * 0.2
+        if stats.economy_rate:
+            score += (50 - stats.economy_rate) * 0.1  # Lower economy is better
+    elif match_conditions.format == MatchFormat.TEST:
+        if stats.batting_average:
+            score += stats.batting_average * 0.4
+        if stats.bowling_average:
+            score += (50 - stats.bowling_average) * 0.3  # Lower average is better
+
+    # Pitch type considerations
+    if match_conditions.pitch_type == PitchType.BATTING:
+        if player.role == PlayerRole.BATSMAN and stats.batting_average:
+            score += stats.batting_average * 0.3
+    elif match_conditions.pitch_type == PitchType.BOWLING:
+        if player.role == PlayerRole.BOWLER and stats.bowling_average:
+            score += (50 - stats.bowling_average) * 0.3
+    elif match_conditions.pitch_type == PitchType.SPIN_FRIENDLY:
+        if player.role == PlayerRole.BOWLER:
+            score += 20  # Bonus for bowlers on spin-friendly pitches
+
+    # Weather considerations
+    if match_conditions.weather == Weather.RAINY:
+        if player.role == PlayerRole.BOWLER:
+            score += 15  # Bowlers get advantage in rainy conditions
+
+    return max(0, score)
+
+def load_format_frame(match_format, player_ids=None):
+    """Load players joined with their statistics for one format as a frame"""
+    query = db.session.query(
+        Player.id, Player.name, Player.role, Player.country,
+        PlayerStatistics.batting_average,
+        PlayerStatistics.bowling_average,
+        PlayerStatistics.strike_rate,
+        PlayerStatistics.economy_rate,
+        PlayerStatistics.recent_form
+    ).join(
+        PlayerStatistics, Player.id == PlayerStatistics.player_id
+    ).filter(PlayerStatistics.format == match_format)
+
+    if player_ids is not None:
+        query = query.filter(Player.id.in_(list(player_ids)))
+
+    rows = [
+        (row.id, row.name, row.role.value, row.country) + tuple(row[4:])
+        for row in query.order_by(Player.id).all()
+    ]
+
+    frame = pd.DataFrame.from_records(rows, columns=FRAME_COLUMNS)
+    frame['id'] = frame['id'].astype('int64')
+    frame[STAT_COLUMNS] = frame[STAT_COLUMNS].astype('float64')
+    return frame
+
+def _present(values):
+    """Mirror the truthiness checks of calculate_player_score (None and 0 are skipped)"""
+    return np.nan_to_num(values) != 0
+
+def compute_scores(frame, match_format, pitch_type, weather):
+    """Score every row of a format frame in one vectorized pass.
+
+    Uses the same weights, and the same order of additions, as
+    calculate_player_score so both produce identical floats.
+    """
+    batting = frame['batting_average'].to_numpy()
+    bowling = frame['bowling_average'].to_numpy()
+    strike = frame['strike_rate'].to_numpy()
+    economy = frame['economy_rate'].to_numpy()
+    form = frame['recent_form'].to_numpy()
+    roles = frame['role'].to_numpy()
+
+    is_batsman = roles == PlayerRole.BATSMAN.value
+    is_bowler = roles == PlayerRole.BOWLER.value
+
+    score = np.zeros(len(frame), dtype=np.float64)
+
+    # Base score from recent form
+    score += np.where(_present(form), form * 0.3, 0.0)
+
+    # Format-specific scoring
+    if match_format == MatchFormat.T20:
+        score += np.where(_present(strike), strike * 0.2, 0.0)
+        score += np.where(_present(economy), (50 - economy) * 0.1, 0.0)
+    elif match_format == MatchFormat.TEST:
+        score += np.where(_present(batting), batting * 0.4, 0.0)
+        score += np.where(_present(bowling), (50 - bowling) * 0.3, 0.0)
+
+    # Pitch type considerations
+    if pitch_type == PitchType.BATTING:
+        score += np.where(is_batsman & _present(batting), batting * 0.3, 0.0)
+    elif pitch_type == PitchType.BOWLING:
+        score += np.where(is_bowler & _present(bowling), (50 - bowling) * 0.3, 0.0)
+    elif pitch_type == PitchType.SPIN_FRIENDLY:
+        score += np.where(is_bowler, 20.0, 0.0)
+
+    # Weather considerations
+    if weather == Weather.RAINY:
+        score += np.where(is_bowler, 15.0, 0.0)
+
+    return np.maximum(score, 0.0)
+
+def top_k_indices(scores, ids, k, exclude_mask=None):
+    """Return row indices of the k best positive scores, best first.
+
+    Uses argpartition instead of a full sort; ties are broken by player id
+    so the result matches a stable sort over id-ordered players.
+    """
+    eligible = scores > 0
+    if exclude_mask is not None:
+        eligible &= ~exclude_mask
+
+    candidates = np.flatnonzero(eligible)
+    if k <= 0 or len(candidates) == 0:
+        return candidates[:0]
+
+    if len(candidates) > k:
+        candidate_scores = scores[candidates]
+        partition = np.argpartition(-candidate_scores, k - 1)[:k]
+        threshold = candidate_scores[partition].min()
+        # Keep every row tied at the threshold so the id tie-break is exact
+        candidates = candidates[candidate_scores >= threshold]
+
+    order = np.lexsort((ids[candidates], -scores[candidates]))
+    return candidates[order][:k]
+
+def _optional(value):
+    return None if pd.isna(value) else float(value)
+
+def suggestion_from_row(row, score):
+    """Build the suggestion payload returned by the smart-suggestion endpoint"""
+    return {
+        'id': int(row['id']),
+        'name': row['name'],
+        'role': row['role'],
+        'country': row['country'],
+        'score': float(score),
+        'statistics': {column: _optional(row[column]) for column in STAT_COLUMNS}
+    }
+
+def suggest_players(match_conditions, current_player_ids, limit=10):
+    """Score all players for the match conditions and return the top suggestions"""
+    frame = load_format_frame(match_conditions.format)
+    if frame.empty:
+        return []
+
+    ids = frame['id'].to_numpy()
+    scores = compute_scores(
+        frame, match_conditions.format, match_conditions.pitch_type, match_conditions.weather
+    )
+    exclude_mask = np.isin(ids, list(current_player_ids))
+
+    return [
+        suggestion_from_row(frame.iloc[index], scores[index])
+        for index in top_k_indices(scores, ids, limit, exclude_mask)
+    ]
@@ -0,0 +1,125 @@
+"""
+Refresh token sessions.
+
+Login and registration start a session: a row in auth_sessions and a
+refresh token (valid for JWT_REFRESH_TOKEN_EXPIRES) carrying the session id
+as its `sid` claim. When the short-lived access token expires, the client
+posts the refresh token to /api/auth/refresh and gets a new access token
+and a new refresh token without sending the password again. A refresh costs
+a signature check, one UPDATE and one user lookup, where signing in again
+costs a bcrypt check.
+
+Refresh tokens are rotated: the session keeps the jti of the one refresh
+token it still accepts, and a refresh swaps it for the new token's jti in a
+single conditional UPDATE, so of two requests racing with the same token
+only one wins. A token that was already rotated out is refused; if it comes
+back after the grace period, it was most likely copied, and the whole
+session is revoked, cutting off whoever holds the newer token too. Within
+REUSE_GRACE seconds it is taken for a client retrying (or two tabs
+refreshing at once) and only that request is refused.
+
+Logout revokes the session, and changing the password revokes every other
+session of the user. Access tokens already issued stay valid until they
+expire. `flask prune-sessions` deletes expired and revoked sessions.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from flask_jwt_extended import create_refresh_token
+from sqlalchemy import or_
+from ..app import db
+from ..models import AuthSession, User
+from .authorization import create_user_token
+
+# Seconds during which the refresh token just rotated out is refused without revoking the session
+REUSE_GRACE = 10
+
+class SessionError(Exception):
+    """Raised for a refresh token whose session cannot be refreshed"""
+
+def _lifetime():
+    lifetime = current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
+    return lifetime if isinstance(lifetime, timedelta) else timedelta(seconds=lifetime)
+
+def _refresh_token(user_id, session_id, jti):
+    return create_refresh_token(identity=user_id, additional_claims={'sid': session_id, 'jti': jti})
+
+def start_session(user):
+    """(access token, refresh token) for a new session of user; the caller commits"""
+    now = datetime.utcnow()
+    session = AuthSession(user_id=user.id, refresh_jti=str(uuid.uuid4()), created_at=now,
+                          expires_at=now + _lifetime())
+    db.session.add(session)
+    db.session.flush()
+    return create_user_token(user, session.id), _refresh_token(user.id, session.id, session.refresh_jti)
+
+def refresh_session(user_id, claims):
+    """(user, access token, refresh token) for the session of a refresh token, rotating it
+
+    Raises SessionError when the session is unknown, expired or revoked, or
+    the token was already rotated out. Commits.
+    """
+    session_id, jti = claims.get('sid'), claims.get('jti')
+    if session_id is None:
+        raise SessionError('Refresh token has no session')
+
+    now = datetime.utcnow()
+    new_jti = str(uuid.uuid4())
+    sessions = AuthSession.__table__.c
+    rotated = db.session.execute(
+        db.update(AuthSession.__table__)
+        .where(sessions.id == session_id, sessions.user_id == user_id, sessions.refresh_jti == jti,
+               sessions.revoked_at.is_(None), sessions.expires_at > now)
+        .values(refresh_jti=new_jti, previous_jti=jti, refreshed_at=now, expires_at=now + _lifetime())
+    ).rowcount == 1
+    if not rotated:
+        _refuse(session_id, user_id, jti, now)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        db.session.rollback()
+        raise SessionError('User not found')
+    access_token = create_user_token(user, session_id)
+    db.session.commit()
+    return user, access_token, _refresh_token(user_id, session_id, new_jti)
+
+def _refuse(session_id, user_id, jti, now):
+    session = db.session.get(AuthSession, session_id)
+    if session is None or session.user_id != user_id or session.revoked_at is not None:
+        raise SessionError('Session revoked')
+    if session.expires_at <= now:
+        raise SessionError('Session expired')
+    if (session.previous_jti == jti and session.refreshed_at is not None
+            and now - session.refreshed_at <= timedelta(seconds=REUSE_GRACE)):
+        raise SessionError('Refresh token already used')
+    # A token rotated out a while ago is being replayed
+    session.revoked_at = now
+    db.session.commit()
+    raise SessionError('Refresh token reused; session revoked')
+
+def revoke_session(session_id, user_id):
+    """Revoke a session of user; the caller commits. False when there is no such live session"""
+    sessions = AuthSession.__table__.c
+    return db.session.execute(
+        db.update(AuthSession.__table__)
+        .where(sessions.id == session_id, sessions.user_id == user_id, sessions.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    ).rowcount == 1
+
+def revoke_user_sessions(user_id, keep=None):
+    """Revoke the sessions of user except `keep`; the caller commits. Returns how many"""
+    sessions = AuthSession.__table__.c
+    statement = db.update(AuthSession.__table__).where(sessions.user_id == user_id, sessions.revoked_at.is_(None))
+    if keep is not None:
+        statement = statement.where(sessions.id != keep)
+    return db.session.execute(statement.values(revoked_at=datetime.utcnow())).rowcount
+
+def prune_sessions():
+    """Delete expired and revoked sessions; the caller commits. Returns how many"""
+    sessions = AuthSession.__table__.c
+    return db.session.execute(
+        db.delete(AuthSession.__table__).where(
+            or_(sessions.expires_at <= datetime.utcnow(), sessions.revoked_at.is_not(None))
+        )
+    ).rowcount
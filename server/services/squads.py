@@ -0,0 +1,24 @@
+"""
+Squad read path with eager-loaded memberships and players.
+
+Loading a user's squads costs two statements regardless of how many squads
+or players there are: one for the squads and one for their memberships
+joined to the players.
+"""
+
+from sqlalchemy.orm import selectinload
+from ..models import Squad, SquadPlayer
+
+def user_squads_query(user_id):
+    """Query for a user's squads with squad_players and their players preloaded"""
+    return Squad.query.filter_by(user_id=user_id).options(
+        selectinload(Squad.squad_players).joinedload(SquadPlayer.player)
+    )
+
+def get_user_squad(user_id, squad_id):
+    """Load one squad owned by the user, or None"""
+    return user_squads_query(user_id).filter(Squad.id == squad_id).first()
+
+def squad_members(squad):
+    """Players of an eager-loaded squad, in the order they were added"""
+    return [sp.player for sp in squad.squad_players if sp.player is not None]
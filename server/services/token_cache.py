@@ -0,0 +1,98 @@
+"""
+Cache of verified access tokens.
+
+flask-jwt-extended decodes every bearer token from scratch: it parses the
+header and payload, looks up the key, checks the HMAC signature and
+validates the claims, all before the view runs. A single-page app sends the
+same token with every call until it expires, so CachingJWTManager keeps the
+claims of tokens that passed that verification in a bounded LRU per
+application, and a token seen again is answered from it.
+
+Entries are keyed by the SHA-256 of the whole encoded token, so a token
+differing in any byte (a forged signature, an edited payload) misses and is
+verified in full, and the cache holds no usable tokens. An entry is dropped
+once the token's exp (plus JWT_DECODE_LEEWAY) has passed, and the normal
+decode then rejects it as expired. Every hit returns a fresh copy of the
+claims, as a decode would. Revocation is unaffected: role and token version
+checks run on the claims after decoding (see authorization).
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from flask_jwt_extended import JWTManager
+
+class VerifiedTokenCache:
+    """Bounded LRU of token hash -> verified claims, each kept until the token expires"""
+
+    def __init__(self, max_size=4096, leeway=0, clock=time.time):
+        self.max_size = max_size
+        # JWT_DECODE_LEEWAY may be seconds or a timedelta
+        self.leeway = leeway.total_seconds() if hasattr(leeway, 'total_seconds') else leeway
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # digest -> (claims, expires_at)
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+    @staticmethod
+    def _key(encoded_token):
+        return hashlib.sha256(encoded_token.encode('utf-8')).digest()
+
+    def get(self, encoded_token):
+        """Copy of the claims of an already verified, unexpired token, else None"""
+        key = self._key(encoded_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            claims, expires_at = entry
+            if self.clock() >= expires_at:
+                del self._entries[key]
+                self._counters['expired'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+        return dict(claims)
+
+    def put(self, encoded_token, claims):
+        """Remember the claims of a token that passed verification"""
+        if self.max_size <= 0:
+            return
+        expires_at = claims['exp'] + self.leeway if 'exp' in claims else float('inf')
+        key = self._key(encoded_token)
+        with self._lock:
+            self._entries[key] = (dict(claims), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, size=len(self._entries), max_size=self.max_size)
+
+class CachingJWTManager(JWTManager):
+    """JWTManager answering tokens it already verified from the application's token cache"""
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        cache = current_app.extensions.get('token_cache')
+        # CSRF double submit values and expired-token decodes are checked per call
+        if cache is None or cache.max_size <= 0 or csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        claims = cache.get(encoded_token)
+        if claims is None:
+            claims = super()._decode_jwt_from_config(encoded_token)
+            cache.put(encoded_token, claims)
+        return claims
+
+def get_token_cache():
+    """Verified token cache of the current application"""
+    return current_app.extensions['token_cache']
@@ -0,0 +1,49 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from server.app import create_app, db
+from server.models import User, UserRole
+
+@pytest.fixture(autouse=True)
+def database(tmp_path_factory, monkeypatch):
+    """Point every application a test creates at its own temporary SQLite file
+
+    A file rather than sqlite:// so that requests on other threads share it.
+    Login rate limits are counted in memory rather than in the instance folder.
+    """
+    path = tmp_path_factory.mktemp('database') / 'test.db'
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{path}')
+    monkeypatch.setenv('RATELIMIT_STORAGE_URL', 'memory://')
+    return path
+
+@pytest.fixture
+def environment():
+    """Extra environment variables for create_app(); override in a module to change them"""
+    return {}
+
+@pytest.fixture
+def app(environment, monkeypatch):
+    """Create application for testing; modules add their data by overriding app(app)"""
+    for name, value in environment.items():
+        monkeypatch.setenv(name, value)
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        app.extensions['job_runner'].shutdown()
+        app.extensions['password_hasher'].shutdown()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    """Create test client"""
+    return app.test_client()
+
+@pytest.fixture
+def admin_headers(app):
+    """Authorization header for an admin user"""
+    admin = User(username='admin', email='admin@example.com', password_hash='x', role=UserRole.ADMIN)
+    db.session.add(admin)
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=admin.id)}'}
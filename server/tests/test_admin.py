@@ -0,0 +1,115 @@
+import pytest
+from flask import json
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from server.app import db
+from server.models import User, Player, PlayerRole, PlayerStatistics, MatchFormat
+from server.services import bulk_import
+
+def run_job(app, client, headers, response):
+    """Wait for the job behind a 202 response and return its final state"""
+    assert response.status_code == 202
+    job_id = json.loads(response.data)['job']['id']
+    app.extensions['job_runner'].wait(job_id, timeout=30)
+    return json.loads(client.get(response.headers['Location'], headers=headers).data)['job']
+
+class TestBulkImportPlayers:
+    """Test POST /api/admin/players/bulk-import"""
+
+    def test_imports_valid_rows_and_reports_row_errors(self, app, client, admin_headers):
+        db.session.add(Player(name='Existing', role=PlayerRole.BATSMAN, country='India'))
+        db.session.commit()
+
+        response = client.post('/api/admin/players/bulk-import?chunk_size=2', headers=admin_headers, json={
+            'players': [
+                {'name': 'A', 'role': 'Batsman', 'country': 'India'},
+                {'name': 'Existing', 'role': 'Bowler', 'country': 'India'},
+                {'name': 'B', 'role': 'Umpire', 'country': 'India'},
+                {'name': 'C', 'country': 'India'},
+                {'name': 'A', 'role': 'Bowler', 'country': 'India'},
+                {'name': 'D', 'role': 'Bowler', 'country': 'England', 'matches_played': 12},
+                {'name': 'E', 'role': 'All-rounder', 'country': 'England'},
+            ]
+        })
+        job = run_job(app, client, admin_headers, response)
+        data = job['result']
+
+        assert job['status'] == 'succeeded'
+        assert (job['rows_processed'], job['rows_total'], job['progress']) == (7, 7, 1.0)
+        assert data['imported_count'] == 3
+        assert [error['row'] for error in data['row_errors']] == [1, 2, 3, 4]
+        assert data['errors'][0] == 'Player Existing: Already exists'
+        assert sorted(p.name for p in Player.query.all()) == ['A', 'D', 'E', 'Existing']
+        assert Player.query.filter_by(name='D').first().matches_played == 12
+
+    def test_requires_admin(self, client):
+        user = User(username='user', email='user@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+        response = client.post('/api/admin/players/bulk-import', headers=headers,
+                               json={'players': [{'name': 'A', 'role': 'Batsman', 'country': 'India'}]})
+
+        assert response.status_code == 403
+
+class TestBulkImportStatistics:
+    """Test POST /api/admin/players/bulk-statistics"""
+
+    @pytest.mark.parametrize('on_conflict', [True, False], ids=['on_conflict', 'update_then_insert'])
+    def test_upserts_and_counts_inserted_and_updated(self, app, client, admin_headers, monkeypatch, on_conflict):
+        if not on_conflict:
+            monkeypatch.setattr(bulk_import, 'UPSERT_INSERTS', {})
+        player = Player(name='A', role=PlayerRole.BATSMAN, country='India')
+        other = Player(name='B', role=PlayerRole.BOWLER, country='India')
+        db.session.add_all([player, other])
+        db.session.flush()
+        db.session.add(PlayerStatistics(player_id=player.id, format=MatchFormat.ODI,
+                                        batting_average=40.0, strike_rate=85.0))
+        db.session.commit()
+
+        response = client.post('/api/admin/players/bulk-statistics', headers=admin_headers, json={
+            'statistics': [
+                {'player_id': player.id, 'format': 'ODI', 'batting_average': 45.5},
+                {'player_id': player.id, 'format': 'T20', 'batting_average': 30.0, 'strike_rate': 140.0},
+                {'player_id': 9999, 'format': 'ODI', 'batting_average': 10.0},
+                {'player_id': other.id, 'format': 'Cricket', 'bowling_average': 25.0},
+                {'player_id': other.id, 'bowling_average': 25.0},
+                {'player_id': other.id, 'format': 'Test', 'bowling_average': 28.0},
+                {'player_id': other.id, 'format': 'Test', 'economy_rate': 2.9},
+            ]
+        })
+        data = run_job(app, client, admin_headers, response)['result']
+
+        assert data['imported_count'] == 2
+        assert data['updated_count'] == 1
+        assert [error['row'] for error in data['row_errors']] == [2, 3, 4]
+        assert data['errors'][0] == 'Statistics for player 9999: Player not found'
+
+        odi = PlayerStatistics.query.filter_by(player_id=player.id, format=MatchFormat.ODI).one()
+        assert odi.batting_average == 45.5
+        assert odi.strike_rate == 85.0  # Fields missing from the row are left alone
+        test = PlayerStatistics.query.filter_by(player_id=other.id, format=MatchFormat.TEST).one()
+        assert (test.bowling_average, test.economy_rate) == (28.0, 2.9)
+        assert PlayerStatistics.query.count() == 3
+
+    def test_statement_count_is_independent_of_row_count(self, app, client, admin_headers):
+        players = [Player(name=f'P{i}', role=PlayerRole.BATSMAN, country='India') for i in range(50)]
+        db.session.add_all(players)
+        db.session.commit()
+        rows = [{'player_id': p.id, 'format': 'ODI', 'batting_average': 30.0} for p in players]
+
+        statements = []
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = client.post('/api/admin/players/bulk-statistics', headers=admin_headers,
+                                   json={'statistics': rows})
+            job = run_job(app, client, admin_headers, response)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+
+        assert job['result']['imported_count'] == 50
+        assert len([s for s in statements if s.lstrip().upper().startswith('INSERT INTO PLAYER_STATISTICS')]) == 1
@@ -1,24 +1,5 @@
 import pytest
 from flask import json
-from app import create_app, db
-from models import User, UserRole
-
-@pytest.fixture
-def app():
-    """Create application for testing"""
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    
-    with app.app_context():
-        db.create_all()
-        yield app
-        db.drop_all()
-
-@pytest.fixture
-def client(app):
-    """Create test client"""
-    return app.test_client()
 
 @pytest.fixture
 def runner(app):
@@ -0,0 +1,110 @@
+import pytest
+from flask import json
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from server.app import db, bcrypt
+from server.models import User, UserRole
+from server.services.authorization import get_admin_roster
+
+@pytest.fixture
+def app(app):
+    """Create application with an admin and a regular user who can log in"""
+    password_hash = bcrypt.generate_password_hash('testpass123').decode('utf-8')
+    db.session.add_all([
+        User(username='admin', email='admin@example.com', password_hash=password_hash, role=UserRole.ADMIN),
+        User(username='second', email='second@example.com', password_hash=password_hash, role=UserRole.ADMIN),
+        User(username='fan', email='fan@example.com', password_hash=password_hash, role=UserRole.USER)
+    ])
+    db.session.commit()
+    return app
+
+def login(client, username):
+    response = client.post('/api/auth/login', json={'username': username, 'password': 'testpass123'})
+    assert response.status_code == 200
+    return {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+def user_queries(send):
+    """Response of send() and the statements it ran against the users table"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM users' in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = send()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return response, statements
+
+class TestAdminRequired:
+    """Test the admin_required decorator and its role claim"""
+
+    def test_role_claim_checks_skip_the_users_table(self, client):
+        admin = login(client, 'admin')
+        client.get('/api/admin/cache', headers=admin)  # Loads the admin roster
+
+        response, statements = user_queries(lambda: client.get('/api/admin/cache', headers=admin))
+        assert response.status_code == 200
+        assert statements == []
+
+        response, statements = user_queries(lambda: client.get('/api/admin/cache', headers=login(client, 'fan')))
+        assert response.status_code == 403
+        assert [s for s in statements if 'WHERE users.username' not in s] == []  # Only the login itself
+
+    def test_tokens_without_claims_load_the_user_once(self, client):
+        legacy = {'Authorization': f"Bearer {create_access_token(identity=1)}"}
+        response, statements = user_queries(lambda: client.get('/api/admin/cache', headers=legacy))
+        assert response.status_code == 200
+        assert len(statements) == 1
+
+        legacy = {'Authorization': f"Bearer {create_access_token(identity=3)}"}
+        assert client.get('/api/admin/cache', headers=legacy).status_code == 403
+
+    def test_demotion_revokes_role_claims(self, client):
+        admin, second = login(client, 'admin'), login(client, 'second')
+        assert client.get('/api/admin/cache', headers=second).status_code == 200
+
+        client.put('/api/admin/users/2', headers=admin, json={'role': 'user'})
+        assert client.get('/api/admin/cache', headers=second).status_code == 403
+
+        # Promoting again does not bring back tokens issued before the demotion
+        client.put('/api/admin/users/2', headers=admin, json={'role': 'admin'})
+        assert client.get('/api/admin/cache', headers=second).status_code == 403
+        assert client.get('/api/admin/cache', headers=login(client, 'second')).status_code == 200
+
+        client.delete('/api/admin/users/2', headers=admin)
+        assert client.get('/api/admin/cache', headers=second).status_code == 403
+
+    def test_role_changes_of_other_workers_apply_to_the_next_request(self, client):
+        admin, second = login(client, 'admin'), login(client, 'second')
+        assert client.get('/api/admin/cache', headers=second).status_code == 200
+
+        # A demotion committed by another process, which leaves this roster's own version alone
+        user = db.session.get(User, 2)
+        user.role, user.token_version = UserRole.USER, 1
+        db.session.commit()
+        assert client.get('/api/admin/cache', headers=second).status_code == 403
+
+        db.session.delete(db.session.get(User, 1))
+        db.session.commit()
+        assert client.get('/api/admin/cache', headers=admin).status_code == 403
+
+    def test_manual_role_changes_apply_after_max_age(self, client):
+        second = login(client, 'second')
+        assert client.get('/api/admin/cache', headers=second).status_code == 200
+
+        # Core statements bypass the session hook that bumps the shared version
+        db.session.execute(db.update(User).where(User.id == 2).values(role=UserRole.USER, token_version=1))
+        db.session.commit()
+        assert client.get('/api/admin/cache', headers=second).status_code == 200
+
+        get_admin_roster().max_age = 0
+        assert client.get('/api/admin/cache', headers=second).status_code == 403
+
+    def test_profile_loads_the_user_once(self, client):
+        fan = login(client, 'fan')
+        response, statements = user_queries(lambda: client.get('/api/auth/profile', headers=fan))
+        assert json.loads(response.data)['user']['username'] == 'fan'
+        assert len(statements) == 1
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from flask import json
+from sqlalchemy import event
+from server.app import db
+from server.models import User, Player, PlayerRole, Squad
+from server.services import counters
+from server.services.counters import read_counters, recount_counters
+
+def nonzero(counters):
+    return {name: value for name, value in counters.items() if value}
+
+def dashboard(client, headers, query=''):
+    response = client.get(f'/api/admin/statistics{query}', headers=headers)
+    assert response.status_code == 200, response.data
+    return json.loads(response.data)
+
+class TestSystemCounters:
+    """Test the counters behind GET /api/admin/statistics"""
+
+    def test_writes_move_the_counters(self, app, client, admin_headers):
+        response = client.post('/api/auth/register', json={
+            'username': 'fan', 'email': 'fan@example.com', 'password': 'testpass123'
+        })
+        user_headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+        client.post('/api/squads/', headers=user_headers, json={'name': 'XI'})
+
+        for name, role in (('Kusal Mendis', 'BATSMAN'), ('Wanindu Hasaranga', 'ALL_ROUNDER')):
+            response = client.post('/api/players/', headers=admin_headers,
+                                   json={'name': name, 'role': role, 'country': 'Sri Lanka'})
+            assert response.status_code == 201
+        player_id = json.loads(response.data)['player']['id']
+        client.post(f'/api/players/{player_id}/statistics', headers=admin_headers,
+                    json={'player_id': player_id, 'format': 'T20', 'economy_rate': 6.9})
+        client.put(f'/api/players/{player_id}', headers=admin_headers, json={'role': 'Bowler'})
+
+        response = client.post('/api/admin/players/bulk-import', headers=admin_headers, json={
+            'players': [{'name': 'Pathum Nissanka', 'role': 'Batsman', 'country': 'Sri Lanka'}]
+        })
+        app.extensions['job_runner'].wait(json.loads(response.data)['job']['id'], timeout=30)
+        client.put('/api/admin/users/2', headers=admin_headers, json={'role': 'admin'})
+
+        assert nonzero(read_counters()) == nonzero(recount_counters())
+        statistics = dashboard(client, admin_headers)['statistics']
+        assert statistics['users'] == {'total': 2, 'admins': 2, 'regular': 0, 'recent_registrations': 2}
+        assert statistics['players'] == {'total': 3, 'by_role': {'Batsman': 2, 'Bowler': 1}}
+        assert statistics['squads'] == {'total': 1, 'recent_created': 1}
+        assert statistics['statistics'] == {'total_records': 1}
+
+        client.delete(f'/api/players/{player_id}', headers=admin_headers)  # Cascades to its statistics
+        assert nonzero(read_counters()) == nonzero(recount_counters())
+
+    def test_dashboard_reads_the_counters_in_one_query(self, client, admin_headers):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            dashboard(client, admin_headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        counting = [statement for statement in statements if 'FROM users' not in statement or 'count' in statement]
+        assert len(counting) == 1 and 'FROM system_counters' in counting[0]
+
+    def test_exact_recount_corrects_drift(self, app, client, admin_headers):
+        db.session.add(Player(name='Kusal Perera', role=PlayerRole.WICKET_KEEPER, country='Sri Lanka'))
+        db.session.commit()
+        # A write that bypasses the session hook
+        db.session.execute(db.delete(Player))
+        db.session.commit()
+        assert dashboard(client, admin_headers)['statistics']['players']['total'] == 1
+
+        data = dashboard(client, admin_headers, '?exact=1')
+        assert data['exact'] is True
+        assert data['statistics']['players'] == {'total': 0, 'by_role': {}}
+        assert dashboard(client, admin_headers)['statistics']['players']['total'] == 0
+
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['reconcile-counters'])
+        assert result.exit_code == 0, result.output
+        assert result.output.strip() == 'Counters reconciled (0 corrected)'
+
+    def test_recent_activity_counts_the_last_days(self, app, client, admin_headers):
+        long_ago = datetime.utcnow() - timedelta(days=30)
+        old = User(username='old', email='old@example.com', password_hash='x', created_at=long_ago)
+        db.session.add(old)
+        db.session.flush()
+        db.session.add(Squad(name='Old XI', user_id=old.id, created_at=long_ago))
+        db.session.add(Squad(name='New XI', user_id=old.id))
+        db.session.commit()
+
+        statistics = dashboard(client, admin_headers)['statistics']
+        assert (statistics['users']['total'], statistics['users']['recent_registrations']) == (2, 1)
+        assert (statistics['squads']['total'], statistics['squads']['recent_created']) == (2, 1)
+
+        # Deleting an old row leaves the day buckets alone
+        db.session.delete(Squad.query.filter_by(name='Old XI').one())
+        db.session.commit()
+        assert not any('.created.' in name and value < 0 for name, value in read_counters().items())
+        assert dashboard(client, admin_headers, '?exact=1')['statistics']['squads'] == {'total': 1, 'recent_created': 1}
+
+    def test_dialects_without_upsert_update_then_insert(self, app, admin_headers, monkeypatch):
+        monkeypatch.setattr(counters, 'UPSERT_INSERTS', {})
+        db.session.add(Player(name='Kusal Mendis', role=PlayerRole.BATSMAN, country='Sri Lanka'))
+        db.session.commit()
+        db.session.add(Player(name='Pathum Nissanka', role=PlayerRole.BATSMAN, country='Sri Lanka'))
+        db.session.add(Player(name='Wanindu Hasaranga', role=PlayerRole.ALL_ROUNDER, country='Sri Lanka'))
+        db.session.commit()
+
+        assert nonzero(read_counters()) == nonzero(recount_counters())
+        assert read_counters()['players.role.BATSMAN'] == 2
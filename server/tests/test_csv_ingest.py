@@ -0,0 +1,151 @@
+import pytest
+from flask import json
+from flask_jwt_extended import create_access_token
+from server.app import db
+from server.models import User, UserRole, Player, PlayerRole, PlayerStatistics, MatchFormat, IngestionCheckpoint
+from server.services import bulk_import, csv_ingest
+from server.services.csv_ingest import ingest_csv
+
+BATTING_HEADER = 'Player_Name,Player_Type,Role,Runs,Balls_Faced,How_Out,Country\n'
+BOWLING_HEADER = 'Player Name,Overs,Mdns,matches,Runs,Wkts,Econ,Pos,Inns,Opposition,Ground,\n'
+
+def batting_csv(rows):
+    return BATTING_HEADER + ''.join(f'{name},{kind},3,{runs},{balls},{out},India\n'
+                                    for name, kind, runs, balls, out in rows)
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """players.csv and a latin1 odi_bowling.csv"""
+    batting = [
+        ('Pathum Nissanka', 'Batsman', 40, 50, 'Caught'),
+        (' pathum nissanka ', 'Batsman', 20, 30, 'Not Out'),
+        ('Charith Asalanka', 'All-rounder', 10, 20, 'Bowled'),
+        ('', 'Batsman', 5, 5, 'Bowled'),
+        ('Pathum Nissanka', 'Batsman', 30, 40, 'LBW'),
+        ('Charith Asalanka', 'All-rounder', 50, 40, 'Run Out'),
+        ('Charith Asalanka', 'All-rounder', 'n/a', 40, 'Run Out'),
+    ]
+    (tmp_path / 'players.csv').write_text(batting_csv(batting), encoding='utf-8')
+    bowling = BOWLING_HEADER + (
+        'Wanindu Hasaranga,10,0,1,40,2,4.0,3,1,v India,Colombo,"2 Jul 2023\t"\n'
+        'Wanindu Hasaranga,6.2,0,1,38,1,6.0,3,1,v India,Colombo,"4 Jul 2023\t"\n'
+        'José Pérez,8,1,1,48,0,6.0,3,1,v India,Colombo,"4 Jul 2023\t"\n'
+    )
+    (tmp_path / 'odi_bowling.csv').write_bytes(bowling.encode('latin1'))
+    return tmp_path
+
+@pytest.fixture
+def app(app, data_dir):
+    """Create application reading the CSV datasets from data_dir"""
+    app.config['CSV_DATA_DIR'] = str(data_dir)
+    return app
+
+def statistics_by_name():
+    return {
+        stats.player.name: (stats.batting_average, stats.strike_rate, stats.bowling_average, stats.economy_rate)
+        for stats in PlayerStatistics.query.filter_by(format=MatchFormat.ODI)
+    }
+
+class TestCsvIngest:
+    """Test the streaming CSV ingestion pipeline"""
+
+    @pytest.mark.parametrize('on_conflict', [True, False], ids=['on_conflict', 'update_then_insert'])
+    def test_aggregates_innings_per_player(self, app, data_dir, monkeypatch, on_conflict):
+        if not on_conflict:
+            monkeypatch.setattr(csv_ingest, 'UPSERT_INSERTS', {})
+            monkeypatch.setattr(bulk_import, 'UPSERT_INSERTS', {})
+        db.session.add(Player(name='Charith Asalanka', role=PlayerRole.ALL_ROUNDER, country='Sri Lanka'))
+        db.session.commit()
+
+        batting = ingest_csv('players', str(data_dir), chunk_size=2)
+        bowling = ingest_csv('odi_bowling', str(data_dir), chunk_size=2)
+
+        assert batting['rows_committed'] == 7
+        assert batting['chunks_committed'] == 4
+        assert batting['players_created'] == 1  # Name variants are normalized, Asalanka exists
+        assert [error['line'] for error in batting['errors']] == [5, 8]
+        assert bowling['players_created'] == 2
+
+        stats = statistics_by_name()
+        # 90 runs, 2 dismissals, 120 balls
+        assert stats['Pathum Nissanka'] == (45.0, 75.0, None, None)
+        assert stats['Charith Asalanka'] == (30.0, 100.0, None, None)
+        # 78 runs conceded, 3 wickets, 98 balls
+        assert stats['Wanindu Hasaranga'] == (None, None, 26.0, 4.78)
+        assert stats['José Pérez'] == (None, None, None, 6.0)
+        assert Player.query.filter_by(name='Wanindu Hasaranga').one().role == PlayerRole.BOWLER
+
+    def test_matches_non_ascii_names_regardless_of_case(self, app, data_dir):
+        db.session.add(Player(name='ÉMILE ØRSTED', role=PlayerRole.BOWLER, country='Denmark'))
+        db.session.commit()
+        bowling = BOWLING_HEADER + (
+            'Émile Ørsted,10,0,1,40,2,4.0,3,1,v India,Colombo,"2 Jul 2023\t"\n'
+            'Zoë Ångström,6,0,1,30,1,5.0,3,1,v India,Colombo,"2 Jul 2023\t"\n'
+        )
+        (data_dir / 'odi_bowling.csv').write_bytes(bowling.encode('latin1'))
+
+        summary = ingest_csv('odi_bowling', str(data_dir), chunk_size=1)
+        assert (summary['rows_committed'], summary['players_created']) == (2, 1)
+        assert ingest_csv('odi_bowling', str(data_dir), chunk_size=2, restart=True)['players_created'] == 0
+
+        stats = statistics_by_name()
+        assert stats['ÉMILE ØRSTED'] == (None, None, 20.0, 4.0)
+        assert stats['Zoë Ångström'] == (None, None, 30.0, 5.0)
+
+    def test_resumes_after_failure_without_double_counting(self, app, data_dir):
+        def fail_after_second_chunk(summary):
+            if summary['chunks_committed'] == 2:
+                raise RuntimeError('worker died')
+
+        with pytest.raises(RuntimeError):
+            ingest_csv('players', str(data_dir), chunk_size=2, on_chunk=fail_after_second_chunk)
+        assert IngestionCheckpoint.query.filter_by(source='players').one().rows_committed == 4
+
+        resumed = ingest_csv('players', str(data_dir), chunk_size=2)
+        assert resumed['resumed_from'] == 4
+        assert resumed['rows_read'] == 3
+        assert resumed['completed']
+        partial_run = statistics_by_name()
+
+        # A completed source is not read again
+        assert ingest_csv('players', str(data_dir), chunk_size=2)['rows_read'] == 0
+
+        restarted = ingest_csv('players', str(data_dir), chunk_size=5, restart=True)
+        assert restarted['rows_read'] == 7
+        assert statistics_by_name() == partial_run
+
+    def test_changed_file_requires_restart(self, app, data_dir):
+        ingest_csv('players', str(data_dir))
+        with open(data_dir / 'players.csv', 'a') as csv_file:
+            csv_file.write('Kusal Mendis,Batsman,3,12,10,Caught,India\n')
+
+        with pytest.raises(ValueError):
+            ingest_csv('players', str(data_dir))
+
+    def test_cli_command(self, app):
+        result = app.test_cli_runner().invoke(args=['ingest-csv', '--source', 'odi_bowling', '--chunk-size', '1'])
+
+        assert result.exit_code == 0, result.output
+        assert 'odi_bowling: 3 rows read, 2 players created' in result.output
+        assert IngestionCheckpoint.query.filter_by(source='odi_bowling').one().chunks_committed == 3
+
+    def test_admin_endpoint_queues_a_job(self, app, client):
+        admin = User(username='admin', email='admin@example.com', password_hash='x', role=UserRole.ADMIN)
+        db.session.add(admin)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=admin.id)}'}
+
+        response = client.post('/api/admin/ingest/csv', headers=headers,
+                               json={'sources': ['players', 'odi_bowling'], 'chunk_size': 2})
+        assert response.status_code == 202
+        job_id = json.loads(response.data)['job']['id']
+        app.extensions['job_runner'].wait(job_id, timeout=30)
+        job = json.loads(client.get(f'/api/admin/jobs/{job_id}', headers=headers).data)['job']
+
+        assert job['status'] == 'succeeded'
+        assert job['rows_processed'] == 10
+        assert [result['source'] for result in job['result']['results']] == ['players', 'odi_bowling']
+        assert Player.query.count() == 4
+
+        response = client.post('/api/admin/ingest/csv', headers=headers, json={'sources': ['../etc/passwd']})
+        assert response.status_code == 400
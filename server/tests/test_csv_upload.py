@@ -0,0 +1,121 @@
+import io
+import os
+import pytest
+from flask import json
+from werkzeug.datastructures import FileStorage
+from server.app import db
+from server.models import Player, PlayerRole, PlayerStatistics, MatchFormat
+from server.services.csv_upload import UploadTooLarge, iter_csv_records, read_limited
+from server.utils import validate_file_upload
+
+TEMPLATE = (
+    'name,role,batting_average,bowling_average,matches_played,country\n'
+    'Dimuth Karunaratne,Batsman,38.96,,93,Sri Lanka\n'
+    'Lasith Embuldeniya,Bowler,,28.36,17,Sri Lanka\n'
+    'Existing,Batsman,10,,1,Sri Lanka\n'
+    'Angelo Mathews,Umpire,46.04,33.98,104,Sri Lanka\n'
+    '\n'
+    'Dinesh Chandimal,Wicket-keeper,,,73,Sri Lanka\n'
+    'Kusal Mendis,Batsman,many,,10,Sri Lanka\n'
+)
+
+@pytest.fixture
+def admin_headers(admin_headers):
+    """Authorization header for an admin user, with one player already stored"""
+    db.session.add(Player(name='Existing', role=PlayerRole.BATSMAN, country='Sri Lanka'))
+    db.session.commit()
+    return admin_headers
+
+def run_job(app, client, headers, response):
+    """Wait for the job behind a 202 response and return its final state"""
+    assert response.status_code == 202, response.data
+    job_id = json.loads(response.data)['job']['id']
+    app.extensions['job_runner'].wait(job_id, timeout=30)
+    return json.loads(client.get(response.headers['Location'], headers=headers).data)['job']
+
+class TestUploadPlayersCsv:
+    """Test POST /api/admin/players/upload-csv"""
+
+    def test_multipart_upload(self, app, client, admin_headers):
+        response = client.post('/api/admin/players/upload-csv?batch_size=2', headers=admin_headers,
+                               data={'file': (io.BytesIO(TEMPLATE.encode()), 'players.csv')},
+                               content_type='multipart/form-data')
+        job = run_job(app, client, admin_headers, response)
+        data = job['result']
+
+        assert job['status'] == 'succeeded'
+        assert not os.path.exists(job['params']['path'])  # Spool file removed
+        assert data['rows'] == 6
+        assert data['batches'] == 3
+        assert data['imported_count'] == 3
+        assert data['statistics_count'] == 2
+        assert [(error['line'], error['name']) for error in data['errors']] == [
+            (4, 'Existing'), (5, 'Angelo Mathews'), (8, 'Kusal Mendis')
+        ]
+
+        dimuth = Player.query.filter_by(name='Dimuth Karunaratne').one()
+        assert dimuth.matches_played == 93
+        stats = PlayerStatistics.query.filter_by(player_id=dimuth.id).one()
+        assert (stats.format, stats.batting_average, stats.bowling_average) == (MatchFormat.ODI, 38.96, None)
+        assert Player.query.filter_by(name='Dinesh Chandimal').one().statistics == []
+
+    def test_raw_csv_body_in_latin1(self, app, client, admin_headers):
+        body = 'name,role,country,format,bowling_average\nJosé Pérez,Bowler,Spain,T20,21.5\n'.encode('latin1')
+        response = client.post('/api/admin/players/upload-csv?encoding=latin1', headers=admin_headers,
+                               data=body, content_type='text/csv')
+
+        assert run_job(app, client, admin_headers, response)['status'] == 'succeeded'
+        player = Player.query.filter_by(name='José Pérez').one()
+        assert player.statistics[0].format == MatchFormat.T20
+
+    def test_rejects_oversized_and_invalid_uploads(self, app, client, admin_headers):
+        app.config['CSV_UPLOAD_MAX_BYTES'] = 100
+        response = client.post('/api/admin/players/upload-csv', headers=admin_headers,
+                               data=TEMPLATE.encode(), content_type='text/csv')
+        assert response.status_code == 413
+
+        app.config['CSV_UPLOAD_MAX_BYTES'] = 1024
+        response = client.post('/api/admin/players/upload-csv', headers=admin_headers,
+                               data={'other': (io.BytesIO(TEMPLATE.encode()), 'players.csv')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 400
+
+        response = client.post('/api/admin/players/upload-csv', headers=admin_headers,
+                               data='role,country\nBatsman,India\n', content_type='text/csv')
+        job = run_job(app, client, admin_headers, response)
+        assert job['status'] == 'failed'
+        assert 'name column' in job['error']
+        assert Player.query.count() == 1
+
+class TestStreaming:
+    """The upload is consumed incrementally"""
+
+    def test_limit_is_enforced_while_reading(self):
+        blocks = read_limited(io.BytesIO(b'x' * 1000), max_bytes=500, block_size=100)
+        assert len(b''.join(next(blocks) for _ in range(5))) == 500
+        with pytest.raises(UploadTooLarge):
+            next(blocks)
+
+    def test_records_are_parsed_before_the_body_is_read(self):
+        consumed = []
+
+        def blocks():
+            yield b'name,role,country\n'
+            for i in range(1000):
+                consumed.append(i)
+                yield f'Player {i},Batsman,India\n'.encode()
+
+        records = iter_csv_records(blocks())
+        line, record = next(records)
+
+        assert (line, record['name']) == (2, 'Player 0')
+        assert len(consumed) < 1000
+
+    def test_validate_file_upload_does_not_read_the_file(self):
+        class Unreadable(io.BytesIO):
+            def read(self, *args):
+                raise AssertionError('read() called')
+
+        upload = FileStorage(stream=Unreadable(b'x' * 2048), filename='players.csv')
+        assert validate_file_upload(upload, ['csv'], max_size=1024)['is_valid'] is False
+        assert validate_file_upload(upload, ['csv'], max_size=4096)['is_valid'] is True
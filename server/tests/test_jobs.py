@@ -0,0 +1,132 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from flask import json
+from flask_jwt_extended import create_access_token
+from server.app import db
+from server.models import User, Player, Job, JobStatus
+from server.services.jobs import JOB_HANDLERS, STALE_ERROR, job_handler
+
+@pytest.fixture
+def blocking_job():
+    """A job kind that reports progress until released"""
+    started = threading.Event()
+    release = threading.Event()
+
+    @job_handler('test_blocking', public=False)
+    def run(context, params, payload):
+        context.progress(0, 10)
+        started.set()
+        for step in range(1, 11):
+            release.wait(timeout=10)
+            context.progress(step)
+        return {'steps': 10}
+
+    yield started, release
+    release.set()
+    del JOB_HANDLERS['test_blocking']
+
+def get_job(client, headers, job_id):
+    return json.loads(client.get(f'/api/admin/jobs/{job_id}', headers=headers).data)['job']
+
+class TestJobs:
+    """Test the background job endpoints"""
+
+    def test_create_job_and_poll_status(self, app, client, admin_headers):
+        response = client.post('/api/admin/jobs', headers=admin_headers, json={
+            'type': 'import_players',
+            'params': {'chunk_size': 1},
+            'rows': [{'name': 'A', 'role': 'Batsman', 'country': 'India'},
+                     {'name': 'B', 'role': 'Bowler', 'country': 'India'}]
+        })
+        data = json.loads(response.data)
+
+        assert response.status_code == 202
+        assert data['job']['status'] in ('queued', 'running', 'succeeded')
+        assert response.headers['Location'].endswith(f"/api/admin/jobs/{data['job']['id']}")
+
+        app.extensions['job_runner'].wait(data['job']['id'], timeout=30)
+        job = get_job(client, admin_headers, data['job']['id'])
+        assert job['status'] == 'succeeded'
+        assert job['result']['imported_count'] == 2
+        assert Player.query.count() == 2
+
+        listed = json.loads(client.get('/api/admin/jobs?status=succeeded', headers=admin_headers).data)
+        assert [listed_job['id'] for listed_job in listed['jobs']] == [job['id']]
+
+    def test_rejects_unknown_and_internal_job_types(self, client, admin_headers):
+        for kind in ('rm_rf', 'upload_players_csv'):
+            response = client.post('/api/admin/jobs', headers=admin_headers, json={'type': kind})
+            assert response.status_code == 400
+        assert Job.query.count() == 0
+
+    def test_cancel_running_and_queued_jobs(self, app, client, admin_headers, blocking_job):
+        started, release = blocking_job
+        runner = app.extensions['job_runner']
+        runner.max_workers = 1
+
+        running = runner.submit('test_blocking')
+        assert started.wait(timeout=10)
+        queued = runner.submit('test_blocking')
+
+        response = client.post(f'/api/admin/jobs/{queued.id}/cancel', headers=admin_headers)
+        assert response.status_code == 202
+        assert json.loads(response.data)['job']['status'] == 'cancelled'
+
+        job = get_job(client, admin_headers, running.id)
+        assert (job['status'], job['rows_total'], job['progress']) == ('running', 10, 0.0)
+        response = client.post(f'/api/admin/jobs/{running.id}/cancel', headers=admin_headers)
+        assert json.loads(response.data)['job']['cancel_requested'] is True
+
+        release.set()
+        runner.wait(running.id, timeout=30)
+        runner.wait(queued.id, timeout=30)
+        assert get_job(client, admin_headers, running.id)['status'] == 'cancelled'
+        assert get_job(client, admin_headers, running.id)['rows_processed'] == 1
+        assert db.session.get(Job, queued.id, populate_existing=True).started_at is None
+
+        response = client.post(f'/api/admin/jobs/{running.id}/cancel', headers=admin_headers)
+        assert response.status_code == 409
+
+    def test_failed_job_reports_error(self, app, client, admin_headers):
+        job = app.extensions['job_runner'].submit('ingest_csv', params={'sources': ['players'], 'chunk_size': 1})
+        app.config['CSV_DATA_DIR'] = '/nonexistent'
+        app.extensions['job_runner'].wait(job.id, timeout=30)
+
+        job = get_job(client, admin_headers, job.id)
+        assert job['status'] == JobStatus.FAILED.value
+        assert 'No such file' in job['error']
+
+    def test_jobs_of_a_restarted_worker_are_failed(self, app, client, admin_headers, blocking_job):
+        started, release = blocking_job
+        long_ago = datetime.utcnow() - timedelta(hours=1)
+        lost = [Job(kind='import_players', status=status, params={}, updated_at=long_ago)
+                for status in (JobStatus.QUEUED, JobStatus.RUNNING)]
+        db.session.add_all(lost + [Job(kind='import_players', status=JobStatus.RUNNING, params={})])
+        db.session.commit()
+
+        jobs = json.loads(client.get('/api/admin/jobs', headers=admin_headers).data)['jobs']
+        assert [(job['status'], job['error']) for job in jobs] == [
+            ('running', None), ('failed', STALE_ERROR), ('failed', STALE_ERROR)
+        ]
+
+        # Once per process; a job failed as stale stays failed when its handler stops
+        runner = app.extensions['job_runner']
+        job = runner.submit('test_blocking')
+        assert started.wait(timeout=10)
+        db.session.execute(db.update(Job).where(Job.id == job.id).values(updated_at=long_ago))
+        db.session.commit()
+        assert runner.recover() == 0
+        assert runner.fail_stale_jobs() == 1
+        release.set()
+        runner.wait(job.id, timeout=30)
+        assert get_job(client, admin_headers, job.id)['status'] == 'failed'
+
+    def test_requires_admin(self, client):
+        user = User(username='user', email='user@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+        assert client.post('/api/admin/jobs', headers=headers, json={'type': 'ingest_csv'}).status_code == 403
+        assert client.get('/api/admin/jobs/1', headers=headers).status_code == 403
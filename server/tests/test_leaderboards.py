@@ -0,0 +1,109 @@
+import random
+import pytest
+from flask import json
+from server.app import db
+from server.models import Player, PlayerStatistics, PlayerRole, MatchFormat
+from server.services.bulk_import import import_statistics
+from server.services.leaderboards import METRICS, verify_leaderboards
+
+@pytest.fixture
+def app(app):
+    """Create application with 40 players and random statistics in two formats"""
+    rng = random.Random(5)
+    roles = list(PlayerRole)
+    players = [Player(name=f'Player {i:02d}', role=roles[i % len(roles)], country='India') for i in range(40)]
+    db.session.add_all(players)
+    db.session.flush()
+    rows = []
+    for player in players:
+        for match_format in ('T20', 'ODI'):
+            # Some metrics missing, and few distinct values so that ties occur
+            rows.append({'player_id': player.id, 'format': match_format, **{
+                metric: rng.choice([None, 10.0, 20.0, 30.0, 40.0, 50.0]) for metric in METRICS
+            }})
+    import_statistics(rows)
+    db.session.commit()
+    return app
+
+def live_board(match_format, metric, role=None, descending=True):
+    """Player ids ranked straight from player_statistics, as the leaderboard orders them"""
+    query = db.session.query(PlayerStatistics).join(Player).filter(PlayerStatistics.format == match_format)
+    if role:
+        query = query.filter(Player.role == role)
+    stats = [row for row in query if getattr(row, metric) is not None]
+    stats.sort(key=lambda row: (getattr(row, metric), row.player_id), reverse=descending)
+    return [row.player_id for row in stats]
+
+def top_ids(client, **params):
+    response = client.get('/api/statistics/top-players', query_string=params)
+    assert response.status_code == 200, response.data
+    return [player['id'] for player in json.loads(response.data)['top_players']]
+
+class TestLeaderboards:
+    """Test the materialized leaderboards behind top players"""
+
+    @pytest.mark.parametrize('metric', list(METRICS))
+    @pytest.mark.parametrize('role', [None, PlayerRole.BATSMAN, PlayerRole.WICKET_KEEPER])
+    def test_pages_match_the_live_query(self, client, metric, role):
+        descending = METRICS[metric]
+        expected = live_board(MatchFormat.ODI, metric, role, descending)
+        params = {'format': 'ODI', 'metric': metric, 'limit': 5}
+        if role:
+            params['role'] = role.value
+
+        assert top_ids(client, **params) == expected[:5]
+        assert top_ids(client, **params, offset=5) == expected[5:10]
+        assert top_ids(client, **dict(params, limit=100, order='asc' if descending else 'desc')) == expected[::-1]
+
+    def test_legacy_default_ordering(self, client):
+        assert top_ids(client, format='T20', role='Bowler', limit=3) == \
+            live_board(MatchFormat.T20, 'bowling_average', PlayerRole.BOWLER)[:3]
+        assert top_ids(client, format='T20', role='All-rounder', limit=3) == \
+            live_board(MatchFormat.T20, 'batting_average', PlayerRole.ALL_ROUNDER)[:3]
+        response = client.get('/api/statistics/top-players?format=T20')
+        assert json.loads(response.data)['metric'] == 'batting_average'
+        assert client.get('/api/statistics/top-players?metric=height').status_code == 400
+
+    def test_rank_of_a_player(self, client):
+        board = live_board(MatchFormat.T20, 'economy_rate', descending=False)
+        stats = {row.player_id: row.economy_rate for row in PlayerStatistics.query.filter_by(format=MatchFormat.T20)}
+        for player_id in board[::7]:
+            response = client.get(f'/api/statistics/top-players/rank?player_id={player_id}'
+                                  f'&format=T20&metric=economy_rate&include_total=1')
+            data = json.loads(response.data)
+            # Ties share the best rank among them
+            assert data['rank'] == 1 + sum(1 for other in board if stats[other] < stats[player_id])
+            assert (data['value'], data['total'], data['order']) == (stats[player_id], len(board), 'asc')
+
+        unranked = next(player_id for player_id, value in stats.items() if value is None)
+        response = client.get(f'/api/statistics/top-players/rank?player_id={unranked}&format=T20&metric=economy_rate')
+        assert response.status_code == 404
+        assert client.get('/api/statistics/top-players/rank?format=T20').status_code == 400
+
+    def test_writes_keep_leaderboards_in_sync(self, client, admin_headers):
+        player_id = live_board(MatchFormat.ODI, 'batting_average')[-1]
+        response = client.post(f'/api/players/{player_id}/statistics', headers=admin_headers,
+                               json={'player_id': player_id, 'format': 'ODI', 'batting_average': 99.0})
+        assert response.status_code == 200
+        assert top_ids(client, format='ODI', limit=1) == [player_id]
+
+        client.put(f'/api/players/{player_id}', headers=admin_headers, json={'role': 'Bowler'})
+        assert top_ids(client, format='ODI', role='Bowler', metric='batting_average', limit=1) == [player_id]
+
+        client.delete(f'/api/players/{player_id}', headers=admin_headers)
+        assert player_id not in top_ids(client, format='ODI', limit=100)
+        assert verify_leaderboards() == {'missing': [], 'unexpected': []}
+
+    def test_check_command_reports_and_repairs_drift(self, app):
+        # A write that bypasses the statistics paths
+        db.session.execute(db.update(PlayerStatistics).values(strike_rate=1.0))
+        db.session.commit()
+
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['check-leaderboards'])
+        assert result.exit_code != 0
+        assert 'unexpected' in result.output
+
+        result = runner.invoke(args=['check-leaderboards', '--repair'])
+        assert result.exit_code == 0, result.output
+        assert runner.invoke(args=['check-leaderboards']).output.strip() == 'Leaderboards match the player statistics'
@@ -0,0 +1,115 @@
+import threading
+import bcrypt
+import pytest
+from flask import json
+from server.app import db
+from server.models import User, UserRole
+from server.services.passwords import PasswordHasher, PasswordHasherBusy, get_password_hasher, hash_cost
+
+@pytest.fixture
+def environment():
+    """Hash new passwords at cost 5"""
+    return {'BCRYPT_LOG_ROUNDS': '5'}
+
+class TestPasswordHasher:
+    """Test bcrypt on the bounded pool"""
+
+    @pytest.mark.parametrize('executor', ['thread', 'process', 'inline'])
+    def test_hash_and_check(self, executor):
+        hasher = PasswordHasher(rounds=4, max_workers=2, executor=executor)
+        try:
+            password_hash = hasher.hash('correct horse')
+            assert hash_cost(password_hash) == 4
+            assert hasher.check(password_hash, 'correct horse')
+            assert not hasher.check(password_hash, 'battery staple')
+            assert not hasher.check('not a bcrypt hash', 'correct horse')
+        finally:
+            hasher.shutdown()
+
+    def test_rejects_work_beyond_max_pending(self):
+        hasher = PasswordHasher(rounds=4, max_workers=1, max_pending=1)
+        started, release = threading.Event(), threading.Event()
+
+        def blocking():
+            started.set()
+            release.wait()
+
+        caller = threading.Thread(target=hasher._run, args=(blocking,))
+        caller.start()
+        try:
+            assert started.wait(5)
+            with pytest.raises(PasswordHasherBusy):
+                hasher.hash('correct horse')
+            assert hasher.metrics()['rejected'] == 1
+        finally:
+            release.set()
+            caller.join()
+        assert hasher.check(hasher.hash('correct horse'), 'correct horse')
+        hasher.shutdown()
+
+class TestLongPasswords:
+    """Test passwords beyond bcrypt's 72 bytes"""
+
+    PASSWORD = 'ø' * 30 + 'x' * 50  # 110 UTF-8 bytes
+
+    def test_register_and_login(self, client):
+        response = client.post('/api/auth/register', json={
+            'username': 'fan', 'email': 'fan@example.com', 'password': self.PASSWORD
+        })
+        assert response.status_code == 201
+        assert client.post('/api/auth/login', json={'username': 'fan', 'password': self.PASSWORD}).status_code == 200
+        response = client.post('/api/auth/login', json={'username': 'fan', 'password': self.PASSWORD[:-1]})
+        assert response.status_code == 200  # Differs after the first 72 bytes only
+
+    def test_hashes_from_truncating_bcrypt_still_match(self, client):
+        # What bcrypt 4 stored: the hash of the first 72 bytes
+        old_hash = bcrypt.hashpw(self.PASSWORD.encode('utf-8')[:72], bcrypt.gensalt(5)).decode('utf-8')
+        db.session.add(User(username='fan', email='fan@example.com', password_hash=old_hash, role=UserRole.USER))
+        db.session.commit()
+
+        assert client.post('/api/auth/login', json={'username': 'fan', 'password': self.PASSWORD}).status_code == 200
+        assert client.post('/api/auth/login', json={'username': 'fan', 'password': 'x' * 80}).status_code == 401
+
+class TestLoginRehash:
+    """Test rehashing on login when the stored cost is outdated"""
+
+    def test_login_upgrades_outdated_hashes(self, app, client):
+        old_hash = PasswordHasher(rounds=4, executor='inline').hash('testpass123')
+        db.session.add(User(username='fan', email='fan@example.com', password_hash=old_hash, role=UserRole.USER))
+        db.session.commit()
+
+        response = client.post('/api/auth/login', json={'username': 'fan', 'password': 'wrongpass'})
+        assert response.status_code == 401
+        assert User.query.filter_by(username='fan').one().password_hash == old_hash
+
+        response = client.post('/api/auth/login', json={'username': 'fan', 'password': 'testpass123'})
+        assert response.status_code == 200
+        new_hash = db.session.query(User.password_hash).filter_by(username='fan').scalar()
+        assert hash_cost(new_hash) == 5
+        assert get_password_hasher().check(new_hash, 'testpass123')
+
+    def test_register_and_change_password_use_the_configured_cost(self, client):
+        response = client.post('/api/auth/register', json={
+            'username': 'fan', 'email': 'fan@example.com', 'password': 'testpass123'
+        })
+        headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+        assert hash_cost(db.session.query(User.password_hash).scalar()) == 5
+
+        response = client.post('/api/auth/change-password', headers=headers,
+                               json={'current_password': 'testpass123', 'new_password': 'newpass456'})
+        assert response.status_code == 200
+        assert client.post('/api/auth/login', json={'username': 'fan', 'password': 'newpass456'}).status_code == 200
+
+    def test_busy_hasher_answers_503(self, app, client, monkeypatch):
+        def busy(*args):
+            raise PasswordHasherBusy()
+
+        monkeypatch.setattr(get_password_hasher(), '_run', busy)
+        response = client.post('/api/auth/login', json={'username': 'fan', 'password': 'testpass123'})
+        # No user, so no hashing and a plain 401
+        assert response.status_code == 401
+        db.session.add(User(username='fan', email='fan@example.com', password_hash='x', role=UserRole.USER))
+        db.session.commit()
+        response = client.post('/api/auth/login', json={'username': 'fan', 'password': 'testpass123'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
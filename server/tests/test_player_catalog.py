@@ -0,0 +1,170 @@
+import random
+import pytest
+from flask import json
+from sqlalchemy import event, or_
+from server.app import db
+from server.models import Player, PlayerRole, Job
+from server.schemas import PlayerSchema
+from server.services.jobs import JOB_HANDLERS, JobContext
+from server.services.player_catalog import PlayerCatalog, get_player_catalog
+
+COUNTRIES = ['India', 'Sri Lanka', 'Australia', 'England', 'New Zealand']
+
+@pytest.fixture
+def app(app):
+    """Create application with players of random names, roles and countries"""
+    rng = random.Random(3)
+    for i in range(60):
+        name = ' '.join(rng.choice(['Kusal', 'Virat', 'Mendis', 'Kohli', 'Sharma', 'Ro', 'Al'])
+                        for _ in range(rng.randint(1, 3)))
+        db.session.add(Player(name=name, role=rng.choice(list(PlayerRole)), country=rng.choice(COUNTRIES),
+                              matches_played=None if i % 7 == 0 else i))
+    db.session.commit()
+    return app
+
+def count_statements(send):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = send()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return response, statements
+
+def listed_names(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.data
+    return [player['name'] for player in json.loads(response.data)['players']]
+
+class TestPlayerCatalog:
+    """Test the in-process player catalog"""
+
+    def test_reads_only_check_the_version_once_loaded(self, client):
+        _, statements = count_statements(lambda: client.get('/api/players/'))
+        assert len(statements) == 2
+
+        urls = ['/api/players/?role=Bowler&country=lanka&per_page=5', '/api/players/?cursor=&sort=name',
+                '/api/players/?search=KOH', '/api/players/countries', '/api/players/search?q=ku&fuzzy=0']
+        responses, statements = count_statements(lambda: [client.get(url) for url in urls])
+        assert [response.status_code for response in responses] == [200] * len(urls)
+        assert len(statements) == len(urls)
+        assert all('FROM system_counters' in statement for statement in statements)
+
+        countries = json.loads(client.get('/api/players/countries').data)['countries']
+        assert countries == sorted(COUNTRIES)
+
+    def test_matches_the_database(self, client):
+        players = Player.query.order_by(Player.id).all()
+        data = json.loads(client.get('/api/players/?per_page=100').data)
+        assert data['players'] == json.loads(json.dumps(PlayerSchema(many=True).dump(players)))
+
+        for search in ['koh', 'LANKA', 'al', 'zz']:
+            expected = Player.query.filter(or_(Player.name.ilike(f'%{search}%'), Player.country.ilike(f'%{search}%')))
+            expected = [player.name for player in expected.order_by(Player.id)]
+            assert listed_names(client, f'/api/players/?search={search}&per_page=100') == expected
+
+        data = json.loads(client.get('/api/players/?role=Bowler&per_page=4&page=2').data)
+        bowlers = Player.query.filter_by(role=PlayerRole.BOWLER).order_by(Player.id).all()
+        assert [player['id'] for player in data['players']] == [player.id for player in bowlers[4:8]]
+        assert data['pagination'] == {'page': 2, 'per_page': 4, 'total': len(bowlers),
+                                      'pages': -(-len(bowlers) // 4), 'has_next': len(bowlers) > 8,
+                                      'has_prev': True}
+
+    def test_cursor_walk_by_name(self, client):
+        seen, cursor = [], ''
+        while cursor is not None:
+            data = json.loads(client.get(f'/api/players/?sort=name&per_page=7&cursor={cursor}').data)
+            seen.extend((player['name'], player['id']) for player in data['players'])
+            cursor = data['pagination']['next_cursor']
+
+        assert seen == sorted((player.name, player.id) for player in Player.query)
+        assert client.get('/api/players/?sort=id&cursor=W10').status_code == 400
+
+    def test_trie_completes_names_and_later_words(self, app):
+        Player.query.delete()
+        db.session.add_all([
+            Player(name=name, role=PlayerRole.BATSMAN, country='India')
+            for name in ['Virat Kohli', 'Kohler  Smith', 'Akohlik', 'Kusal Mendis', 'Kusal Perera']
+        ])
+        db.session.commit()
+        get_player_catalog().invalidate()
+        snapshot = get_player_catalog().snapshot()
+
+        def names(rows):
+            return [snapshot.names[row] for row in rows]
+
+        assert names(snapshot.complete('KUSAL ')) == ['Kusal Mendis', 'Kusal Perera']
+        assert names(snapshot.complete('kohler s')) == ['Kohler  Smith']
+        assert names(snapshot.complete('ku', limit=1)) == ['Kusal Mendis']
+        assert [(snapshot.names[row], score) for row, score in snapshot.search('koh')] == [
+            ('Kohler  Smith', 1.0), ('Virat Kohli', 0.75), ('Akohlik', 0.5)
+        ]
+        assert names(row for row, _ in snapshot.search('mendis')) == ['Kusal Mendis']
+
+    def test_player_writes_bump_the_version(self, client, admin_headers):
+        catalog = get_player_catalog()
+        client.get('/api/players/')
+        version = catalog.version
+
+        response = client.post('/api/players/', headers=admin_headers,
+                               json={'name': 'Pathum Nissanka', 'role': 'BATSMAN', 'country': 'Sri Lanka'})
+        player_id = json.loads(response.data)['player']['id']
+        assert catalog.version == version + 1
+        assert listed_names(client, '/api/players/?search=nissanka') == ['Pathum Nissanka']
+
+        client.put(f'/api/players/{player_id}', headers=admin_headers, json={'country': 'Ireland'})
+        assert catalog.version == version + 2
+        assert 'Ireland' in json.loads(client.get('/api/players/countries').data)['countries']
+
+        client.delete(f'/api/players/{player_id}', headers=admin_headers)
+        assert catalog.version == version + 3
+        assert listed_names(client, '/api/players/?search=nissanka') == []
+        assert 'Ireland' not in json.loads(client.get('/api/players/countries').data)['countries']
+
+    def test_writes_of_other_workers_are_picked_up(self, app):
+        snapshot = get_player_catalog().snapshot()
+
+        # Another worker's catalog: same database, its own process state
+        other = PlayerCatalog(max_age=None)
+        assert len(other.snapshot()) == len(snapshot)
+        db.session.add(Player(name='Pathum Nissanka', role=PlayerRole.BATSMAN, country='Sri Lanka'))
+        db.session.commit()
+        assert len(other.snapshot()) == len(snapshot) + 1
+
+        player = db.session.get(Player, 1)
+        player.country = 'Ireland'
+        db.session.commit()
+        loaded = other.snapshot()
+        assert 'Ireland' in loaded.countries
+        assert other.snapshot() is loaded
+
+        # Reconciling the row counts keeps the version
+        app.test_cli_runner().invoke(args=['reconcile-counters'])
+        assert other.snapshot() is loaded
+
+    def test_bulk_import_bumps_the_version(self, client):
+        catalog = get_player_catalog()
+        client.get('/api/players/')
+        version = catalog.version
+
+        job = Job(kind='import_players')
+        db.session.add(job)
+        db.session.commit()
+        run_import_players = JOB_HANDLERS['import_players'][0]
+        rows = [{'name': f'Imported {i}', 'role': 'Bowler', 'country': 'Ireland'} for i in range(5)]
+        run_import_players(JobContext(job.id), {'chunk_size': 2}, rows)
+
+        assert catalog.version == version + 3
+        assert len(listed_names(client, '/api/players/?country=ireland')) == 5
+
+    def test_snapshots_expire_after_max_age(self, client):
+        catalog = get_player_catalog()
+        snapshot = catalog.snapshot()
+        assert catalog.snapshot() is snapshot
+
+        catalog.max_age = 0
+        assert catalog.snapshot() is not snapshot
@@ -0,0 +1,83 @@
+import pytest
+from flask import json
+from sqlalchemy import text
+from server.app import db
+from server.models import Player, PlayerRole
+from server.services.bulk_import import import_players
+from server.services.player_search import similarity
+
+NAMES = [
+    ('Virat Kohli', 'India'),
+    ('Kohler Smith', 'England'),
+    ('Dinesh Karthik', 'India'),
+    ('Mohammed Shami', 'India'),
+    ('Kusal Mendis', 'Sri Lanka'),
+    ('Kusal Perera', 'Sri Lanka'),
+    ('Alex Carey', 'Australia'),
+]
+
+@pytest.fixture
+def players(app):
+    players = [Player(name=name, role=PlayerRole.BATSMAN, country=country) for name, country in NAMES]
+    db.session.add_all(players)
+    db.session.commit()
+    return {player.name: player.id for player in players}
+
+def indexed_ids(query):
+    """Ids of players whose name or country contains query, read from players_fts"""
+    rows = db.session.execute(text('SELECT rowid FROM players_fts WHERE players_fts MATCH :phrase'),
+                              {'phrase': f'"{query}"'})
+    return sorted(rows.scalars())
+
+def search(client, query, **params):
+    response = client.get('/api/players/search', query_string=dict(params, q=query))
+    assert response.status_code == 200
+    return [player['name'] for player in json.loads(response.data)['players']]
+
+class TestPlayerSearch:
+    """Test the trigram player search"""
+
+    def test_ranks_prefix_then_word_prefix_then_substring(self, client, players):
+        db.session.add(Player(name='Akohlik', role=PlayerRole.BOWLER, country='India'))
+        db.session.commit()
+
+        assert search(client, 'KOH', fuzzy=0) == ['Kohler Smith', 'Virat Kohli', 'Akohlik']
+        assert search(client, 'kusal  m', fuzzy=0) == ['Kusal Mendis']
+        # Fuzzy matches fill the remaining places, scored below substring matches
+        response = client.get('/api/players/search?q=kusal m')
+        scores = [(player['name'], player['score']) for player in json.loads(response.data)['players']]
+        assert scores[0] == ('Kusal Mendis', 1.0)
+        assert [name for name, score in scores[1:] if score < 0.5] == ['Kusal Perera']
+
+    def test_fuzzy_matches_typos(self, client, players):
+        assert search(client, 'karthick') == ['Dinesh Karthik']
+        assert search(client, 'karthick', fuzzy=0) == []
+        assert search(client, 'shammi')[:1] == ['Mohammed Shami']
+        assert similarity('kusal mendes', 'Kusal Mendis') > similarity('kusal mendes', 'Kusal Perera')
+        assert search(client, 'zzzzzz') == []
+
+    def test_short_queries_match_name_prefixes(self, client, players):
+        assert search(client, 'ku') == ['Kusal Mendis', 'Kusal Perera']
+        assert search(client, 'k', limit=1) == ['Kohler Smith']
+
+    def test_index_follows_inserts_updates_and_deletes(self, app, players):
+        import_players([{'name': 'Pathum Nissanka', 'role': 'Batsman', 'country': 'Sri Lanka'}])
+        assert indexed_ids('nissan') == [Player.query.filter_by(name='Pathum Nissanka').one().id]
+
+        kohli = db.session.get(Player, players['Virat Kohli'])
+        kohli.name = 'King Kohli'
+        db.session.commit()
+        assert indexed_ids('virat') == []
+        assert indexed_ids('king') == [kohli.id]
+
+        db.session.delete(kohli)
+        db.session.commit()
+        assert indexed_ids('king') == []
+
+    def test_player_list_search_matches_names_and_countries(self, client, players):
+        response = client.get('/api/players/?search=lanka')
+        names = [player['name'] for player in json.loads(response.data)['players']]
+        assert sorted(names) == ['Kusal Mendis', 'Kusal Perera']
+
+        response = client.get('/api/players/?search=ex')
+        assert [player['name'] for player in json.loads(response.data)['players']] == ['Alex Carey']
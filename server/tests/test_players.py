@@ -0,0 +1,109 @@
+import pytest
+from flask import json
+from sqlalchemy import event
+from server.app import db
+from server.models import Player, PlayerStatistics, PlayerRole, MatchFormat
+from server.schemas import PlayerSchema, PlayerStatisticsSchema
+from server.services.score_matrix import get_score_matrix
+
+@pytest.fixture
+def app(app):
+    """Create application with a few players, half of them with T20 statistics"""
+    roles = list(PlayerRole)
+    for i in range(30):
+        player = Player(name=f'Player {i:02d}', role=roles[i % len(roles)], country='India')
+        db.session.add(player)
+        db.session.flush()
+        if i % 2 == 0:
+            db.session.add(PlayerStatistics(
+                player_id=player.id, format=MatchFormat.T20, batting_average=30 + i, strike_rate=None
+            ))
+    db.session.commit()
+    return app
+
+def count_statements(send):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.remove()
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = send()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return response, statements
+
+class TestPlayerListing:
+    """Test GET /api/players/"""
+
+    def test_serialization_matches_schemas(self, client):
+        response = client.get('/api/players/?format=T20&per_page=4')
+        data = json.loads(response.data)
+
+        assert response.status_code == 200
+        for item in data['players']:
+            player = db.session.get(Player, item['id'])
+            expected = PlayerSchema().dump(player)
+            stats = PlayerStatistics.query.filter_by(player_id=player.id, format=MatchFormat.T20).first()
+            if stats:
+                expected['statistics'] = PlayerStatisticsSchema().dump(stats)
+            assert item == json.loads(json.dumps(expected))
+
+    def test_statistics_query_count_is_flat(self, client):
+        client.get('/api/players/')  # Loads the player catalog
+        _, small = count_statements(lambda: client.get('/api/players/?format=T20&per_page=2'))
+        _, large = count_statements(lambda: client.get('/api/players/?format=T20&per_page=30'))
+
+        assert len(small) == len(large)
+
+    def test_cursor_pagination_walks_every_player_once(self, client):
+        seen = []
+        cursor = ''
+        while True:
+            response = client.get(f'/api/players/?sort=name&per_page=7&cursor={cursor}')
+            data = json.loads(response.data)
+            assert response.status_code == 200
+            assert 'total' not in data['pagination']
+            seen.extend(player['name'] for player in data['players'])
+            if not data['pagination']['has_next']:
+                break
+            cursor = data['pagination']['next_cursor']
+
+        assert seen == sorted(f'Player {i:02d}' for i in range(30))
+
+    def test_cursor_pagination_skips_count_unless_requested(self, client):
+        response, statements = count_statements(lambda: client.get('/api/players/?cursor=&per_page=5'))
+        assert 'total' not in json.loads(response.data)['pagination']
+        assert not any('count(' in statement.lower() for statement in statements)
+
+        response = client.get('/api/players/?cursor=&per_page=5&include_total=1&role=Bowler')
+        assert json.loads(response.data)['pagination']['total'] == 8
+
+    def test_cursor_for_other_ordering_is_rejected(self, client):
+        data = json.loads(client.get('/api/players/?cursor=&per_page=5').data)
+        response = client.get(f"/api/players/?sort=name&cursor={data['pagination']['next_cursor']}")
+
+        assert response.status_code == 400
+
+class TestPlayerWrites:
+    """Test the admin player routes"""
+
+    def test_score_matrix_failure_does_not_fail_a_committed_write(self, client, admin_headers, monkeypatch):
+        matrix = get_score_matrix()
+        matrix.rebuild()
+
+        def fail(player_ids):
+            raise RuntimeError('refresh failed')
+
+        monkeypatch.setattr(matrix, 'refresh_players', fail)
+        response = client.put('/api/players/1', headers=admin_headers, json={'role': 'Bowler'})
+        assert response.status_code == 200
+        assert json.loads(response.data)['player']['role'] == 'BOWLER'
+        assert matrix._built_at is None
+
+        response = client.post('/api/players/2/statistics', headers=admin_headers,
+                               json={'player_id': 2, 'format': 'T20', 'batting_average': 41.5})
+        assert response.status_code == 200
+        assert db.session.get(PlayerStatistics, 16).batting_average == 41.5
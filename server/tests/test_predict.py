@@ -0,0 +1,165 @@
+import os
+import joblib
+import numpy as np
+import pytest
+from flask import json
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+from server.services.model_registry import ModelRegistry, ModelUnavailable
+from server.services.prediction import encode_records, predict_matrix
+
+def write_artifacts(directory, label_offset=0):
+    """Dump a small model and encoders in the layout the registry expects"""
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(0)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(
+        rng.random((40, 10)), (np.arange(40) % 3) + label_offset
+    )
+    joblib.dump(model, os.path.join(directory, 'model.pkl'))
+    joblib.dump(LabelEncoder().fit([1, 2, 3]), os.path.join(directory, 'role_encoder.pkl'))
+    joblib.dump(LabelEncoder().fit(['All-rounder', 'Batsman']), os.path.join(directory, 'type_encoder.pkl'))
+
+@pytest.fixture
+def app(app, tmp_path):
+    """Create application with a registry pointing at temporary artifacts"""
+    write_artifacts(str(tmp_path))
+    app.extensions['model_registry'] = ModelRegistry(str(tmp_path), check_interval=0)
+    return app
+
+RECORD = {'role': 2, 'type': 'Batsman', 'features': [10, 20, 30, 0, 0, 0, 0, 0]}
+
+class TestModelRegistry:
+    """Test lazy loading and hot reload of model artifacts"""
+
+    def test_loads_lazily(self, app):
+        registry = app.extensions['model_registry']
+        assert registry.status()['loaded'] is False
+
+        bundle = registry.get()
+
+        assert registry.status()['loaded'] is True
+        assert registry.get() is bundle
+
+    def test_missing_artifacts_raise(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path / 'missing'))
+        with pytest.raises(ModelUnavailable):
+            registry.get()
+
+    def test_reload_switches_version(self, app, tmp_path):
+        write_artifacts(str(tmp_path / 'v2'), label_offset=10)
+        registry = app.extensions['model_registry']
+        registry.get()
+
+        registry.reload(version='v2')
+
+        assert registry.get().version == 'v2'
+        assert set(registry.get().model.classes_) == {10, 11, 12}
+
+    def test_replaced_files_are_picked_up(self, app, tmp_path):
+        registry = app.extensions['model_registry']
+        first = registry.get()
+
+        write_artifacts(str(tmp_path), label_offset=10)
+        os.utime(tmp_path / 'model.pkl', ns=(1, 1))
+
+        assert registry.get() is not first
+
+class TestBatchInference:
+    """Test encode_records() and predict_matrix() on their own"""
+
+    ROLES = {1: 0, 2: 1, 3: 2}
+    TYPES = {'All-rounder': 0, 'Batsman': 1}
+
+    def test_width_comes_from_the_model(self):
+        records = [
+            dict(RECORD, features=[1, 2]),
+            RECORD,
+            {'role': 4, 'type': 'Batsman', 'features': [0] * 8},
+            'not a record',
+            dict(RECORD, features=[0] * 9),
+            dict(RECORD, features=[5, 6, 7, 0, 0, 0, 0, 0]),
+        ]
+
+        matrix, positions, errors = encode_records(records, self.ROLES, self.TYPES, n_features=10)
+
+        assert positions == [1, 5]
+        assert matrix.tolist() == [[1, 1, 10, 20, 30, 0, 0, 0, 0, 0], [1, 1, 5, 6, 7, 0, 0, 0, 0, 0]]
+        assert errors == {
+            0: 'Expected 8 features, got 2',
+            2: 'Unknown role: 4',
+            3: 'Record must be an object',
+            4: 'Expected 8 features, got 9',
+        }
+
+    def test_without_a_model_width_the_common_one_wins(self):
+        records = [dict(RECORD, features=[1, 2]), RECORD, RECORD]
+
+        matrix, positions, errors = encode_records(records, self.ROLES, self.TYPES)
+
+        assert positions == [1, 2]
+        assert matrix.shape == (2, 10)
+        assert errors == {0: 'Expected 8 features, got 2'}
+
+    def test_nothing_valid(self):
+        matrix, positions, errors = encode_records([{'role': 2}], self.ROLES, self.TYPES, n_features=10)
+
+        assert (matrix.shape, positions) == ((0, 0), [])
+        assert predict_matrix(None, matrix, with_probabilities=True) == ([], None)
+
+    def test_predict_matrix_runs_the_whole_batch(self, app):
+        model = app.extensions['model_registry'].get().model
+        records = [dict(RECORD, features=[i, 0, 0, 0, 0, 0, 0, 0]) for i in range(5)]
+        matrix, _, _ = encode_records(records, self.ROLES, self.TYPES, model.n_features_in_)
+
+        predictions, probabilities = predict_matrix(model, matrix, with_probabilities=True)
+
+        assert predictions.tolist() == model.predict(matrix).tolist()
+        assert probabilities.shape == (5, 3)
+        assert predict_matrix(model, matrix)[1] is None
+
+class TestPredict:
+    """Test prediction endpoints"""
+
+    def test_single_and_batch_predictions_agree(self, client):
+        single = json.loads(client.post('/api/predict', json=RECORD).data)
+
+        response = client.post('/api/predict/batch', json={
+            'records': [RECORD, {'role': 99, 'type': 'Batsman', 'features': [0] * 8}, RECORD]
+        })
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+
+        assert response.mimetype == 'application/x-ndjson'
+        assert [line.get('index') for line in lines[:3]] == [0, 1, 2]
+        assert lines[0]['prediction'] == single['prediction'] == lines[2]['prediction']
+        assert 'error' in lines[1]
+        assert lines[3]['summary']['predicted'] == 2
+
+    def test_unavailable_model_returns_503(self, app, client, tmp_path):
+        app.extensions['model_registry'] = ModelRegistry(str(tmp_path / 'missing'))
+
+        response = client.post('/api/predict', json=RECORD)
+
+        assert response.status_code == 503
+
+class TestInferenceScheduler:
+    """Test micro-batching of concurrent predictions"""
+
+    def test_concurrent_requests_share_batches(self, app):
+        from server.services.inference_scheduler import InferenceScheduler
+
+        registry = app.extensions['model_registry']
+        scheduler = InferenceScheduler(registry.get, max_batch_size=16, max_latency_ms=50)
+        records = [dict(RECORD, features=[i, 20, 30, 0, 0, 0, 0, 0]) for i in range(32)]
+        records.append({'role': 99, 'type': 'Batsman', 'features': [0] * 8})
+
+        futures = [scheduler.submit(record) for record in records]
+        bundle = registry.get()
+        for record, future in zip(records[:-1], futures):
+            expected = bundle.model.predict([[1, 1] + record['features']])[0]
+            assert future.result(timeout=5) == expected
+        with pytest.raises(ValueError):
+            futures[-1].result(timeout=5)
+
+        metrics = scheduler.metrics()
+        assert metrics['max_batch_size_seen'] == 16
+        assert metrics['rows'] == len(records)
@@ -0,0 +1,203 @@
+import pytest
+from contextlib import contextmanager
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_jwt_extended import create_access_token
+from flask_migrate import stamp, upgrade
+from sqlalchemy import event
+from server.app import create_app, db
+from server.services.csv_ingest import _resolve_players
+from server.services.leaderboards import rebuild_leaderboards
+from server.models import (
+    User, UserRole, Player, PlayerStatistics, Squad, SquadPlayer, Job, JobStatus,
+    PlayerRole, MatchFormat, LeaderboardEntry
+)
+
+# Schema db.create_all() built before the migrations existed, which the
+# initial revision reproduces and `flask db stamp` adopts
+BASELINE_SCHEMA = [
+    'CREATE TABLE users (id INTEGER NOT NULL, username VARCHAR(80) NOT NULL, email VARCHAR(120) NOT NULL, '
+    'password_hash VARCHAR(255) NOT NULL, role VARCHAR(5), created_at DATETIME, updated_at DATETIME, '
+    'PRIMARY KEY (id), UNIQUE (username), UNIQUE (email))',
+    'CREATE TABLE players (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, role VARCHAR(13) NOT NULL, '
+    'country VARCHAR(50) NOT NULL, matches_played INTEGER, created_at DATETIME, updated_at DATETIME, '
+    'PRIMARY KEY (id))',
+    'CREATE TABLE match_conditions (id INTEGER NOT NULL, format VARCHAR(4) NOT NULL, '
+    'pitch_type VARCHAR(13) NOT NULL, weather VARCHAR(8) NOT NULL, venue VARCHAR(100) NOT NULL, '
+    'created_at DATETIME, PRIMARY KEY (id))',
+    'CREATE TABLE player_statistics (id INTEGER NOT NULL, player_id INTEGER NOT NULL, format VARCHAR(4) NOT NULL, '
+    'batting_average FLOAT, bowling_average FLOAT, strike_rate FLOAT, economy_rate FLOAT, recent_form FLOAT, '
+    'created_at DATETIME, updated_at DATETIME, PRIMARY KEY (id), '
+    'CONSTRAINT _player_format_uc UNIQUE (player_id, format), FOREIGN KEY(player_id) REFERENCES players (id))',
+    'CREATE TABLE squads (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, user_id INTEGER NOT NULL, '
+    'captain_id INTEGER, wicket_keeper_id INTEGER, created_at DATETIME, updated_at DATETIME, PRIMARY KEY (id), '
+    'FOREIGN KEY(user_id) REFERENCES users (id), FOREIGN KEY(captain_id) REFERENCES players (id), '
+    'FOREIGN KEY(wicket_keeper_id) REFERENCES players (id))',
+    'CREATE TABLE squad_players (id INTEGER NOT NULL, squad_id INTEGER NOT NULL, player_id INTEGER NOT NULL, '
+    'created_at DATETIME, PRIMARY KEY (id), CONSTRAINT _squad_player_uc UNIQUE (squad_id, player_id), '
+    'FOREIGN KEY(squad_id) REFERENCES squads (id), FOREIGN KEY(player_id) REFERENCES players (id))',
+    'CREATE TABLE smart_suggestions (id INTEGER NOT NULL, squad_id INTEGER NOT NULL, '
+    'match_conditions_id INTEGER NOT NULL, reasoning TEXT NOT NULL, confidence FLOAT NOT NULL, '
+    'created_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(squad_id) REFERENCES squads (id), '
+    'FOREIGN KEY(match_conditions_id) REFERENCES match_conditions (id))',
+    'CREATE TABLE suggestion_players (id INTEGER NOT NULL, suggestion_id INTEGER NOT NULL, '
+    'player_id INTEGER NOT NULL, priority INTEGER, created_at DATETIME, PRIMARY KEY (id), '
+    'CONSTRAINT _suggestion_player_uc UNIQUE (suggestion_id, player_id), '
+    'FOREIGN KEY(suggestion_id) REFERENCES smart_suggestions (id), '
+    'FOREIGN KEY(player_id) REFERENCES players (id))',
+]
+
+@pytest.fixture
+def app():
+    """Application on a database built by the migrations rather than create_all()"""
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        upgrade()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def data(app):
+    """A few rows in every table the routes read"""
+    admin = User(username='admin', email='admin@example.com', password_hash='x', role=UserRole.ADMIN)
+    db.session.add(admin)
+    players = [
+        Player(name=f'Player {i}', role=list(PlayerRole)[i % 4], country=['India', 'Sri Lanka'][i % 2])
+        for i in range(8)
+    ]
+    db.session.add_all(players)
+    db.session.flush()
+    for player in players:
+        db.session.add(PlayerStatistics(player_id=player.id, format=MatchFormat.ODI,
+                                        batting_average=player.id * 3.0, bowling_average=player.id * 2.0))
+    squad = Squad(name='XI', user_id=admin.id)
+    db.session.add(squad)
+    db.session.flush()
+    db.session.add_all(SquadPlayer(squad_id=squad.id, player_id=player.id) for player in players[:3])
+    db.session.add(Job(kind='ingest_csv', status=JobStatus.SUCCEEDED))
+    rebuild_leaderboards()
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=admin.id)}'}
+
+@contextmanager
+def capture_queries():
+    """Record (statement, parameters) of every SQL statement executed inside the block"""
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def query_plan(client, url, headers, fragment):
+    """EXPLAIN QUERY PLAN details of the statement containing fragment issued by GET url"""
+    with capture_queries() as queries:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.data
+
+    return explain(queries, fragment)
+
+def explain(queries, fragment):
+    """EXPLAIN QUERY PLAN details of the first captured statement containing fragment"""
+    matching = [(statement, parameters) for statement, parameters in queries if fragment in statement]
+    assert matching, f'No statement containing {fragment!r}'
+    statement, parameters = matching[0]
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    return [row[-1] for row in rows]
+
+def uses_index(plan, index):
+    return any(f'USING INDEX {index}' in line or f'USING COVERING INDEX {index}' in line for line in plan)
+
+def schema_diff():
+    """Differences between the database schema and the models"""
+    with db.engine.connect() as connection:
+        # Same filter as migrations/env.py: the search index tables are not models
+        context = MigrationContext.configure(connection, opts={
+            'include_name': lambda name, type_, parent_names: not (
+                type_ == 'table' and name.startswith('players_fts')
+            )
+        })
+        return compare_metadata(context, db.metadata)
+
+class TestMigrations:
+    """The migrations produce the schema declared by the models"""
+
+    def test_migrated_schema_matches_models(self, app):
+        assert schema_diff() == []
+
+    def test_upgrade_stamped_baseline_database(self):
+        app = create_app()
+        with app.app_context():
+            with db.engine.begin() as connection:
+                for statement in BASELINE_SCHEMA:
+                    connection.exec_driver_sql(statement)
+                connection.exec_driver_sql(
+                    "INSERT INTO players (id, name, role, country) VALUES (1, 'Old Player', 'BATSMAN', 'India')"
+                )
+                connection.exec_driver_sql(
+                    "INSERT INTO player_statistics (player_id, format, batting_average) VALUES (1, 'ODI', 41.5)"
+                )
+            try:
+                stamp(revision='f550e2ad867e')
+                upgrade()
+
+                assert schema_diff() == []
+                # Existing rows are carried into the tables later revisions derive from them
+                entry = LeaderboardEntry.query.filter_by(player_id=1, metric='batting_average').one()
+                assert (entry.format, entry.value) == (MatchFormat.ODI, 41.5)
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+
+class TestQueryPlans:
+    """Each route's main query is answered from an index"""
+
+    def test_user_squads(self, client, data):
+        plan = query_plan(client, '/api/squads/', data, 'FROM squads')
+        assert uses_index(plan, 'ix_squads_user_id'), plan
+
+        # Memberships are loaded through the (squad_id, player_id) unique index
+        plan = query_plan(client, '/api/squads/', data, 'FROM squad_players')
+        assert uses_index(plan, 'sqlite_autoindex_squad_players_1'), plan
+
+    def test_player_search(self, client, data):
+        # Player lists, countries and name prefixes come from the player catalog;
+        # fuzzy matches filling the remaining places from the trigram index
+        plan = query_plan(client, '/api/players/search?q=player', data, 'FROM players_fts')
+        assert any('VIRTUAL TABLE INDEX' in line for line in plan), plan
+
+    @pytest.mark.parametrize('query, index', [
+        ('role=Batsman', 'ix_leaderboard_entries_role_rank'),
+        ('role=Bowler', 'ix_leaderboard_entries_role_rank'),
+        ('role=', 'ix_leaderboard_entries_rank'),
+        ('metric=economy_rate', 'ix_leaderboard_entries_rank'),
+    ])
+    def test_top_players(self, client, data, query, index):
+        plan = query_plan(client, f'/api/statistics/top-players?format=ODI&{query}', data,
+                          'FROM leaderboard_entries JOIN players')
+        assert uses_index(plan, index), plan
+        assert not any('TEMP B-TREE' in line for line in plan), plan  # Rows come in index order
+
+    def test_admin_statistics_recount(self, client, data):
+        url = '/api/admin/statistics?exact=1'
+        assert uses_index(query_plan(client, url, data, 'WHERE users.created_at >='), 'ix_users_created_at')
+        assert uses_index(query_plan(client, url, data, 'WHERE squads.created_at >='), 'ix_squads_created_at')
+        assert uses_index(query_plan(client, url, data, 'GROUP BY players.role'), 'ix_players_role')
+
+    def test_csv_ingest_name_lookup(self, data):
+        with capture_queries() as queries:
+            ids, created = _resolve_players({'player 3': ('Player 3', PlayerRole.BATSMAN)}, 'India')
+        assert (list(ids), created) == (['player 3'], 0)
+        assert uses_index(explain(queries, 'FROM players'), 'ix_players_name_lower')
+
+    def test_jobs_by_status(self, client, data):
+        plan = query_plan(client, '/api/admin/jobs?status=succeeded', data, 'FROM jobs')
+        assert uses_index(plan, 'ix_jobs_status'), plan
@@ -0,0 +1,165 @@
+import threading
+import pytest
+from flask import json
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from server.app import db, bcrypt
+from server.models import User, UserRole
+from server.services.passwords import get_password_hasher
+from server.services.rate_limit import (BucketRule, MemoryBucketStore, RateLimited, RateLimiter,
+                                        SQLiteBucketStore, store_from_url)
+
+@pytest.fixture
+def environment():
+    """Allow 3 login attempts per address and 2 per username"""
+    return {'LOGIN_RATE_LIMIT_IP_BURST': '3', 'LOGIN_RATE_LIMIT_USERNAME_BURST': '2'}
+
+@pytest.fixture
+def app(app):
+    """Create application with an admin and a regular user who can log in"""
+    password_hash = bcrypt.generate_password_hash('testpass123').decode('utf-8')
+    db.session.add_all([
+        User(username='admin', email='admin@example.com', password_hash=password_hash, role=UserRole.ADMIN),
+        User(username='fan', email='fan@example.com', password_hash=password_hash, role=UserRole.USER)
+    ])
+    db.session.commit()
+    return app
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    """Each kind of bucket store"""
+    if request.param == 'memory':
+        return MemoryBucketStore()
+    return SQLiteBucketStore(str(tmp_path / 'ratelimit.db'))
+
+class TestBucketStores:
+    """Test token buckets in memory and in SQLite"""
+
+    def test_burst_then_refill(self, store):
+        rule = BucketRule(burst=2, per_minute=60)
+        assert store.take('k', rule, 100.0)[0]
+        assert store.take('k', rule, 100.0)[0]
+        allowed, tokens = store.take('k', rule, 100.5)
+        assert not allowed
+        assert rule.retry_after(tokens) == pytest.approx(0.5)
+        # One token a second, never more than the burst
+        assert store.take('k', rule, 101.0)[0]
+        assert not store.take('k', rule, 101.0)[0]
+        assert store.take('k', rule, 1000.0) == (True, pytest.approx(1.0))
+        assert store.take('other', rule, 100.0)[0]
+
+    def test_prune_forgets_idle_buckets(self, store):
+        rule = BucketRule(burst=1, per_minute=1)
+        store.take('old', rule, 100.0)
+        store.take('new', rule, 200.0)
+        store.prune(150.0)
+        assert store.take('old', rule, 200.0)[0]
+        assert not store.take('new', rule, 200.0)[0]
+
+    def test_storage_urls(self, tmp_path):
+        store = store_from_url('sqlite:///ratelimit.db', str(tmp_path / 'instance'))
+        assert isinstance(store, SQLiteBucketStore)
+        assert store.path == str(tmp_path / 'instance' / 'ratelimit.db')
+        assert isinstance(store_from_url('memory://'), MemoryBucketStore)
+        with pytest.raises(ValueError):
+            store_from_url('redis://localhost')
+
+    def test_sqlite_workers_share_buckets(self, tmp_path):
+        path = str(tmp_path / 'ratelimit.db')
+        workers = [SQLiteBucketStore(path) for _ in range(4)]
+        rule = BucketRule(burst=50, per_minute=0.001)
+        results = []
+
+        def attempt(store):
+            for _ in range(25):
+                results.append(store.take('login:ip:10.0.0.1', rule, 100.0)[0])
+
+        threads = [threading.Thread(target=attempt, args=(store,)) for store in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results.count(True) == 50
+
+class TestLoginRateLimit:
+    """Test the limits on /api/auth/login"""
+
+    def test_username_limit_rejects_before_queries_and_hashing(self, app, client, monkeypatch):
+        checks = []
+        hasher = get_password_hasher()
+        monkeypatch.setattr(hasher, 'check', lambda *args: checks.append(args) or False)
+        for _ in range(2):
+            response = client.post('/api/auth/login', json={'username': 'fan', 'password': 'guess'})
+            assert response.status_code == 401
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = client.post('/api/auth/login', json={'username': ' FAN ', 'password': 'guess'})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) >= 1
+        assert statements == []
+        assert len(checks) == 2
+
+    def test_address_limit_covers_every_username(self, client):
+        for username in ('a', 'b', 'c'):
+            client.post('/api/auth/login', json={'username': username, 'password': 'guess'})
+        response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'testpass123'})
+        assert response.status_code == 429
+        # Other addresses are unaffected
+        response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'testpass123'},
+                               environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        assert response.status_code == 200
+
+    def test_forwarded_addresses_ignored_without_trusted_proxies(self, client):
+        for i in range(3):
+            client.post('/api/auth/login', json={'username': 'fan', 'password': 'guess'},
+                        headers={'X-Forwarded-For': f'203.0.113.{i}'})
+        response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'testpass123'},
+                               headers={'X-Forwarded-For': '203.0.113.9'})
+        assert response.status_code == 429
+
+    def test_admin_sees_rejection_counters(self, app, client):
+        for _ in range(3):
+            client.post('/api/auth/login', json={'username': 'fan', 'password': 'guess'})
+        client.post('/api/auth/login', json={'password': 'guess'})
+
+        headers = {'Authorization': f"Bearer {create_access_token(identity=1)}"}
+        response = client.get('/api/admin/rate-limits', headers=headers)
+        login = json.loads(response.data)['rate_limits']['login']
+        assert login['allowed'] == 2
+        assert login['rejected_by'] == {'address': 1, 'username': 1}
+
+    def test_disabled_limiter_allows_everything(self):
+        limiter = RateLimiter(MemoryBucketStore(), BucketRule(1, 1), BucketRule(1, 1), enabled=False)
+        for _ in range(5):
+            limiter.check_login('10.0.0.1', 'fan')
+        limiter.enabled = True
+        limiter.check_login('10.0.0.1', 'fan')
+        with pytest.raises(RateLimited) as excinfo:
+            limiter.check_login('10.0.0.2', 'Fan')
+        assert excinfo.value.scope == 'username'
+
+class TestTrustedProxies:
+    """Test per-address limits behind a reverse proxy"""
+
+    @pytest.fixture
+    def environment(self, environment):
+        return dict(environment, TRUSTED_PROXY_COUNT='1')
+
+    def test_clients_behind_proxy_have_own_buckets(self, client):
+        proxy = {'REMOTE_ADDR': '10.0.0.1'}
+        for username in ('a', 'b', 'c'):
+            client.post('/api/auth/login', json={'username': username, 'password': 'guess'},
+                        headers={'X-Forwarded-For': '203.0.113.1'}, environ_base=proxy)
+        response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'testpass123'},
+                               headers={'X-Forwarded-For': '203.0.113.1'}, environ_base=proxy)
+        assert response.status_code == 429
+
+        # Another client through the same proxy; only the entry the proxy appended counts
+        response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'testpass123'},
+                               headers={'X-Forwarded-For': '203.0.113.1, 203.0.113.2'}, environ_base=proxy)
+        assert response.status_code == 200
@@ -0,0 +1,101 @@
+import threading
+import pytest
+from flask import json
+from flask_jwt_extended import decode_token
+from sqlalchemy import event
+from server.app import db
+from server.models import User
+from server.services.passwords import get_password_hasher
+
+@pytest.fixture
+def environment():
+    """Hash new passwords at cost 4"""
+    return {'BCRYPT_LOG_ROUNDS': '4'}
+
+def register(client, username, email):
+    return client.post('/api/auth/register', json={'username': username, 'email': email, 'password': 'testpass123'})
+
+def user_statements(send):
+    """Response of send() and the statements it ran against the users table"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'users' in statement:
+            statements.append(statement.split()[0])
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = send()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return response, statements
+
+def register_concurrently(app, monkeypatch, accounts):
+    """Register accounts on parallel threads, all past the lookup before any insert"""
+    barrier = threading.Barrier(len(accounts))
+    hasher = get_password_hasher()
+    original_hash = hasher.hash
+
+    def hash_after_every_lookup(password):
+        barrier.wait(timeout=10)
+        return original_hash(password)
+
+    monkeypatch.setattr(hasher, 'hash', hash_after_every_lookup)
+    responses = [None] * len(accounts)
+
+    def send(index):
+        responses[index] = register(app.test_client(), *accounts[index])
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(len(accounts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [(response.status_code, json.loads(response.data)) for response in responses]
+
+class TestRegistrationUniqueness:
+    """Test the combined lookup and the unique constraints behind registration"""
+
+    def test_one_lookup_per_signup(self, client):
+        response, statements = user_statements(lambda: register(client, 'fan', 'fan@example.com'))
+        assert response.status_code == 201
+        assert statements == ['SELECT', 'INSERT']
+
+        response, statements = user_statements(lambda: register(client, 'other', 'fan@example.com'))
+        assert response.status_code == 400
+        assert json.loads(response.data)['error'] == 'Email already exists'
+        assert statements == ['SELECT']
+
+        response = register(client, 'fan', 'fan@example.com')
+        assert json.loads(response.data)['error'] == 'Username already exists'
+
+    def test_parallel_registrations_of_one_username(self, app, monkeypatch):
+        results = register_concurrently(app, monkeypatch, [('fan', f'fan{i}@example.com') for i in range(6)])
+        assert sorted(status for status, _ in results) == [201] + [400] * 5
+        assert {body['error'] for status, body in results if status == 400} == {'Username already exists'}
+        assert User.query.count() == 1
+
+    def test_parallel_registrations_of_one_email(self, app, monkeypatch):
+        results = register_concurrently(app, monkeypatch, [(f'fan{i}', 'fan@example.com') for i in range(6)])
+        assert sorted(status for status, _ in results) == [201] + [400] * 5
+        assert {body['error'] for status, body in results if status == 400} == {'Email already exists'}
+        assert User.query.count() == 1
+
+    def test_profile_update_checks_both_fields_at_once(self, client):
+        register(client, 'taken', 'taken@example.com')
+        token = json.loads(register(client, 'fan', 'fan@example.com').data)['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        response, statements = user_statements(lambda: client.put(
+            '/api/auth/profile', headers=headers, json={'username': 'fan', 'email': 'taken@example.com'}
+        ))
+        assert response.status_code == 400
+        assert json.loads(response.data)['error'] == 'Email already exists'
+        assert statements.count('SELECT') == 2  # The current user, then both fields
+
+        response = client.put('/api/auth/profile', headers=headers, json={'username': 'fan2', 'email': 'fan@example.com'})
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['user']['username'] == 'fan2'
+        assert decode_token(data['access_token'])['username'] == 'fan2'
+        assert decode_token(data['access_token'])['sid'] == decode_token(token)['sid']
@@ -0,0 +1,126 @@
+import pytest
+from flask import json
+from sqlalchemy import event
+from server.app import db
+from server.models import Player, PlayerStatistics, PlayerRole, MatchFormat
+from server.services.response_cache import ResponseCache, get_response_cache
+
+@pytest.fixture
+def app(app):
+    """Create application with two players with T20 statistics"""
+    for i, name in enumerate(['Virat Kohli', 'Kusal Mendis']):
+        player = Player(name=name, role=PlayerRole.BATSMAN, country=['India', 'Sri Lanka'][i])
+        db.session.add(player)
+        db.session.flush()
+        db.session.add(PlayerStatistics(player_id=player.id, format=MatchFormat.T20, batting_average=40 + i))
+    db.session.commit()
+    return app
+
+def count_statements(send):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = send()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return response, statements
+
+class TestResponseCache:
+    """Test ETag revalidation and invalidation of cached reference responses"""
+
+    @pytest.mark.parametrize('url', [
+        '/api/players/roles', '/api/statistics/formats', '/api/statistics/pitch-types',
+        '/api/statistics/weather-conditions'
+    ])
+    def test_static_lists_are_cacheable_by_clients(self, client, url):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'public, max-age=86400'
+        etag = response.headers['ETag']
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['X-Cache'] == 'HIT'
+
+    def test_hits_skip_the_database_and_answer_conditional_requests(self, client):
+        url = '/api/statistics/top-players?format=T20&limit=5'
+        first = client.get(url)
+        assert first.headers['X-Cache'] == 'MISS'
+        assert first.headers['Cache-Control'] == 'no-cache'
+
+        second, statements = count_statements(lambda: client.get('/api/statistics/top-players?limit=5&format=T20'))
+        assert second.headers['X-Cache'] == 'HIT'
+        assert statements == []
+        assert second.data == first.data and second.headers['ETag'] == first.headers['ETag']
+
+        response = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        assert response.status_code == 304
+
+    def test_writes_invalidate_data_responses(self, client, admin_headers):
+        countries = client.get('/api/players/countries')
+        player = client.get('/api/players/1')
+        top = client.get('/api/statistics/top-players?format=T20')
+        roles = client.get('/api/players/roles')
+
+        response = client.post('/api/players/', headers=admin_headers,
+                               json={'name': 'Joe Root', 'role': 'BATSMAN', 'country': 'England'})
+        assert response.status_code == 201
+        response = client.get('/api/players/countries', headers={'If-None-Match': countries.headers['ETag']})
+        assert response.status_code == 200
+        assert 'England' in json.loads(response.data)['countries']
+        assert client.get('/api/players/roles').headers['X-Cache'] == 'HIT'
+
+        response = client.post('/api/players/1/statistics', headers=admin_headers,
+                               json={'player_id': 1, 'format': 'T20', 'batting_average': 99.5})
+        assert response.status_code == 200
+        for before in (player, top):
+            response = client.get(before.request.full_path, headers={'If-None-Match': before.headers['ETag']})
+            assert response.status_code == 200
+            assert b'99.5' in response.data
+        assert client.get('/api/players/roles', headers={'If-None-Match': roles.headers['ETag']}).status_code == 304
+
+    def test_errors_are_not_cached(self, client):
+        assert client.get('/api/players/999').status_code == 404
+        assert client.get('/api/players/999').status_code == 404
+        assert get_response_cache().stats()['size'] == 0
+
+    def test_counters_are_exposed_to_admins(self, client, admin_headers):
+        client.get('/api/players/countries')
+        etag = client.get('/api/players/countries').headers['ETag']
+        client.get('/api/players/countries', headers={'If-None-Match': etag})
+
+        response = client.get('/api/admin/cache', headers=admin_headers)
+        stats = json.loads(response.data)['cache']
+        assert (stats['hits'], stats['misses'], stats['not_modified'], stats['size']) == (2, 1, 1, 1)
+        assert stats['hit_rate'] == pytest.approx(2 / 3, abs=1e-4)
+
+class TestResponseCacheEviction:
+    """Test the LRU bound and TTL of ResponseCache"""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_size=2, ttl=60)
+        for key in 'abc':
+            cache.put(key, key.encode(), 'application/json', static=False, version=cache.version)
+            cache.get('a')
+
+        assert cache.get('b') is None
+        assert cache.get('a').body == b'a' and cache.get('c').body == b'c'
+        assert cache.stats()['evictions'] == 1
+
+    def test_entries_expire_and_stale_renders_are_not_stored(self):
+        cache = ResponseCache(max_size=10, ttl=0)
+        cache.put('data', b'1', 'application/json', static=False, version=cache.version)
+        cache.put('enum', b'2', 'application/json', static=True, version=cache.version)
+        assert cache.get('data') is None
+        assert cache.get('enum') is not None
+
+        cache.ttl = 60
+        version = cache.version
+        cache.invalidate()
+        cache.put('data', b'1', 'application/json', static=False, version=version)
+        assert cache.get('data') is None
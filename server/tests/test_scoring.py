@@ -0,0 +1,107 @@
+import random
+import pytest
+from server.app import db
+from server.models import Player, PlayerStatistics, PlayerRole, MatchFormat, PitchType, Weather
+from server.services.scoring import (
+    calculate_player_score, compute_scores, load_format_frame, suggest_players
+)
+from server.services.score_matrix import ScoreMatrix
+
+class Conditions:
+    def __init__(self, format, pitch_type, weather):
+        self.format = format
+        self.pitch_type = pitch_type
+        self.weather = weather
+
+@pytest.fixture
+def app(app):
+    """Create application with a seeded player pool"""
+    rng = random.Random(7)
+    for i in range(40):
+        player = Player(name=f'Player {i}', role=rng.choice(list(PlayerRole)), country='India')
+        db.session.add(player)
+        db.session.flush()
+        for match_format in MatchFormat:
+            # Mix in None and zero values to exercise the truthiness checks
+            value = lambda: rng.choice([None, 0, rng.uniform(1, 60)])
+            db.session.add(PlayerStatistics(
+                player_id=player.id, format=match_format,
+                batting_average=value(), bowling_average=value(),
+                strike_rate=value(), economy_rate=value(), recent_form=value()
+            ))
+    db.session.commit()
+    return app
+
+class TestScoring:
+    """Test the vectorized smart-suggestion scorer"""
+
+    def test_vectorized_scores_match_scalar_scores(self, app):
+        """Every condition combination scores exactly like calculate_player_score"""
+        for match_format in MatchFormat:
+            frame = load_format_frame(match_format)
+            players = {p.id: p for p in Player.query.all()}
+            for pitch_type in PitchType:
+                for weather in Weather:
+                    conditions = Conditions(match_format, pitch_type, weather)
+                    scores = compute_scores(frame, match_format, pitch_type, weather)
+                    for player_id, score in zip(frame['id'], scores):
+                        stats = PlayerStatistics.query.filter_by(
+                            player_id=int(player_id), format=match_format
+                        ).first()
+                        expected = calculate_player_score(players[player_id], stats, conditions)
+                        assert score == expected
+
+    def test_suggestions_match_full_sort(self, app):
+        """Top-k via argpartition matches a stable full sort, excluding squad players"""
+        conditions = Conditions(MatchFormat.T20, PitchType.SPIN_FRIENDLY, Weather.RAINY)
+        current_player_ids = [1, 2, 3]
+
+        expected = []
+        for player in Player.query.order_by(Player.id).all():
+            if player.id in current_player_ids:
+                continue
+            stats = PlayerStatistics.query.filter_by(player_id=player.id, format=conditions.format).first()
+            score = calculate_player_score(player, stats, conditions)
+            if score > 0:
+                expected.append((player.id, score))
+        expected.sort(key=lambda x: x[1], reverse=True)
+
+        suggestions = suggest_players(conditions, current_player_ids, limit=10)
+
+        assert [(s['id'], s['score']) for s in suggestions] == expected[:10]
+
+class TestScoreMatrix:
+    """Test the precomputed score matrix"""
+
+    def test_matrix_matches_direct_scoring(self, app):
+        """Every condition combination returns the same suggestions as a direct scan"""
+        matrix = ScoreMatrix()
+        for match_format in MatchFormat:
+            for pitch_type in PitchType:
+                for weather in Weather:
+                    conditions = Conditions(match_format, pitch_type, weather)
+                    expected = suggest_players(conditions, [4, 5], limit=5)
+                    suggestions = matrix.suggest(match_format, pitch_type, weather, exclude_ids=[4, 5], limit=5)
+                    assert [s['id'] for s in suggestions] == [s['id'] for s in expected]
+                    assert [s['score'] for s in suggestions] == pytest.approx([s['score'] for s in expected], abs=1e-3)
+
+    def test_refresh_players_updates_rows(self, app):
+        """Statistics changes are visible after refreshing only the affected rows"""
+        matrix = ScoreMatrix()
+        matrix.suggest(MatchFormat.T20, PitchType.BALANCED, Weather.SUNNY)
+
+        stats = PlayerStatistics.query.filter_by(player_id=10, format=MatchFormat.T20).first()
+        stats.recent_form = 1000
+        new_player = Player(name='Newcomer', role=PlayerRole.BOWLER, country='India')
+        db.session.add(new_player)
+        db.session.flush()
+        db.session.add(PlayerStatistics(player_id=new_player.id, format=MatchFormat.T20, recent_form=900))
+        db.session.commit()
+        matrix.refresh_players([10, new_player.id])
+
+        suggestions = matrix.suggest(MatchFormat.T20, PitchType.BALANCED, Weather.SUNNY, limit=2)
+        assert [s['id'] for s in suggestions] == [10, new_player.id]
+
+        matrix.remove_player(10)
+        suggestions = matrix.suggest(MatchFormat.T20, PitchType.BALANCED, Weather.SUNNY, limit=1)
+        assert suggestions[0]['id'] == new_player.id
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+import pytest
+from flask import json
+from server.app import db, bcrypt
+from server.models import AuthSession, User, UserRole
+from server.services import sessions
+from server.services.passwords import get_password_hasher
+
+@pytest.fixture
+def app(app):
+    """Create application with a user who can log in"""
+    password_hash = bcrypt.generate_password_hash('testpass123').decode('utf-8')
+    db.session.add(User(username='fan', email='fan@example.com', password_hash=password_hash, role=UserRole.USER))
+    db.session.commit()
+    return app
+
+def login(client):
+    response = client.post('/api/auth/login', json={'username': 'fan', 'password': 'testpass123'})
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+def refresh(client, refresh_token):
+    return client.post('/api/auth/refresh', headers=bearer(refresh_token))
+
+class TestRefreshTokens:
+    """Test sessions behind /api/auth/refresh"""
+
+    def test_refresh_renews_both_tokens_without_bcrypt(self, client, monkeypatch):
+        tokens = login(client)
+        monkeypatch.setattr(get_password_hasher(), 'check', lambda *args: pytest.fail('bcrypt on refresh'))
+
+        for _ in range(3):
+            response = refresh(client, tokens['refresh_token'])
+            assert response.status_code == 200
+            renewed = json.loads(response.data)
+            assert renewed['refresh_token'] != tokens['refresh_token']
+            assert renewed['user']['username'] == 'fan'
+            tokens = renewed
+        assert client.get('/api/auth/profile', headers=bearer(tokens['access_token'])).status_code == 200
+        assert AuthSession.query.count() == 1
+
+    def test_access_and_refresh_tokens_are_not_interchangeable(self, client):
+        tokens = login(client)
+        assert client.post('/api/auth/refresh', headers=bearer(tokens['access_token'])).status_code == 422
+        assert client.get('/api/auth/profile', headers=bearer(tokens['refresh_token'])).status_code == 422
+
+    def test_replayed_refresh_token_revokes_the_session(self, client):
+        first = login(client)['refresh_token']
+        second = json.loads(refresh(client, first).data)['refresh_token']
+
+        # Right after a rotation the old token is only refused
+        assert refresh(client, first).status_code == 401
+        second = json.loads(refresh(client, second).data)['refresh_token']
+
+        # Later it is taken for a stolen copy, and the holder of the new token is signed out too
+        db.session.execute(db.update(AuthSession).values(refreshed_at=datetime.utcnow() - timedelta(minutes=1)))
+        db.session.commit()
+        response = refresh(client, first)
+        assert response.status_code == 401
+        assert 'revoked' in json.loads(response.data)['message']
+        assert refresh(client, second).status_code == 401
+
+    def test_logout_and_password_change_revoke_sessions(self, client):
+        phone, laptop, tablet = login(client), login(client), login(client)
+
+        assert client.post('/api/auth/logout', headers=bearer(phone['refresh_token'])).status_code == 200
+        assert refresh(client, phone['refresh_token']).status_code == 401
+
+        response = client.post('/api/auth/change-password', headers=bearer(laptop['access_token']),
+                               json={'current_password': 'testpass123', 'new_password': 'newpass456'})
+        assert response.status_code == 200
+        assert refresh(client, tablet['refresh_token']).status_code == 401
+        assert refresh(client, laptop['refresh_token']).status_code == 200
+
+    def test_expired_sessions_are_refused_and_pruned(self, app, client):
+        live, expired = login(client), login(client)
+        db.session.execute(db.update(AuthSession).where(AuthSession.id == 2)
+                           .values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+        assert refresh(client, expired['refresh_token']).status_code == 401
+
+        result = app.test_cli_runner().invoke(args=['prune-sessions'])
+        assert '1 sessions deleted' in result.output
+        assert [session.id for session in AuthSession.query.all()] == [1]
+        assert refresh(client, live['refresh_token']).status_code == 200
+
+    def test_sessions_of_a_deleted_user_stop_refreshing(self, client):
+        tokens = login(client)
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='x', role=UserRole.ADMIN))
+        db.session.commit()
+        admin = sessions.start_session(User.query.filter_by(username='admin').one())[0]
+        db.session.commit()
+
+        assert client.delete('/api/admin/users/1', headers=bearer(admin)).status_code == 200
+        assert AuthSession.query.filter_by(user_id=1).count() == 0
+        assert refresh(client, tokens['refresh_token']).status_code == 401
@@ -0,0 +1,106 @@
+from contextlib import contextmanager
+from flask import json
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from server.app import db
+from server.models import (
+    User, Player, PlayerStatistics, Squad, SquadPlayer, MatchConditions,
+    PlayerRole, MatchFormat, PitchType, Weather
+)
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def seed_squads(squad_count, squad_size):
+    """Create a user owning squad_count squads of squad_size players each"""
+    user = User(username='owner', email='owner@example.com', password_hash='x')
+    db.session.add(user)
+
+    roles = list(PlayerRole)
+    players = [
+        Player(name=f'Player {i}', role=roles[i % len(roles)], country='India')
+        for i in range(squad_size)
+    ]
+    db.session.add_all(players)
+    db.session.flush()
+
+    for player in players:
+        db.session.add(PlayerStatistics(player_id=player.id, format=MatchFormat.T20, batting_average=30))
+
+    squads = []
+    for i in range(squad_count):
+        squad = Squad(name=f'Squad {i}', user_id=user.id, captain_id=players[0].id)
+        db.session.add(squad)
+        db.session.flush()
+        for player in players:
+            db.session.add(SquadPlayer(squad_id=squad.id, player_id=player.id))
+        squads.append(squad)
+
+    conditions = MatchConditions(
+        format=MatchFormat.T20, pitch_type=PitchType.BATTING, weather=Weather.SUNNY, venue='Colombo'
+    )
+    db.session.add(conditions)
+    db.session.commit()
+
+    headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+    return headers, squads[0].id, conditions.id
+
+def requests_for(client, headers, squad_id, conditions_id):
+    return {
+        'list': lambda: client.get('/api/squads/', headers=headers),
+        'get': lambda: client.get(f'/api/squads/{squad_id}', headers=headers),
+        'validate': lambda: client.get(f'/api/squads/{squad_id}/validate', headers=headers),
+        'analysis': lambda: client.post('/api/statistics/squad-analysis', headers=headers,
+                                        json={'squad_id': squad_id, 'match_conditions_id': conditions_id}),
+    }
+
+def measure(client, squad_count, squad_size):
+    db.drop_all()
+    db.create_all()
+    headers, squad_id, conditions_id = seed_squads(squad_count, squad_size)
+
+    counts = {}
+    for name, send in requests_for(client, headers, squad_id, conditions_id).items():
+        db.session.remove()
+        with count_queries() as statements:
+            response = send()
+        assert response.status_code == 200, response.data
+        counts[name] = len(statements)
+    return counts
+
+class TestSquadQueries:
+    """Squad read paths must not issue per-squad or per-player queries"""
+
+    def test_query_count_is_independent_of_squad_size(self, client):
+        small = measure(client, squad_count=1, squad_size=1)
+        large = measure(client, squad_count=20, squad_size=15)
+
+        assert large == small
+        assert small['list'] <= 3
+        assert small['get'] <= 3
+        assert small['validate'] <= 3
+
+    def test_list_returns_players_captain_and_order(self, client):
+        db.drop_all()
+        db.create_all()
+        headers, squad_id, _ = seed_squads(squad_count=2, squad_size=4)
+
+        response = client.get('/api/squads/', headers=headers)
+        data = json.loads(response.data)
+
+        assert len(data['squads']) == 2
+        squad = data['squads'][0]
+        assert [p['name'] for p in squad['players']] == [f'Player {i}' for i in range(4)]
+        assert squad['captain']['name'] == 'Player 0'
+        assert squad['wicket_keeper'] is None
@@ -0,0 +1,90 @@
+from datetime import timedelta
+import pytest
+from flask import json
+from flask_jwt_extended import create_access_token, decode_token
+import flask_jwt_extended.jwt_manager
+from server.app import db, bcrypt
+from server.models import User, UserRole
+from server.services.token_cache import VerifiedTokenCache, get_token_cache
+
+@pytest.fixture
+def app(app):
+    """Create application with a user who can log in"""
+    password_hash = bcrypt.generate_password_hash('testpass123').decode('utf-8')
+    db.session.add(User(username='fan', email='fan@example.com', password_hash=password_hash, role=UserRole.USER))
+    db.session.commit()
+    return app
+
+@pytest.fixture
+def verifications(monkeypatch):
+    """Count full signature verifications"""
+    calls = []
+    original = flask_jwt_extended.jwt_manager._decode_jwt
+
+    def counting(**kwargs):
+        calls.append(kwargs['encoded_token'])
+        return original(**kwargs)
+
+    monkeypatch.setattr(flask_jwt_extended.jwt_manager, '_decode_jwt', counting)
+    return calls
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+class TestVerifiedTokenCache:
+    """Test the token cache behind CachingJWTManager"""
+
+    def test_repeated_requests_verify_once(self, client, verifications):
+        response = client.post('/api/auth/login', json={'username': 'fan', 'password': 'testpass123'})
+        token = json.loads(response.data)['access_token']
+
+        for _ in range(3):
+            response = client.get('/api/auth/profile', headers=bearer(token))
+            assert response.status_code == 200
+        assert verifications == [token]
+        assert get_token_cache().stats()['hits'] == 2
+
+    def test_tokens_carry_username_and_role(self, client):
+        response = client.post('/api/auth/login', json={'username': 'fan', 'password': 'testpass123'})
+        claims = decode_token(json.loads(response.data)['access_token'])
+        assert (claims['username'], claims['role'], claims['ver']) == ('fan', 'user', 0)
+
+    def test_altered_tokens_are_verified_in_full(self, client, verifications):
+        token = create_access_token(identity=1)
+        assert client.get('/api/auth/profile', headers=bearer(token)).status_code == 200
+
+        header, payload, signature = token.split('.')
+        forged = f"{header}.{payload}.{signature[:-4]}AAAA"
+        assert client.get('/api/auth/profile', headers=bearer(forged)).status_code == 422
+        assert verifications == [token, forged]
+
+    def test_entries_end_with_the_token(self, app, client):
+        now = [1000.0]
+        cache = app.extensions['token_cache'] = VerifiedTokenCache(max_size=2, clock=lambda: now[0])
+        claims = {'sub': 1, 'exp': 1060}
+        cache.put('token', claims)
+        claims['sub'] = 2
+        assert cache.get('token') == {'sub': 1, 'exp': 1060}
+        assert cache.get('token') is not cache.get('token')
+
+        now[0] = 1060.0
+        assert cache.get('token') is None
+        assert cache.stats()['expired'] == 1
+
+        # Expired tokens miss the cache and are rejected by the full decode
+        token = create_access_token(identity=1, expires_delta=timedelta(seconds=-1))
+        response = client.get('/api/auth/profile', headers=bearer(token))
+        assert response.status_code == 401
+        assert cache.stats()['size'] == 0
+
+    def test_least_recently_used_tokens_are_evicted(self):
+        cache = VerifiedTokenCache(max_size=2)
+        for token in ('a', 'b', 'c'):
+            cache.put(token, {'sub': token})
+        assert cache.get('a') is None
+        assert cache.get('c') == {'sub': 'c'}
+        assert cache.stats()['evictions'] == 1
+
+        disabled = VerifiedTokenCache(max_size=0)
+        disabled.put('a', {'sub': 'a'})
+        assert disabled.get('a') is None
@@ -1,4 +1,7 @@
+import os
 import re
+import json
+import base64
 import hashlib
 import random
 import string
@@ -6,6 +9,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from flask import jsonify, request
 from marshmallow import ValidationError
+from sqlalchemy import tuple_
 
 def generate_random_string(length: int = 8) -> str:
     """Generate a random string of specified length"""
@@ -117,6 +121,58 @@ def validate_pagination_params(page: int, per_page: int, max_per_page: int = 100
         'offset': (page - 1) * per_page
     }
 
+def encode_cursor(key: str, values: List[Any]) -> str:
+    """Encode keyset pagination position as an opaque cursor"""
+    payload = json.dumps({'k': key, 'v': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str, key: str) -> Optional[List[Any]]:
+    """Decode a cursor produced by encode_cursor; empty cursor means first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValidationError('Invalid cursor')
+    if not isinstance(payload, dict) or payload.get('k') != key or not isinstance(payload.get('v'), list):
+        raise ValidationError('Cursor does not match the requested ordering')
+    return payload['v']
+
+def keyset_paginate(query, key: str, columns: List[Any], cursor: str, per_page: int,
+                    include_total: bool = False) -> Dict[str, Any]:
+    """Seek-based pagination over a unique column tuple.
+
+    Avoids OFFSET and only runs COUNT(*) when include_total is set, so each
+    page costs O(per_page) regardless of how deep it is.
+    """
+    total = query.order_by(None).count() if include_total else None
+
+    position = decode_cursor(cursor, key)
+    if position is not None:
+        if len(position) != len(columns):
+            raise ValidationError('Cursor does not match the requested ordering')
+        query = query.filter(tuple_(*columns) > tuple_(*position))
+
+    rows = query.order_by(*columns).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(key, [getattr(last, column.key) for column in columns])
+
+    pagination = {
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'has_next': has_next
+    }
+    if total is not None:
+        pagination['total'] = total
+
+    return {'items': items, 'pagination': pagination}
+
 def sanitize_input(text: str) -> str:
     """Sanitize user input to prevent XSS"""
     if not text:
@@ -129,18 +185,26 @@ def sanitize_input(text: str) -> str:
     
     return text.strip()
 
+def file_size(file) -> int:
+    """Size of an uploaded file, measured by seeking instead of reading it"""
+    stream = getattr(file, 'stream', file)
+    try:
+        position = stream.tell()
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return getattr(file, 'content_length', 0) or 0
+
 def validate_file_upload(file, allowed_extensions: List[str], max_size: int = 16 * 1024 * 1024) -> Dict[str, Any]:
     """Validate file upload"""
     if not file:
         return {'is_valid': False, 'error': 'No file provided'}
     
-    # Check file size
-    if len(file.read()) > max_size:
-        file.seek(0)  # Reset file pointer
+    # Check file size without reading the upload into memory
+    if file_size(file) > max_size:
         return {'is_valid': False, 'error': f'File size exceeds {max_size / (1024*1024)}MB limit'}
     
-    file.seek(0)  # Reset file pointer
-    
     # Check file extension
     filename = file.filename
     if not filename:
@@ -218,13 +282,6 @@ def validate_json_schema(data: Dict, required_fields: List[str], optional_fields
         'missing_fields': missing_fields
     }
 
-def rate_limit_key():
-    """Generate rate limit key based on IP and user"""
-    user_id = getattr(request, 'user_id', None)
-    if user_id:
-        return f"rate_limit:{user_id}"
-    return f"rate_limit:{request.remote_addr}"
-
 def log_activity(user_id: int, action: str, details: Dict = None):
     """Log user activity (placeholder for logging system)"""
     log_entry = {